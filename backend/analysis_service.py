@@ -0,0 +1,544 @@
+import asyncio
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+import metrics
+
+from article_ranking import count_naming_outcome, rank_articles
+from claude_service import (
+    analyze_event_outcomes_async,
+    analyze_news_sentiment_async,
+    build_no_news_result,
+    escalation_flags,
+    generate_final_summary_async,
+    record_triage_skipped,
+    triage_outcomes_async
+)
+from event_service import get_event_async
+from market_depth_service import get_event_market_depth_async
+from news_service import get_event_news_for_outcomes_async
+from responses import dumps, make_etag
+from singleflight import StreamingSingleFlight
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# --- Configuration ---
+TOP_OUTCOMES = 3  # Number of outcomes analyzed per event (by liquidity)
+NEWS_MAX_RESULTS = 20  # Raw articles fetched per outcome
+MAX_RANKED_ARTICLES = 10  # Articles kept after dedup/ranking
+
+# Max number of outcome pipelines (news -> sentiment -> summary) running at
+# once across all requests. Keeps bursts from flooding NewsAPI and Claude.
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "6"))
+
+# Batched mode sends all outcomes of an event to Claude in one request
+# (sentiment + summary together). The per-outcome calls are the fallback.
+CLAUDE_BATCH_MODE = os.getenv("CLAUDE_BATCH_MODE", "true").lower() in ("1", "true", "yes")
+
+# Outcomes with at least this many ranked articles naming them in full go
+# straight to the full model: triage would only confirm their relevance
+TRIAGE_SKIP_MIN_ARTICLES = int(os.getenv("TRIAGE_SKIP_MIN_ARTICLES", "2"))
+
+# Finished analyses are kept this long (filled by requests and pre-warming)
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", "900"))
+
+# Incremental refresh: when an analysis is recomputed, outcomes whose
+# articles are unchanged and whose price (percentage points) and liquidity
+# score moved less than these thresholds reuse their previous Claude results.
+ANALYSIS_INCREMENTAL = os.getenv("ANALYSIS_INCREMENTAL", "true").lower() in ("1", "true", "yes")
+ANALYSIS_PRICE_MOVE_THRESHOLD = float(os.getenv("ANALYSIS_PRICE_MOVE_THRESHOLD", "2.0"))
+ANALYSIS_LIQUIDITY_MOVE_THRESHOLD = float(os.getenv("ANALYSIS_LIQUIDITY_MOVE_THRESHOLD", "10"))
+# Previous results older than this are recomputed regardless
+ANALYSIS_REUSE_MAX_AGE = float(os.getenv("ANALYSIS_REUSE_MAX_AGE", "3600"))
+
+_outcome_slots = asyncio.Semaphore(ANALYSIS_CONCURRENCY)
+_analysis_cache = {}  # event_id -> (computed_at, result)
+_outcome_snapshots = {}  # (event_id, outcome name) -> last inputs and Claude results
+_refresh_stats = {"reused": 0, "recomputed": 0}
+
+# --- Result Cache ---
+
+def get_cached_analysis(event_id, max_age=None):
+    """
+    Returns a finished analysis for the event if younger than max_age
+    (ANALYSIS_CACHE_TTL by default), otherwise None.
+    """
+    entry = _analysis_cache.get(str(event_id))
+    max_age = ANALYSIS_CACHE_TTL if max_age is None else max_age
+    fresh = entry is not None and time.monotonic() - entry[0] < max_age
+    metrics.record_cache("analysis", hit=fresh)
+    return entry[1] if fresh else None
+
+def get_analysis_age(event_id):
+    """
+    Seconds since the cached analysis was computed, or None if there is none.
+    """
+    entry = _analysis_cache.get(str(event_id))
+    return time.monotonic() - entry[0] if entry else None
+
+def store_analysis(event_id, result):
+    now = time.monotonic()
+    _analysis_cache[str(event_id)] = (now, result)
+    expired = [k for k, (computed_at, _) in _analysis_cache.items() if now - computed_at >= ANALYSIS_CACHE_TTL]
+    for k in expired:
+        del _analysis_cache[k]
+
+# --- Incremental Refresh ---
+
+def _outcome_inputs(depth, news_data):
+    return {
+        "article_urls": frozenset(a.get('url') or a.get('title') or '' for a in news_data.get('articles', [])),
+        "price": depth.get('current_price', 0),
+        "liquidity_score": depth.get('liquidity_score', 0)
+    }
+
+def _inputs_unchanged(previous, current):
+    return (
+        previous["article_urls"] == current["article_urls"]
+        and abs(previous["price"] - current["price"]) <= ANALYSIS_PRICE_MOVE_THRESHOLD
+        and abs(previous["liquidity_score"] - current["liquidity_score"]) <= ANALYSIS_LIQUIDITY_MOVE_THRESHOLD
+    )
+
+def _reusable_results(event_id, depth, news_data):
+    """
+    Previous (sentiment, summary) for the outcome if its inputs haven't
+    meaningfully changed since they were computed, otherwise None.
+    """
+    if not ANALYSIS_INCREMENTAL or event_id is None:
+        return None
+    snapshot = _outcome_snapshots.get((str(event_id), depth['outcome']))
+    if snapshot is None or time.monotonic() - snapshot["computed_at"] > ANALYSIS_REUSE_MAX_AGE:
+        return None
+    if not _inputs_unchanged(snapshot["inputs"], _outcome_inputs(depth, news_data)):
+        return None
+    return snapshot["news_sentiment"], snapshot["final_summary"]
+
+def _is_fallback_result(news_sentiment, final_summary):
+    # Error/unavailable placeholders from claude_service must not be reused
+    return (
+        news_sentiment.get('probability_assessment') == 'Error'
+        or news_sentiment.get('reasoning') == 'AI analysis unavailable'
+        or final_summary.get('summary', '').startswith(('• Error', '• AI analysis unavailable'))
+    )
+
+def _store_snapshot(event_id, depth, news_data, news_sentiment, final_summary):
+    if event_id is None or _is_fallback_result(news_sentiment, final_summary):
+        return
+    now = time.monotonic()
+    _outcome_snapshots[(str(event_id), depth['outcome'])] = {
+        "computed_at": now,
+        "inputs": _outcome_inputs(depth, news_data),
+        "news_sentiment": news_sentiment,
+        "final_summary": final_summary
+    }
+    expired = [k for k, snapshot in _outcome_snapshots.items() if now - snapshot["computed_at"] > ANALYSIS_REUSE_MAX_AGE]
+    for k in expired:
+        del _outcome_snapshots[k]
+
+def get_refresh_stats():
+    return {**_refresh_stats, "snapshots": len(_outcome_snapshots)}
+
+# --- Pipeline Stages ---
+
+async def _emit_nothing(chunk_type, index, payload):
+    pass
+
+async def _fetch_news(event_title, top_depths, emit):
+    """
+    One event-level NewsAPI query for all outcomes (with per-outcome
+    fallback queries handled by news_service). Each outcome's articles are
+    then deduplicated and ranked locally, keeping only relevant ones.
+    """
+    async with _outcome_slots:
+        news_results = await get_event_news_for_outcomes_async(
+            event_title,
+            [(depth['outcome'], depth['market_question']) for depth in top_depths],
+            max_results=NEWS_MAX_RESULTS
+        )
+
+    ranked_results = []
+    for index, (depth, news_data) in enumerate(zip(top_depths, news_results)):
+        with metrics.timed("article_ranking"):
+            news_data = {
+                **news_data,
+                'articles': rank_articles(
+                    news_data.get('articles', []),
+                    depth['outcome'],
+                    depth['market_question'],
+                    max_articles=MAX_RANKED_ARTICLES
+                )
+            }
+        ranked_results.append(news_data)
+        await emit("news", index, {"news": build_news_result(news_data)})
+    return ranked_results
+
+async def _emit_sentiment(index, news_sentiment, emit):
+    await emit("sentiment", index, {"sentiment": {
+        "score": news_sentiment.get('score', 0),
+        "probability_assessment": news_sentiment.get('probability_assessment', 'Unknown'),
+        "reasoning": news_sentiment.get('reasoning', 'No analysis available')
+    }})
+
+async def _emit_summary(index, final_summary, emit):
+    await emit("summary", index, {"final_summary": final_summary.get('summary', 'No summary available')})
+
+async def _analyze_outcome(depth, news_data, index=0, emit=_emit_nothing):
+    """
+    Runs the sentiment -> summary chain for a single outcome and returns
+    (sentiment, summary).
+    The two calls depend on each other, so they stay sequential here;
+    the fan-out happens across outcomes. `emit` is awaited after each
+    stage so the streaming endpoint can forward partial results.
+    """
+    outcome_name = depth['outcome']
+    market_question = depth['market_question']
+
+    async with _outcome_slots:
+        logger.debug(f"Analyzing outcome: {outcome_name}")
+
+        # b. Analyze news sentiment
+        news_sentiment = await analyze_news_sentiment_async(
+            news_data.get('articles', []),
+            outcome_name,
+            market_question
+        )
+        await _emit_sentiment(index, news_sentiment, emit)
+
+        # c. Generate final summary
+        final_summary = await generate_final_summary_async(
+            outcome_name,
+            news_sentiment,
+            depth
+        )
+        await _emit_summary(index, final_summary, emit)
+
+    return news_sentiment, final_summary
+
+def _model_inputs(top_depths, news_results, indexes):
+    return [
+        {
+            "outcome_name": top_depths[index]['outcome'],
+            "market_question": top_depths[index]['market_question'],
+            "articles": news_results[index].get('articles', []),
+            "depth": top_depths[index]
+        }
+        for index in indexes
+    ]
+
+async def _triage_outcomes(event_title, top_depths, news_results, indexes, claude_results, emit):
+    """
+    Screens the outcomes with the fast triage model. Outcomes it confidently
+    rules out get a templated result (added to claude_results); returns the
+    indexes to escalate to the full model. Outcomes the ranked articles
+    clearly name are escalated without asking, which saves the triage
+    round trip when every outcome has such coverage.
+    """
+    unclear = [
+        index for index in indexes
+        if count_naming_outcome(news_results[index].get('articles', []), top_depths[index]['outcome']) < TRIAGE_SKIP_MIN_ARTICLES
+    ]
+    record_triage_skipped(len(indexes) - len(unclear))
+    if not unclear:
+        return indexes
+
+    async with _outcome_slots:
+        decisions = await triage_outcomes_async(event_title, _model_inputs(top_depths, news_results, unclear))
+    if decisions is None:
+        return indexes
+
+    escalated = [index for index in indexes if index not in unclear]
+    for index, decision, escalate in zip(unclear, decisions, escalation_flags(decisions)):
+        if escalate:
+            escalated.append(index)
+            continue
+        depth = top_depths[index]
+        news_sentiment, final_summary = build_no_news_result(depth['outcome'], depth, reason=decision['reason'])
+        await _emit_sentiment(index, news_sentiment, emit)
+        await _emit_summary(index, final_summary, emit)
+        claude_results[index] = (news_sentiment, final_summary)
+    return sorted(escalated)
+
+async def _analyze_outcomes_batched(event_title, top_depths, news_results, indexes, emit):
+    """
+    Gets sentiment and summary for the given outcomes from one batched
+    Claude request. Falls back to the per-outcome calls if the batch fails.
+    Returns {index: (sentiment, summary)}.
+    """
+    async with _outcome_slots:
+        batch = await analyze_event_outcomes_async(
+            event_title, _model_inputs(top_depths, news_results, indexes)
+        )
+
+    if batch is None:
+        logger.info("Batch analysis unavailable, falling back to per-outcome calls")
+        results = await asyncio.gather(*[
+            _analyze_outcome(top_depths[index], news_results[index], index, emit)
+            for index in indexes
+        ])
+        return dict(zip(indexes, results))
+
+    results = {}
+    for index, (news_sentiment, final_summary) in zip(indexes, batch):
+        await _emit_sentiment(index, news_sentiment, emit)
+        await _emit_summary(index, final_summary, emit)
+        results[index] = (news_sentiment, final_summary)
+    return results
+
+async def analyze_outcomes(event_id, event_title, top_depths, emit=_emit_nothing):
+    """
+    Fetches and ranks news for the given outcomes, then analyzes them
+    batched or per outcome depending on CLAUDE_BATCH_MODE. Outcomes with no
+    news, or whose news the triage model rules out, get a templated result
+    without a full-model call, and
+    outcomes whose inputs haven't changed since the last run reuse their
+    previous results (see ANALYSIS_INCREMENTAL).
+    Returns the outcome results in input order.
+    """
+    # a. News for every outcome in one query, deduplicated and ranked
+    news_results = await _fetch_news(event_title, top_depths, emit)
+
+    claude_results = {}
+    model_indexes = []
+    for index, (depth, news_data) in enumerate(zip(top_depths, news_results)):
+        if not news_data.get('articles'):
+            news_sentiment, final_summary = build_no_news_result(depth['outcome'], depth)
+        else:
+            reused = _reusable_results(event_id, depth, news_data)
+            metrics.record_cache("outcome_snapshot", hit=reused is not None)
+            if reused is None:
+                model_indexes.append(index)
+                continue
+            news_sentiment, final_summary = reused
+            _refresh_stats["reused"] += 1
+        await _emit_sentiment(index, news_sentiment, emit)
+        await _emit_summary(index, final_summary, emit)
+        claude_results[index] = (news_sentiment, final_summary)
+
+    # Triage: outcomes whose articles aren't about them skip the full model
+    escalated = model_indexes
+    if model_indexes:
+        escalated = await _triage_outcomes(event_title, top_depths, news_results, model_indexes, claude_results, emit)
+
+    # b + c. Sentiment and summary for outcomes with relevant news
+    if CLAUDE_BATCH_MODE and len(escalated) > 1:
+        claude_results.update(await _analyze_outcomes_batched(
+            event_title, top_depths, news_results, escalated, emit
+        ))
+    elif escalated:
+        analyzed = await asyncio.gather(*[
+            _analyze_outcome(top_depths[index], news_results[index], index, emit)
+            for index in escalated
+        ])
+        claude_results.update(zip(escalated, analyzed))
+
+    _refresh_stats["recomputed"] += len(model_indexes)
+    for index in model_indexes:
+        _store_snapshot(event_id, top_depths[index], news_results[index], *claude_results[index])
+
+    return [
+        build_outcome_result(depth, news_data, *claude_results[index])
+        for index, (depth, news_data) in enumerate(zip(top_depths, news_results))
+    ]
+
+# Concurrent analyses of the same event and outcome set - plain or
+# streamed - share one run of the pipeline; streams replay its chunks
+_analysis_flights = StreamingSingleFlight("event-analysis")
+
+async def _run_analysis(publish, event_data, top_depths):
+    async def emit(chunk_type, index, payload):
+        publish({"type": chunk_type, "index": index, **payload})
+
+    outcomes = await analyze_outcomes(event_data.get('id'), event_data.get('title', ''), top_depths, emit)
+    result = {
+        "event_data": build_event_summary(event_data),
+        "outcomes": list(outcomes)
+    }
+    store_analysis(event_data.get('id'), result)
+    return result
+
+def _join_analysis(event_data, top_depths):
+    key = (str(event_data.get('id')), tuple(depth['outcome'] for depth in top_depths))
+    return _analysis_flights.join(key, _run_analysis, event_data, top_depths)
+
+# --- Result Builders ---
+
+def build_event_summary(event_data):
+    return {
+        "id": event_data.get('id'),
+        "slug": event_data.get('slug', ''),
+        "title": event_data.get('title'),
+        "description": event_data.get('description'),
+        "volume": event_data.get('volumeNum', 0),
+        "liquidity": event_data.get('liquidityNum', 0)
+    }
+
+def build_liquidity_result(depth):
+    return {
+        "amount": depth['liquidity'],
+        "score": depth['liquidity_score'],
+        "level": depth['liquidity_level'],
+        "reasoning": depth['reasoning'],
+        "execution": depth.get('order_book')
+    }
+
+def build_news_result(news_data):
+    result = {
+        "articles_count": len(news_data.get('articles', [])),
+        "articles": news_data.get('articles', [])[:5],  # Include top 5 articles
+        "query_used": news_data.get('query_used', '')
+    }
+    if news_data.get('stale'):
+        result["stale"] = True  # Cached articles, NewsAPI was throttled or down
+    return result
+
+def build_outcome_result(depth, news_data, news_sentiment, final_summary):
+    """
+    Bundles the depth, news and Claude results for one outcome into the
+    shape returned by /api/event/{event_id}/analysis.
+    """
+    return {
+        "outcome_name": depth['outcome'],
+        "current_price": depth['current_price'],
+        "liquidity": build_liquidity_result(depth),
+        "news": {
+            "score": news_sentiment.get('score', 0),
+            "probability_assessment": news_sentiment.get('probability_assessment', 'Unknown'),
+            "reasoning": news_sentiment.get('reasoning', 'No analysis available'),
+            **build_news_result(news_data)
+        },
+        "final_summary": final_summary.get('summary', 'No summary available')
+    }
+
+# --- Main Pipeline ---
+
+async def prepare_event_analysis(event_id):
+    """
+    Fetches the event once (shared with market depth) and picks the top
+    outcomes by liquidity, with their order books. Gamma and CLOB work
+    only - no NewsAPI or Claude calls.
+
+    Returns:
+        (event_data, top_depths)
+
+    Raises:
+        HTTPException(404) if the event has no market data
+        httpx.HTTPError if the Gamma event fetch fails
+    """
+    # 1. Get event data (cached briefly and shared with /api/event)
+    event_data = await get_event_async(event_id)
+
+    # 2. Market depth from the same payload - no second Gamma fetch - plus
+    # the order books of the top outcomes
+    depth_data = await get_event_market_depth_async(event_id, event_data=event_data, limit=TOP_OUTCOMES)
+
+    if not depth_data:
+        raise HTTPException(status_code=404, detail="No market data found for this event")
+
+    return event_data, depth_data
+
+async def run_event_analysis(event_id, use_cache=True):
+    """
+    Analyzes the top outcomes in parallel (or in one batched Claude call).
+    Total latency is roughly that of the slowest outcome instead of the sum
+    of all of them. A cached (e.g. pre-warmed) result is returned when
+    available unless use_cache is False; fresh results are always stored.
+
+    Raises:
+        HTTPException(404) if the event has no market data
+        httpx.HTTPError if the Gamma event fetch fails
+    """
+    if use_cache:
+        cached = get_cached_analysis(event_id)
+        if cached is not None:
+            return cached
+
+    with metrics.timed("analysis_prepare"):
+        event_data, top_depths = await prepare_event_analysis(event_id)
+
+    # 3. Analyze the top outcomes by liquidity (shared with concurrent
+    # requests for the same event, streamed or not); the result is stored
+    flight = _join_analysis(event_data, top_depths)
+    try:
+        with metrics.timed("analysis_outcomes"):
+            return await asyncio.shield(flight.task)
+    finally:
+        _analysis_flights.leave(flight)
+
+async def stream_event_analysis(event_data, top_depths):
+    """
+    Async generator behind the streaming endpoint. Yields the event and
+    liquidity data first, then each outcome's news, sentiment and summary
+    as separate chunks in completion order, then a final "done" chunk.
+
+    Each chunk is a dict with a "type" and, for outcome chunks, the
+    outcome "index" into the initial liquidity list.
+    """
+    yield {
+        "type": "event",
+        "event_data": build_event_summary(event_data),
+        "outcomes": [
+            {
+                "index": index,
+                "outcome_name": depth['outcome'],
+                "current_price": depth['current_price'],
+                "liquidity": build_liquidity_result(depth)
+            }
+            for index, depth in enumerate(top_depths)
+        ]
+    }
+
+    # Joins a run already in flight for this event (its chunks so far are
+    # replayed first); the run stores the finished analysis itself
+    flight = _join_analysis(event_data, top_depths)
+    try:
+        async for chunk in flight.follow():
+            yield chunk
+
+        task = flight.task
+        if task.cancelled():
+            yield {"type": "done"}
+        elif task.exception():
+            yield {"type": "error", "detail": f"Error analyzing event: {task.exception()}"}
+            yield {"type": "done"}
+        else:
+            yield _done_chunk(task.result())
+    finally:
+        # Client went away mid-stream - the run stops once nobody else follows it
+        _analysis_flights.leave(flight)
+
+def _done_chunk(result):
+    # The ETag /analysis serves for this result, so a client that streamed
+    # it can revalidate with If-None-Match later instead of streaming again
+    return {"type": "done", "etag": make_etag(dumps(result))}
+
+async def stream_cached_analysis(result):
+    """
+    Replays a finished analysis in the streaming chunk format.
+    """
+    yield {
+        "type": "event",
+        "event_data": result["event_data"],
+        "outcomes": [
+            {
+                "index": index,
+                "outcome_name": outcome["outcome_name"],
+                "current_price": outcome["current_price"],
+                "liquidity": outcome["liquidity"]
+            }
+            for index, outcome in enumerate(result["outcomes"])
+        ]
+    }
+    for index, outcome in enumerate(result["outcomes"]):
+        # Same chunks as a live stream: the news fields, then the sentiment
+        news = dict(outcome["news"])
+        sentiment = {field: news.pop(field) for field in ("score", "probability_assessment", "reasoning")}
+        yield {"type": "news", "index": index, "news": news}
+        yield {"type": "sentiment", "index": index, "sentiment": sentiment}
+        yield {"type": "summary", "index": index, "final_summary": outcome["final_summary"]}
+    yield _done_chunk(result)
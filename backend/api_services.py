@@ -1,24 +1,31 @@
-import requests
+import httpx
 import json
+import os
 from fastapi import HTTPException # Import HTTPException
 
+import event_store
+import http_client
+import metrics
+
 # --- Configuration ---
-GAMMA_API = "https://gamma-api.polymarket.com"
+GAMMA_API = os.getenv("GAMMA_API_URL", "https://gamma-api.polymarket.com")
 CRYPTO_TAG_ID = '21'
 
 # --- Main Helper Function ---
+@metrics.instrumented("gamma_list")
 def fetch_from_polymarket(endpoint: str, params: dict):
     """
     A helper to fetch data from Polymarket and raise FastAPI errors.
     """
     try:
-        response = requests.get(f"{GAMMA_API}{endpoint}", params=params)
-        response.raise_for_status() # Raises HTTPError for bad responses (4xx or 5xx)
+        response = http_client.get(f"{GAMMA_API}{endpoint}", params=params, upstream='gamma')
+        response.raise_for_status() # Raises HTTPStatusError for bad responses (4xx or 5xx)
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPStatusError as e:
         # If the Polymarket API fails, forward the error
-        status_code = e.response.status_code if e.response else 500
-        raise HTTPException(status_code=status_code, detail=f"Error from Polymarket API: {e}")
+        raise HTTPException(status_code=e.response.status_code, detail=f"Error from Polymarket API: {e}")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Error from Polymarket API: {e}")
     except Exception as e:
         # For any other unexpected error
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
@@ -29,6 +36,8 @@ def get_new_events_service(limit=5):
     """
     Fetches the most recently created active events.
     """
+    if event_store.is_ready():
+        return event_store.store.newest(limit)
     params = {
         'closed': 'false',
         'order': 'id',
@@ -43,6 +52,8 @@ def get_trending_events_service(limit=20):
     """
     Fetches the most active events by 24-hour volume.
     """
+    if event_store.is_ready():
+        return event_store.store.top_by_volume(limit)
     params = {
         'closed': 'false',
         'order': 'volume24hr', 
@@ -58,6 +69,8 @@ def get_crypto_events_service(limit=5): # Renamed for clarity
     """
     Fetches the newest events in the 'Crypto' category.
     """
+    if event_store.is_ready():
+        return event_store.store.newest(limit, tag_ids=[CRYPTO_TAG_ID])
     params = {
         'closed': 'false',
         'tag_id': CRYPTO_TAG_ID, # Filter by category
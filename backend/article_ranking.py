@@ -0,0 +1,166 @@
+import hashlib
+import math
+import os
+import re
+from collections import Counter
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+# Estimated Jaccard similarity above which two articles count as copies
+DUPLICATE_THRESHOLD = float(os.getenv("NEWS_DUPLICATE_THRESHOLD", "0.6"))
+# Minimum share of the (weighted) outcome + question terms an article must
+# mention to be sent to Claude. BM25 only orders the articles: its IDF is
+# computed over a handful of results, so absolute scores aren't comparable.
+RELEVANCE_THRESHOLD = float(os.getenv("NEWS_RELEVANCE_THRESHOLD", "0.3"))
+
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'does', 'for', 'from', 'has',
+    'have', 'in', 'is', 'it', 'its', 'no', 'not', 'of', 'on', 'or', 'than', 'that',
+    'the', 'this', 'to', 'was', 'what', 'when', 'which', 'who', 'will', 'with', 'yes'
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def _make_permutations():
+    # Fixed seeds so signatures are stable across restarts
+    permutations = []
+    for i in range(MINHASH_PERMUTATIONS):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'big') % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:], 'big') % _MERSENNE_PRIME
+        permutations.append((a, b))
+    return permutations
+
+_PERMUTATIONS = _make_permutations()
+
+# --- Text Helpers ---
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+def _article_text(article):
+    return f"{article.get('title') or ''} {article.get('description') or ''}"
+
+# --- Near-Duplicate Detection ---
+
+def _shingles(tokens):
+    if len(tokens) < SHINGLE_SIZE:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+def minhash_signature(text):
+    """
+    MinHash signature over word shingles of the text.
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), 'big')
+        for s in _shingles(tokenize(text))
+    ]
+    if not hashes:
+        return None
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+def _estimated_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / MINHASH_PERMUTATIONS
+
+def collapse_duplicates(articles):
+    """
+    Drops syndicated copies: keeps the first article of each group whose
+    title+description shingles are near-identical. Order is preserved.
+    """
+    kept = []
+    signatures = []
+    for article in articles:
+        signature = minhash_signature(_article_text(article))
+        if signature is not None and any(
+            _estimated_similarity(signature, other) >= DUPLICATE_THRESHOLD for other in signatures
+        ):
+            continue
+        kept.append(article)
+        if signature is not None:
+            signatures.append(signature)
+    return kept
+
+# --- Relevance Ranking ---
+
+def bm25_scores(query_tokens, documents):
+    """
+    BM25 score of each tokenized document against the query tokens, with
+    IDF computed over the given documents.
+    """
+    if not documents:
+        return []
+    doc_count = len(documents)
+    avg_length = sum(len(doc) for doc in documents) / doc_count or 1
+    doc_freq = Counter(term for doc in documents for term in set(doc))
+    query_terms = Counter(query_tokens)
+
+    scores = []
+    for doc in documents:
+        term_freq = Counter(doc)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg_length)
+        score = 0.0
+        for term, weight in query_terms.items():
+            tf = term_freq.get(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (doc_count - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += weight * idf * tf * (BM25_K1 + 1) / (tf + length_norm)
+        scores.append(score)
+    return scores
+
+def term_coverage(query_tokens, document):
+    """
+    Share of the weighted query terms that appear in the tokenized document.
+    """
+    query_terms = Counter(query_tokens)
+    present = set(document)
+    total = sum(query_terms.values())
+    return sum(w for term, w in query_terms.items() if term in present) / total if total else 0.0
+
+def rank_articles(articles, outcome_name, market_question, max_articles=10):
+    """
+    Collapses near-duplicate articles, drops those that cover less than
+    RELEVANCE_THRESHOLD of the outcome and market question terms, and ranks
+    the rest by BM25. An empty result means nothing is worth sending to Claude.
+    """
+    unique = collapse_duplicates(articles)
+    if not unique:
+        return []
+
+    # The outcome name counts double - it's what the analysis is about
+    outcome_tokens = [t for t in tokenize(outcome_name) if t not in STOP_WORDS]
+    question_tokens = [t for t in tokenize(market_question) if t not in STOP_WORDS]
+    query_tokens = outcome_tokens * 2 + question_tokens
+    if not query_tokens:
+        return unique[:max_articles]
+
+    documents = [tokenize(_article_text(a)) for a in unique]
+    relevant = [i for i, doc in enumerate(documents) if term_coverage(query_tokens, doc) >= RELEVANCE_THRESHOLD]
+    scores = bm25_scores(query_tokens, [documents[i] for i in relevant])
+    ranked = sorted(zip(scores, relevant), key=lambda pair: (-pair[0], pair[1]))
+    return [unique[i] for _, i in ranked][:max_articles]
+
+def count_naming_outcome(articles, outcome_name):
+    """
+    Number of articles whose title or description contains every term of
+    the outcome name - coverage that is clearly about the outcome.
+    """
+    outcome_tokens = [t for t in tokenize(outcome_name) if t not in STOP_WORDS]
+    if not outcome_tokens:
+        return 0
+    return sum(term_coverage(outcome_tokens, tokenize(_article_text(a))) >= 1.0 for a in articles)
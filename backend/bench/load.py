@@ -0,0 +1,124 @@
+"""
+Closed-loop load driver: `concurrency` workers send requests back to back
+until `requests` have completed, per scenario and concurrency level.
+
+Against any running backend, from backend/:
+    python -m bench.load --base-url http://127.0.0.1:8000 --concurrency 1,8
+
+bench/run.py starts the backend against the upstream stub and calls this.
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+
+import httpx
+
+# Scenario -> path; analysis requests cycle through the given event ids
+SCENARIOS = {
+    'analysis': '/api/event/{event_id}/analysis',
+    'tech': '/api/tech-events',
+    'trending': '/api/trending-events',
+    'sports': '/api/sports-events'
+}
+REQUEST_TIMEOUT = 300  # A cold analysis waits on several upstream round trips
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values), max(1, math.ceil(fraction * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    completed = len(latencies) + errors
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 1)
+
+    return {
+        "requests": completed,
+        "errors": errors,
+        "error_rate": round(errors / completed, 4) if completed else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1] if latencies else None)
+    }
+
+async def run_level(client, scenario, concurrency, requests, event_ids):
+    """
+    Runs one scenario at one concurrency level. Latency percentiles and
+    throughput cover successful (2xx) responses; the rest count as errors.
+    """
+    path = SCENARIOS[scenario]
+    next_index = 0
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            url = path.format(event_id=event_ids[index % len(event_ids)]) if event_ids else path
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                ok = response.is_success
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+async def run_load(base_url, scenarios, concurrency_levels, requests, event_ids, log=print):
+    """
+    Runs every scenario at every concurrency level, one after another.
+    Returns {scenario: {concurrency: summary}}.
+    """
+    limits = httpx.Limits(max_connections=max(concurrency_levels), max_keepalive_connections=max(concurrency_levels))
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        for scenario in scenarios:
+            if scenario == 'analysis' and not event_ids:
+                raise ValueError("The analysis scenario needs event ids")
+            results[scenario] = {}
+            for concurrency in concurrency_levels:
+                summary = await run_level(client, scenario, concurrency, requests, event_ids)
+                results[scenario][str(concurrency)] = summary
+                log(f"{scenario:>9} c={concurrency:<3} {summary['throughput_rps']:>8} req/s  "
+                    f"p50 {summary['p50_ms']} ms  p95 {summary['p95_ms']} ms  p99 {summary['p99_ms']} ms  "
+                    f"errors {summary['errors']}")
+    return results
+
+def parse_list(value, cast=str):
+    return [cast(item.strip()) for item in value.split(',') if item.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load driver for the Horizon backend")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", default=','.join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario and concurrency level")
+    parser.add_argument("--event-ids", default="", help="comma-separated event ids for the analysis scenario")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load(
+        args.base_url, parse_list(args.scenarios), parse_list(args.concurrency, int),
+        args.requests, parse_list(args.event_ids)
+    ))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
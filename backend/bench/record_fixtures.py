@@ -0,0 +1,214 @@
+"""
+Records the Gamma and NewsAPI responses replayed by stubs/upstream_stub.py.
+
+Run from backend/:
+    python -m bench.record_fixtures            # live Gamma + NewsAPI (needs NEWS_API_KEY)
+    python -m bench.record_fixtures --synthetic  # deterministic offline fixtures
+
+The committed fixtures are the synthetic ones, so benchmark numbers don't
+depend on what happened to be trending when they were recorded. Anthropic
+responses are templates in fixtures/anthropic_messages.json, filled in per
+prompt by the stub.
+"""
+import argparse
+import json
+import os
+import random
+import re
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+GAMMA_EVENTS_PATH = os.path.join(FIXTURES_DIR, "gamma_events.json")
+NEWS_ARTICLES_PATH = os.path.join(FIXTURES_DIR, "news_articles.json")
+
+GAMMA_API = os.getenv("GAMMA_API_URL", "https://gamma-api.polymarket.com")
+NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything")
+NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+
+# Tags the list endpoints query (tech, sports, crypto) plus a catch-all
+TAGS = {
+    '1401': 'Tech', '439': 'AI', '101999': 'Big Tech',
+    '10': 'Sports', '21': 'Crypto', '2': 'Politics'
+}
+
+def _save(path, data):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1)
+    print(f"Wrote {len(data)} records to {path}")
+
+# --- Live Recording ---
+
+def record_live(events_per_tag, news_events):
+    events = {}
+    with httpx.Client(timeout=30) as client:
+        for tag_id in [None, *TAGS]:
+            params = {'closed': 'false', 'order': 'volume24hr', 'ascending': 'false', 'limit': events_per_tag}
+            if tag_id:
+                params['tag_id'] = tag_id
+            response = client.get(f"{GAMMA_API}/events", params=params)
+            response.raise_for_status()
+            for event in response.json():
+                events[str(event['id'])] = event
+        _save(GAMMA_EVENTS_PATH, list(events.values()))
+
+        if not NEWS_API_KEY:
+            print("NEWS_API_KEY not set - keeping the existing news fixtures")
+            return
+        from news_service import _build_event_news_query
+
+        articles = {}
+        ranked = sorted(events.values(), key=lambda e: e.get('volume24hr') or 0, reverse=True)
+        for event in ranked[:news_events]:
+            names = [m.get('groupItemTitle') or m.get('question') or '' for m in event.get('markets') or []]
+            params = {
+                'q': _build_event_news_query(event.get('title', ''), names[:10]),
+                'apiKey': NEWS_API_KEY,
+                'language': 'en',
+                'sortBy': 'publishedAt',
+                'pageSize': 100
+            }
+            response = client.get(NEWS_API_URL, params=params)
+            response.raise_for_status()
+            for article in response.json().get('articles', []):
+                articles[article.get('url')] = article
+        _save(NEWS_ARTICLES_PATH, list(articles.values()))
+
+# --- Synthetic Fixtures ---
+
+SUBJECTS = {
+    '1401': ['OpenAI', 'Nvidia', 'Apple', 'Tesla', 'SpaceX', 'Microsoft', 'Google', 'Meta', 'Amazon', 'Anthropic'],
+    '10': ['Lakers', 'Celtics', 'Warriors', 'Chiefs', 'Eagles', 'Yankees', 'Dodgers', 'Arsenal', 'Liverpool', 'Madrid'],
+    '21': ['Bitcoin', 'Ethereum', 'Solana', 'Dogecoin', 'Cardano', 'Ripple', 'Chainlink', 'Polygon'],
+    '2': ['Senate', 'House', 'Governor', 'Parliament', 'Congress', 'Supreme Court']
+}
+CANDIDATES = [
+    'Alice Carter', 'Brian Nguyen', 'Carla Mendes', 'David Okafor', 'Elena Petrova', 'Farid Haddad',
+    'Grace Liu', 'Hugo Martin', 'Irene Kowalski', 'Jamal Reed', 'Keiko Tanaka', 'Luis Romero'
+]
+TEMPLATES = {
+    '1401': ['Will {s} release a new flagship model by {m}?', 'Which company will {s} partner with in {m}?'],
+    '10': ['Will the {s} win their next championship?', 'Who will lead the {s} in scoring in {m}?'],
+    '21': ['What price will {s} hit in {m}?', 'Will {s} reach a new all-time high by {m}?'],
+    '2': ['Who will win the {s} race in {m}?', 'Which party will control the {s} after {m}?']
+}
+SOURCES = ['Reuters', 'Bloomberg', 'The Verge', 'ESPN', 'CoinDesk', 'Associated Press', 'Financial Times', 'TechCrunch']
+MONTHS = ['November', 'December', 'January', 'February', 'March']
+
+def _prices(rng, count):
+    weights = [rng.random() ** 2 for _ in range(count)]
+    total = sum(weights)
+    return [max(0.001, round(w / total, 3)) for w in weights]
+
+def _market(rng, market_id, question, name, price):
+    liquidity = round(rng.choice([500, 3000, 15000, 60000, 250000]) * (0.5 + rng.random()), 2)
+    spread = rng.choice([0.001, 0.01, 0.02, 0.05])
+    market = {
+        "id": str(market_id),
+        "question": question,
+        "slug": re.sub(r'[^a-z0-9]+', '-', question.lower()).strip('-'),
+        "outcomes": json.dumps(["Yes", "No"]),
+        "outcomePrices": json.dumps([f"{price:.3f}", f"{1 - price:.3f}"]),
+        "liquidity": str(liquidity),
+        "liquidityNum": liquidity,
+        "volume24hr": round(liquidity * rng.random() * 2, 2),
+        "bestBid": round(max(0.001, price - spread / 2), 3),
+        "bestAsk": round(min(0.999, price + spread / 2), 3),
+        "clobTokenIds": json.dumps([f"{market_id}1{i}" for i in range(2)]),
+        "active": True,
+        "closed": False
+    }
+    if name:
+        market["groupItemTitle"] = name
+    return market
+
+def _articles(rng, event, names, published_base):
+    keywords = [w for w in re.sub(r'[^\w\s]', '', event['title']).split() if len(w) > 3][:3]
+    articles = []
+    for name in names[:6]:
+        for i in range(rng.randint(2, 5)):
+            source = rng.choice(SOURCES)
+            published = published_base - timedelta(hours=rng.randint(1, 24 * 25))
+            articles.append({
+                "source": {"id": None, "name": source},
+                "author": f"{source} staff",
+                "title": f"{name} {rng.choice(['gains ground', 'faces setback', 'in focus', 'surprises analysts'])} as {' '.join(keywords)} nears",
+                "description": f"{name} and the {' '.join(keywords)} question: what the latest developments mean ({i + 1}).",
+                "url": f"https://news.example.com/{event['id']}/{re.sub(r'[^a-z0-9]+', '-', name.lower())}-{i}",
+                "urlToImage": None,
+                "publishedAt": published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                "content": f"{name} was mentioned in coverage of {event['title']}"
+            })
+    return articles
+
+def build_synthetic(event_count, seed):
+    rng = random.Random(seed)
+    now = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    events, articles = [], []
+    market_id = 500000
+    for index in range(event_count):
+        tag_id = ['1401', '10', '21', '2'][index % 4]
+        subject = rng.choice(SUBJECTS[tag_id])
+        title = rng.choice(TEMPLATES[tag_id]).format(s=subject, m=rng.choice(MONTHS))
+        event_id = str(20000 + index * 7)
+        tags = [{"id": tag_id, "label": TAGS[tag_id], "slug": TAGS[tag_id].lower().replace(' ', '-')}]
+        if tag_id == '1401':
+            extra = rng.choice(['439', '101999'])
+            tags.append({"id": extra, "label": TAGS[extra], "slug": TAGS[extra].lower().replace(' ', '-')})
+
+        # A third of the events are binary, the rest multi-outcome
+        if index % 3 == 0:
+            names = [None]
+            questions = [title]
+        else:
+            names = rng.sample(CANDIDATES, rng.randint(3, 12))
+            questions = [f"Will {name} be the answer to: {title}" for name in names]
+        prices = _prices(rng, len(names)) if len(names) > 1 else [round(rng.uniform(0.05, 0.95), 3)]
+        markets = []
+        for name, question, price in zip(names, questions, prices):
+            market_id += 1
+            markets.append(_market(rng, market_id, question, name, price))
+
+        created = now - timedelta(days=rng.randint(1, 90))
+        event = {
+            "id": event_id,
+            "ticker": re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-'),
+            "slug": re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-'),
+            "title": title,
+            "description": f"This market resolves according to: {title}",
+            "active": True,
+            "closed": False,
+            "createdAt": created.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            "updatedAt": now.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            "liquidity": round(sum(m['liquidityNum'] for m in markets), 2),
+            "volume": round(sum(m['volume24hr'] for m in markets) * 30, 2),
+            "volume24hr": round(sum(m['volume24hr'] for m in markets), 2),
+            "tags": tags,
+            "markets": markets
+        }
+        events.append(event)
+        articles.extend(_articles(rng, event, [n for n in names if n] or [subject], now))
+    return events, articles
+
+def main():
+    parser = argparse.ArgumentParser(description="Record benchmark fixtures")
+    parser.add_argument("--synthetic", action="store_true", help="generate deterministic offline fixtures")
+    parser.add_argument("--events", type=int, default=48, help="synthetic events / live events per tag")
+    parser.add_argument("--news-events", type=int, default=20, help="live events to record news for")
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        events, articles = build_synthetic(args.events, args.seed)
+        _save(GAMMA_EVENTS_PATH, events)
+        _save(NEWS_ARTICLES_PATH, articles)
+    else:
+        record_live(args.events, args.news_events)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Offline benchmark: starts the upstream stub and the backend (pointed at
+the stub) as local uvicorn processes, drives load through bench/load.py
+and compares throughput and p50/p95/p99 latency with bench/baseline.json.
+
+Run from backend/:
+    python -m bench.run                      # compare with the baseline
+    python -m bench.run --update-baseline    # record a new baseline
+    python -m bench.run --profile cold --concurrency 1,4 --error-rate anthropic=0.05
+
+Exits with status 1 when a scenario regresses by more than --tolerance,
+so it can gate changes. Baselines are only comparable on the same
+machine with the same settings; the report notes any setting that differs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from bench.load import REQUEST_TIMEOUT, SCENARIOS, parse_list, run_load
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(BACKEND_DIR, "bench")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_PATH = os.path.join(BENCH_DIR, "results", "latest.json")
+FIXTURE_EVENTS_PATH = os.path.join(BENCH_DIR, "fixtures", "gamma_events.json")
+
+# Backend settings per profile. "warm" is the production configuration;
+# "cold" disables every result cache so each request runs the full pipeline.
+PROFILES = {
+    'warm': {},
+    'cold': {
+        'ANALYSIS_CACHE_TTL': '0',
+        'ANALYSIS_INCREMENTAL': 'false',
+        'CLAUDE_CACHE_TTL': '0',
+        'EVENT_CACHE_TTL': '0',
+        'LIST_CACHE_TTL': '0',
+        'NEWS_CACHE_TTL': '0',
+        'ORDER_BOOK_CACHE_TTL': '0',
+        'EVENT_STORE_ENABLED': 'false'
+    }
+}
+# Regressions gate on these; p99 over a few dozen requests is too noisy
+GATED_METRICS = ('throughput_rps', 'p95_ms')
+
+# --- Processes ---
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _start(module, port, env):
+    # uvicorn 0.24 can fire the keep-alive timer of a reused connection while
+    # the next response is still in flight; requests slower than the default
+    # 5s keep-alive then fail. The load driver reuses connections, so keep
+    # them open for as long as a request may take.
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+         "--timeout-keep-alive", str(REQUEST_TIMEOUT)],
+        cwd=BACKEND_DIR, env=env
+    )
+
+def _wait_until(url, ready=lambda response: response.is_success, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(url, timeout=2)
+            if ready(response):
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+def _stop(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def _parse_upstream_values(value):
+    # "gamma=80,anthropic=1500" -> {'gamma': '80', 'anthropic': '1500'}
+    values = {}
+    for item in parse_list(value):
+        name, _, number = item.partition('=')
+        values[name.strip().lower()] = str(float(number))
+    return values
+
+def _stub_env(latency, error_rate, seed):
+    env = {**os.environ, 'STUB_SEED': str(seed)}
+    for name, value in latency.items():
+        env[f"STUB_{name.upper()}_LATENCY_MS"] = value
+    for name, value in error_rate.items():
+        env[f"STUB_{name.upper()}_ERROR_RATE"] = value
+    return env
+
+def _backend_env(stub_url, profile, workdir):
+    return {
+        **os.environ,
+        'GAMMA_API_URL': stub_url,
+        'NEWS_API_URL': f"{stub_url}/v2/everything",
+        'ANTHROPIC_BASE_URL': stub_url,
+        'CLOB_API_URL': stub_url,
+        'CLAUDE_API_KEY': 'bench',
+        'NEWS_API_KEY': 'bench',
+        'CLAUDE_CACHE_PATH': os.path.join(workdir, "claude_cache.sqlite3"),
+        'EVENT_STORE_PATH': '',
+        'PREWARM_ENABLED': 'false',
+        'LOG_LEVEL': 'WARNING',
+        # The stub has no quota; keep the NewsAPI limiter out of the measurements
+        'NEWS_API_DAILY_LIMIT': '10000000',
+        'NEWS_API_BURST': '10000',
+        **PROFILES[profile]
+    }
+
+def _analysis_event_ids(count):
+    # The highest-volume events, as users would open them from the lists
+    with open(FIXTURE_EVENTS_PATH) as f:
+        events = json.load(f)
+    events.sort(key=lambda event: event.get('volume24hr') or 0, reverse=True)
+    return [str(event['id']) for event in events[:count]]
+
+def run_benchmark(settings):
+    """
+    Runs the whole benchmark for the given settings; returns the report.
+    """
+    stub_port, backend_port = _free_port(), _free_port()
+    stub_url, backend_url = f"http://127.0.0.1:{stub_port}", f"http://127.0.0.1:{backend_port}"
+
+    with tempfile.TemporaryDirectory(prefix="horizon-bench-") as workdir:
+        stub = _start("stubs.upstream_stub:app", stub_port, _stub_env(
+            settings['latency_ms'], settings['error_rate'], settings['seed']
+        ))
+        backend = None
+        try:
+            _wait_until(f"{stub_url}/healthz")
+            backend = _start("main:app", backend_port, _backend_env(stub_url, settings['profile'], workdir))
+            if settings['profile'] == 'warm':
+                # Lists are served from the event store once its first sync is done
+                _wait_until(f"{backend_url}/api/event-store/stats", lambda r: r.is_success and r.json().get('ready'))
+            else:
+                _wait_until(f"{backend_url}/metrics")
+
+            results = asyncio.run(run_load(
+                backend_url, settings['scenarios'], settings['concurrency'],
+                settings['requests'], _analysis_event_ids(settings['analysis_events'])
+            ))
+            upstream_requests = httpx.get(f"{stub_url}/healthz").json()['requests']
+        finally:
+            if backend is not None:
+                _stop(backend)
+            _stop(stub)
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": settings,
+        "upstream_requests": upstream_requests,
+        "results": results
+    }
+
+# --- Baseline Comparison ---
+
+def _delta(current, baseline):
+    if current is None or not baseline:
+        return None
+    return (current - baseline) / baseline
+
+def compare(report, baseline, tolerance):
+    """
+    Per scenario and concurrency: each metric with its relative change
+    against the baseline. Returns (rows, regressions).
+    """
+    rows, regressions = [], []
+    for scenario, levels in report['results'].items():
+        for concurrency, current in levels.items():
+            previous = ((baseline or {}).get('results', {}).get(scenario) or {}).get(concurrency)
+            row = {"scenario": scenario, "concurrency": concurrency, "current": current, "deltas": {}}
+            if previous:
+                for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+                    row['deltas'][metric] = _delta(current.get(metric), previous.get(metric))
+                for metric in GATED_METRICS:
+                    delta = row['deltas'].get(metric)
+                    # Throughput regresses downwards, latency upwards
+                    worse = -delta if metric == 'throughput_rps' and delta is not None else delta
+                    if worse is not None and worse > tolerance:
+                        regressions.append(f"{scenario} c={concurrency}: {metric} {delta:+.0%}")
+                if current.get('error_rate', 0) > previous.get('error_rate', 0) + 0.01:
+                    regressions.append(f"{scenario} c={concurrency}: error rate {current['error_rate']:.1%}")
+            rows.append(row)
+    return rows, regressions
+
+def _changed_settings(report, baseline):
+    current, previous = report['settings'], (baseline or {}).get('settings', {})
+    return [key for key in current if key in previous and current[key] != previous[key]]
+
+def format_report(rows, regressions, changed_settings):
+    def cell(row, metric):
+        value = row['current'].get(metric)
+        delta = row['deltas'].get(metric)
+        text = '-' if value is None else f"{value:g}"
+        return text if delta is None else f"{text} ({delta:+.0%})"
+
+    lines = [f"{'scenario':<10}{'conc':>5}  {'req/s':>16}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}{'errors':>8}"]
+    for row in rows:
+        lines.append(
+            f"{row['scenario']:<10}{row['concurrency']:>5}  {cell(row, 'throughput_rps'):>16}"
+            f"{cell(row, 'p50_ms'):>18}{cell(row, 'p95_ms'):>18}{cell(row, 'p99_ms'):>18}"
+            f"{row['current'].get('errors', 0):>8}"
+        )
+    if changed_settings:
+        lines.append(f"\nNote: settings differ from the baseline ({', '.join(changed_settings)}) - deltas are not comparable")
+    if regressions:
+        lines.append("\nRegressions:")
+        lines.extend(f"  {regression}" for regression in regressions)
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Horizon backend")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="warm")
+    parser.add_argument("--scenarios", default=','.join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=48, help="requests per scenario and concurrency level")
+    parser.add_argument("--analysis-events", type=int, default=8, help="distinct events the analysis scenario cycles through")
+    parser.add_argument("--latency", default="", help="per-upstream latency in ms, e.g. gamma=80,anthropic=2500")
+    parser.add_argument("--error-rate", default="", help="per-upstream error rate, e.g. newsapi=0.05")
+    parser.add_argument("--seed", type=int, default=21)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run as the new baseline")
+    args = parser.parse_args()
+
+    settings = {
+        "profile": args.profile,
+        "scenarios": parse_list(args.scenarios),
+        "concurrency": parse_list(args.concurrency, int),
+        "requests": args.requests,
+        "analysis_events": args.analysis_events,
+        "latency_ms": _parse_upstream_values(args.latency),
+        "error_rate": _parse_upstream_values(args.error_rate),
+        "seed": args.seed
+    }
+    report = run_benchmark(settings)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    rows, regressions = compare(report, baseline, args.tolerance)
+    print()
+    print(format_report(rows, regressions, _changed_settings(report, baseline)))
+    print(f"\nReport written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif baseline is None:
+        print("No baseline to compare with - run with --update-baseline to record one")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
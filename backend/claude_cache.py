@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# --- Configuration ---
+CLAUDE_CACHE_PATH = os.getenv(
+    "CLAUDE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "claude_cache.sqlite3")
+)
+CLAUDE_CACHE_TTL = float(os.getenv("CLAUDE_CACHE_TTL", "21600"))  # 6 hours
+CLAUDE_CACHE_MAX_ENTRIES = int(os.getenv("CLAUDE_CACHE_MAX_ENTRIES", "5000"))
+
+# Bump when prompts change so old results aren't reused
+CACHE_VERSION = 2  # 2: budgeted prompts with a cached system prefix
+
+_conn = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+# --- Connection ---
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CLAUDE_CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS claude_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_claude_cache_access ON claude_cache(last_access)")
+        _conn.commit()
+    return _conn
+
+# --- Keys ---
+
+def _normalize_text(value):
+    return ' '.join(str(value or '').split()).lower()
+
+def make_key(kind, **inputs):
+    """
+    Content-addressed key: a hash of the call kind, model and normalized inputs.
+    Identical inputs always map to the same key regardless of dict order.
+    """
+    payload = json.dumps(
+        {"v": CACHE_VERSION, "kind": kind, "inputs": inputs},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def sentiment_key(model, news_articles, outcome_name, market_question):
+    """
+    Key for analyze_news_sentiment: outcome, market question and the
+    titles/URLs of the articles that go into the prompt.
+    """
+    articles = [
+        (_normalize_text(a.get('title')), (a.get('url') or '').strip())
+        for a in news_articles[:10]
+    ]
+    return make_key(
+        "sentiment",
+        model=model,
+        outcome=_normalize_text(outcome_name),
+        market_question=_normalize_text(market_question),
+        articles=articles
+    )
+
+def triage_key(model, news_articles, outcome_name, market_question):
+    """
+    Key for one outcome's triage decision: the same inputs as the sentiment.
+    """
+    return make_key("triage", sentiment=sentiment_key(model, news_articles, outcome_name, market_question))
+
+def summary_key(model, outcome_name, news_analysis, depth_analysis):
+    """
+    Key for generate_final_summary: outcome, the sentiment result and the
+    liquidity fields.
+    """
+    return make_key(
+        "summary",
+        model=model,
+        outcome=_normalize_text(outcome_name),
+        score=news_analysis.get('score', 0),
+        probability=news_analysis.get('probability_assessment', 'Unknown'),
+        reasoning=_normalize_text(news_analysis.get('reasoning')),
+        liquidity_score=depth_analysis.get('liquidity_score', 0),
+        liquidity_level=depth_analysis.get('liquidity_level', 'Unknown'),
+        liquidity_reasoning=_normalize_text(depth_analysis.get('reasoning'))
+    )
+
+def batch_outcome_key(model, outcome_name, market_question, news_articles, depth_analysis):
+    """
+    Key for one outcome of a batched event analysis: the sentiment inputs
+    plus the liquidity fields, since the batch returns sentiment and summary together.
+    """
+    return make_key(
+        "batch",
+        sentiment=sentiment_key(model, news_articles, outcome_name, market_question),
+        liquidity_score=depth_analysis.get('liquidity_score', 0),
+        liquidity_level=depth_analysis.get('liquidity_level', 'Unknown'),
+        liquidity_reasoning=_normalize_text(depth_analysis.get('reasoning'))
+    )
+
+# --- Get / Put ---
+# SQLite calls block, so async code uses the a* variants, which run them on
+# a worker thread. A batch of lookups or writes shares one transaction.
+
+def get_many(keys):
+    """
+    Cached results for the keys, in order; None for missing or expired ones.
+    """
+    now = time.time()
+    results = [None] * len(keys)
+    try:
+        with _lock:
+            conn = _get_conn()
+            hits, expired = [], []
+            for index, key in enumerate(keys):
+                row = conn.execute(
+                    "SELECT value, created_at FROM claude_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or now - row[1] >= CLAUDE_CACHE_TTL:
+                    if row is not None:
+                        expired.append((key,))
+                    _stats["misses"] += 1
+                    metrics.record_cache("claude", hit=False)
+                    continue
+                results[index] = row[0]
+                hits.append((now, key))
+                _stats["hits"] += 1
+                metrics.record_cache("claude", hit=True)
+            if expired:
+                conn.executemany("DELETE FROM claude_cache WHERE key = ?", expired)
+            if hits:
+                conn.executemany("UPDATE claude_cache SET last_access = ? WHERE key = ?", hits)
+            if expired or hits:
+                conn.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"Claude cache read error: {e}")
+        return [None] * len(keys)
+    return [None if value is None else json.loads(value) for value in results]
+
+def get(key):
+    """
+    Returns the cached result for a key, or None if missing or expired.
+    """
+    return get_many([key])[0]
+
+def put_many(items):
+    """
+    Stores (key, result) pairs and evicts the least recently used entries
+    over the size bound.
+    """
+    if not items:
+        return
+    now = time.time()
+    try:
+        with _lock:
+            conn = _get_conn()
+            conn.executemany(
+                "INSERT OR REPLACE INTO claude_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value), now, now) for key, value in items]
+            )
+            count = conn.execute("SELECT COUNT(*) FROM claude_cache").fetchone()[0]
+            if count > CLAUDE_CACHE_MAX_ENTRIES:
+                conn.execute(
+                    "DELETE FROM claude_cache WHERE key IN ("
+                    "SELECT key FROM claude_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - CLAUDE_CACHE_MAX_ENTRIES,)
+                )
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"Claude cache write error: {e}")
+
+def put(key, value):
+    """
+    Stores a result (see put_many).
+    """
+    put_many([(key, value)])
+
+async def aget_many(keys):
+    return await asyncio.to_thread(get_many, keys)
+
+async def aget(key):
+    return (await aget_many([key]))[0]
+
+async def aput_many(items):
+    await asyncio.to_thread(put_many, items)
+
+async def aput(key, value):
+    await aput_many([(key, value)])
+
+def get_stats():
+    """
+    Hit/miss counters since startup plus the current entry count.
+    """
+    with _lock:
+        try:
+            entries = _get_conn().execute("SELECT COUNT(*) FROM claude_cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 3) if total else 0.0,
+        "entries": entries,
+        "max_entries": CLAUDE_CACHE_MAX_ENTRIES,
+        "ttl_seconds": CLAUDE_CACHE_TTL
+    }
@@ -1,32 +1,84 @@
+import logging
 import os
+import time
 from dotenv import load_dotenv
 import json
 
+import claude_cache
+import metrics
+import prompt_builder
+from http_client import UPSTREAM_TIMEOUTS, upstream_slot
+from singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 # Try to import Anthropic, but make it optional
 try:
-    from anthropic import Anthropic
+    from anthropic import AsyncAnthropic
     api_key = os.getenv("CLAUDE_API_KEY")
     if not api_key:
-        print("Warning: CLAUDE_API_KEY not found in environment")
-        client = None
+        logger.warning("CLAUDE_API_KEY not found in environment")
+        async_client = None
         CLAUDE_AVAILABLE = False
     else:
-        client = Anthropic(api_key=api_key)
+        # The SDK pools its own connections and retries; we only set timeouts
+        async_client = AsyncAnthropic(api_key=api_key, timeout=UPSTREAM_TIMEOUTS['anthropic'])
         CLAUDE_AVAILABLE = True
-        print("Claude AI client initialized successfully")
+        logger.info("Claude AI client initialized successfully")
 except Exception as e:
-    print(f"Warning: Claude AI not available: {e}")
-    client = None
+    logger.warning(f"Claude AI not available: {e}")
+    async_client = None
     CLAUDE_AVAILABLE = False
 
-def analyze_news_sentiment(news_articles, outcome_name, market_question):
+
+# --- Model Tiers ---
+# A small, fast model triages each outcome's news for relevance first; only
+# outcomes it can't confidently rule out go to the full model for scored
+# sentiment and summaries. The rest get a templated result.
+CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-sonnet-4-20250514")
+CLAUDE_TRIAGE_MODEL = os.getenv("CLAUDE_TRIAGE_MODEL", "claude-3-5-haiku-20241022")
+CLAUDE_TRIAGE_ENABLED = os.getenv("CLAUDE_TRIAGE_ENABLED", "true").lower() in ("1", "true", "yes")
+# "Not relevant" verdicts below this confidence are escalated anyway
+TRIAGE_MIN_CONFIDENCE = float(os.getenv("TRIAGE_MIN_CONFIDENCE", "0.7"))
+MODEL_TIERS = {"triage": CLAUDE_TRIAGE_MODEL, "full": CLAUDE_MODEL}
+
+_usage = {"calls": 0}  # Model requests actually sent (cache hits excluded)
+_tier_stats = {tier: {"calls": 0, "errors": 0, "seconds": 0.0} for tier in MODEL_TIERS}
+_triage_stats = {"escalated": 0, "templated": 0, "skipped": 0}
+
+def get_model_call_count():
     """
-    Analyzes news articles using Claude Sonnet 4 with probability assessment.
-    Returns sentiment score, probability, and concise bullet-point reasoning.
+    Number of Claude requests sent since startup. Used for cost budgets.
+    """
+    return _usage["calls"]
+
+def get_tier_stats():
     """
-    if not CLAUDE_AVAILABLE or not client:
+    Requests, errors and average latency per model tier, plus how many
+    triaged outcomes were escalated vs. answered from a template, and how
+    many skipped triage.
+    """
+    tiers = {
+        tier: {
+            "model": MODEL_TIERS[tier],
+            "calls": stats["calls"],
+            "errors": stats["errors"],
+            "avg_seconds": round(stats["seconds"] / stats["calls"], 3) if stats["calls"] else None
+        }
+        for tier, stats in _tier_stats.items()
+    }
+    return {"triage_enabled": CLAUDE_TRIAGE_ENABLED, "tiers": tiers, "triage": dict(_triage_stats)}
+
+# --- Prompt Helpers ---
+
+def _precheck_sentiment(news_articles, outcome_name):
+    """
+    Returns a canned sentiment result when Claude can't or shouldn't be called,
+    or None when the articles should go to the model.
+    """
+    if not CLAUDE_AVAILABLE or not async_client:
         return {
             "score": 0,
             "probability_assessment": "Unknown",
@@ -34,93 +86,155 @@ def analyze_news_sentiment(news_articles, outcome_name, market_question):
         }
     
     if not news_articles or len(news_articles) == 0:
-        print(f"No articles for '{outcome_name}'")
+        logger.debug(f"No articles for '{outcome_name}'")
         return {
             "score": 0,
             "probability_assessment": "Insufficient data",
             "reasoning": "No relevant news found"
         }
     
-    print(f"Analyzing {len(news_articles)} articles for '{outcome_name}'")
-    
-    news_text = "\n\n".join([
-        f"Title: {article.get('title', 'N/A')}\nDescription: {article.get('description', 'N/A')}\nSource: {article.get('source', 'N/A')}"
-        for article in news_articles[:10]
-    ])
-    
-    prompt = f"""Analyze news for prediction market outcome.
-
-MARKET: "{market_question}"
-OUTCOME: "{outcome_name}"
+    return None
 
-NEWS:
-{news_text}
+def build_no_news_result(outcome_name, depth_analysis, reason=None):
+    """
+    Templated (sentiment, summary) for an outcome with no relevant news,
+    built locally so no model call is needed. `reason` is the triage
+    model's note when it ruled the outcome's articles out.
+    """
+    level = depth_analysis.get('liquidity_level', 'Unknown')
+    score = depth_analysis.get('liquidity_score', 0)
+    if score <= 10:
+        recommendation = "Avoid due to low liquidity"
+    else:
+        recommendation = "Wait for news before betting"
+    
+    sentiment = {
+        "score": 0,
+        "probability_assessment": "Insufficient data",
+        "reasoning": f"No relevant news found ({reason})" if reason else "No relevant news found"
+    }
+    news_line = f"No coverage relevant to {outcome_name}" if reason else f"No recent coverage of {outcome_name}"
+    summary = {
+        "summary": (
+            "• Probability: Insufficient data\n"
+            "• Signal: Neutral - no relevant news\n"
+            f"• News: {news_line}\n"
+            f"• Liquidity: {level} ({score}/100)\n"
+            f"• Recommendation: {recommendation}"
+        )
+    }
+    return sentiment, summary
 
-TASK:
-1. Check if news is relevant to "{outcome_name}"
-2. If NO → score: 0, probability: "Insufficient data"
-3. If YES → Assess probability and score
+def _request_parts(call, prompt):
+    """
+    messages.create() arguments for a built prompt; records its estimated size.
+    """
+    metrics.record_prompt_tokens(call, prompt['estimated_tokens'])
+    if prompt['articles_dropped']:
+        logger.debug(f"{call} prompt: dropped {prompt['articles_dropped']} articles to fit the token budget")
+    return {"system": prompt['system'], "messages": prompt['messages']}
 
-PROBABILITY LEVELS:
-- "Very High" (70-100%): Strong evidence outcome will happen
-- "High" (55-70%): Good evidence favoring outcome
-- "Moderate" (45-55%): Mixed/unclear
-- "Low" (30-45%): Evidence suggests unlikely
-- "Very Low" (0-30%): Strong evidence against
-- "Insufficient data": No relevant news
+def _record_tier_call(tier, seconds, failed):
+    stats = _tier_stats[tier]
+    stats["calls"] += 1
+    stats["seconds"] += seconds
+    if failed:
+        stats["errors"] += 1
+    metrics.CLAUDE_TIER_SECONDS.observe(seconds, tier=tier)
 
-SCORE (-100 to +100):
-- Positive: News makes outcome MORE likely
-- Negative: News makes outcome LESS likely
-- Zero: No relevant news
+async def _create_message_async(tier, call, prompt, max_tokens):
+    """
+    Sends a built prompt to the tier's model, within the shared Anthropic
+    concurrency limit; records calls, latency and usage.
+    """
+    _usage["calls"] += 1
+    async with upstream_slot('anthropic'):
+        started = time.perf_counter()
+        failed = True
+        try:
+            message = await async_client.messages.create(
+                model=MODEL_TIERS[tier],
+                max_tokens=max_tokens,
+                **_request_parts(call, prompt)
+            )
+            failed = False
+        finally:
+            _record_tier_call(tier, time.perf_counter() - started, failed)
+    metrics.record_claude_usage(call, message)
+    return message
 
-REASONING FORMAT (3 bullets, max 10 words each):
-• Relevancy: [Yes/No + why in 5 words]
-• Evidence: [Top 1-2 facts only]
-• Impact: [Effect on probability in 5 words]
+def _parse_json_response(message):
+    """
+    Extracts the JSON payload from a Claude message, stripping markdown fences.
+    """
+    response_text = message.content[0].text.strip()
+    
+    if response_text.startswith('```'):
+        response_text = response_text.split('```')[1]
+        if response_text.startswith('json'):
+            response_text = response_text[4:]
+        response_text = response_text.strip()
+    
+    return json.loads(response_text, strict=False)
 
-BE EXTREMELY CONCISE. Cut all unnecessary words.
+# --- Sentiment Analysis ---
 
-Return ONLY valid JSON:
-{{
-  "score": <-100 to +100>,
-  "probability_assessment": "<Very High|High|Moderate|Low|Very Low|Insufficient data>",
-  "reasoning": "• Relevancy: [text]
-• Evidence: [text]
-• Impact: [text]"
-}}"""
+@metrics.instrumented("claude_sentiment")
+@single_flight(
+    "claude-sentiment",
+    key=lambda news_articles, outcome_name, market_question: claude_cache.sentiment_key(
+        CLAUDE_MODEL, news_articles, outcome_name, market_question
+    )
+)
+async def analyze_news_sentiment_async(news_articles, outcome_name, market_question):
+    """
+    Analyzes news articles using Claude Sonnet 4 with probability assessment.
+    Returns sentiment score, probability, and concise bullet-point reasoning.
+    Concurrent calls with the same inputs share one model request.
+    """
+    precheck = _precheck_sentiment(news_articles, outcome_name)
+    if precheck:
+        return precheck
+    
+    # Identical articles for the same outcome -> reuse the stored analysis
+    cache_key = claude_cache.sentiment_key(CLAUDE_MODEL, news_articles, outcome_name, market_question)
+    cached = await claude_cache.aget(cache_key)
+    if cached is not None:
+        return cached
+    
+    logger.debug(f"Analyzing {len(news_articles)} articles for '{outcome_name}'")
+    prompt = prompt_builder.build_sentiment_prompt(news_articles, outcome_name, market_question)
 
     try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=250,
-            messages=[{"role": "user", "content": prompt}]
-        )
+        message = await _create_message_async("full", "sentiment", prompt, max_tokens=250)
         
-        response_text = message.content[0].text.strip()
-        print(f"Response: {response_text[:150]}...")
-        
-        if response_text.startswith('```'):
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
-        
-        result = json.loads(response_text, strict=False)
-        print(f"'{outcome_name}': score={result.get('score', 0)}, prob={result.get('probability_assessment', 'Unknown')}")
+        result = _parse_json_response(message)
+        await claude_cache.aput(cache_key, result)
+        logger.debug(f"'{outcome_name}': score={result.get('score', 0)}, prob={result.get('probability_assessment', 'Unknown')}")
         return result
     except json.JSONDecodeError as e:
-        print(f"JSON error: {str(e)}")
+        metrics.STAGE_ERRORS.inc(stage="claude_sentiment")
+        logger.warning(f"JSON error: {str(e)}")
         return {"score": 0, "probability_assessment": "Error", "reasoning": "Error parsing response"}
     except Exception as e:
-        print(f"Error: {str(e)}")
+        metrics.STAGE_ERRORS.inc(stage="claude_sentiment")
+        logger.warning(f"Error: {str(e)}")
         return {"score": 0, "probability_assessment": "Error", "reasoning": "Error analyzing news"}
 
+# --- Final Summary ---
 
-def generate_final_summary(outcome_name, news_analysis, depth_analysis):
+@metrics.instrumented("claude_summary")
+@single_flight(
+    "claude-summary",
+    key=lambda outcome_name, news_analysis, depth_analysis: claude_cache.summary_key(
+        CLAUDE_MODEL, outcome_name, news_analysis, depth_analysis
+    )
+)
+async def generate_final_summary_async(outcome_name, news_analysis, depth_analysis):
     """
     Generates a concise bullet-point summary synthesizing news and liquidity data.
     This is the new "Overall Analysis" - AI as summarizer, not predictor.
+    Concurrent calls with the same inputs share one model request.
     
     Args:
         outcome_name: The outcome being analyzed
@@ -130,64 +244,214 @@ def generate_final_summary(outcome_name, news_analysis, depth_analysis):
     Returns:
         Dict with 'summary' text (bullet points on new lines)
     """
-    if not CLAUDE_AVAILABLE or not client:
+    if not CLAUDE_AVAILABLE or not async_client:
         return {
             "summary": "• AI analysis unavailable. Please configure CLAUDE_API_KEY."
         }
     
-    prompt = f"""Create concise summary for prediction market outcome.
+    cache_key = claude_cache.summary_key(CLAUDE_MODEL, outcome_name, news_analysis, depth_analysis)
+    cached = await claude_cache.aget(cache_key)
+    if cached is not None:
+        return cached
+    
+    prompt = prompt_builder.build_summary_prompt(outcome_name, news_analysis, depth_analysis)
+
+    try:
+        message = await _create_message_async("full", "summary", prompt, max_tokens=300)
+        
+        result = _parse_json_response(message)
+        await claude_cache.aput(cache_key, result)
+        return result
+    except json.JSONDecodeError as e:
+        metrics.STAGE_ERRORS.inc(stage="claude_summary")
+        logger.warning(f"JSON error: {str(e)}")
+        return {"summary": "• Error: Unable to generate summary"}
+    except Exception as e:
+        metrics.STAGE_ERRORS.inc(stage="claude_summary")
+        logger.warning(f"Error: {str(e)}")
+        return {"summary": "• Error: Unable to generate summary"}
+
+# --- Batched Event Analysis ---
+
+def _items_by_index(items, count, call):
+    """
+    Orders a multi-outcome response by each entry's "index" (its outcome's
+    position in the prompt). Returns None unless the indexes are exactly
+    0..count-1, so a reordered or incomplete answer is never misattributed.
+    """
+    try:
+        indexes = [int(item['index']) for item in items]
+    except (KeyError, TypeError, ValueError):
+        logger.warning(f"{call} response has entries without a valid index")
+        return None
+    if sorted(indexes) != list(range(count)):
+        logger.warning(f"{call} response indexes {indexes} don't match the {count} outcomes sent")
+        return None
+    ordered = [None] * count
+    for index, item in zip(indexes, items):
+        ordered[index] = item
+    return ordered
 
-OUTCOME: "{outcome_name}"
+def _split_batch_result(item, articles, outcome_name):
+    """
+    Splits one batched outcome result into the (sentiment, summary) dicts
+    that analyze_news_sentiment_async/generate_final_summary_async return.
+    """
+    sentiment = {
+        "score": item.get('score', 0),
+        "probability_assessment": item.get('probability_assessment', 'Unknown'),
+        "reasoning": item.get('reasoning', 'No analysis available')
+    }
+    # Same canned result as the per-call path when there was nothing to read
+    if not articles:
+        sentiment = _precheck_sentiment(articles, outcome_name) or sentiment
+    summary = {"summary": item.get('summary', 'No summary available')}
+    return sentiment, summary
 
-NEWS ANALYSIS:
-- Score: {news_analysis.get('score', 0)} (-100 to +100)
-- Probability: {news_analysis.get('probability_assessment', 'Unknown')}
-- Reasoning: {news_analysis.get('reasoning', 'N/A')}
+@metrics.instrumented("claude_batch")
+@single_flight("claude-batch")
+async def analyze_event_outcomes_async(event_title, outcome_inputs):
+    """
+    Analyzes every outcome of an event in one Claude request, returning
+    sentiment and summary together instead of two calls per outcome.
+    
+    Args:
+        event_title: The event title
+        outcome_inputs: List of dicts with 'outcome_name', 'market_question',
+            'articles' and 'depth' (a get_event_market_depth_async entry)
+    
+    Returns:
+        List of (sentiment, summary) tuples in input order, or None if the
+        batch failed - callers then fall back to the per-call functions.
+    """
+    if not CLAUDE_AVAILABLE or not async_client or not outcome_inputs:
+        return None
+    
+    results = [None] * len(outcome_inputs)
+    keys = [
+        claude_cache.batch_outcome_key(
+            CLAUDE_MODEL, item['outcome_name'], item['market_question'], item['articles'], item['depth']
+        )
+        for item in outcome_inputs
+    ]
+    for index, cached in enumerate(await claude_cache.aget_many(keys)):
+        if cached is not None:
+            item = outcome_inputs[index]
+            results[index] = _split_batch_result(cached, item['articles'], item['outcome_name'])
+    
+    # Only the outcomes we don't have yet go to the model
+    missing = [index for index, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+    
+    logger.debug(f"Batch analyzing {len(missing)} outcomes for '{event_title}'")
+    prompt = prompt_builder.build_batch_prompt(event_title, [outcome_inputs[index] for index in missing])
+    
+    try:
+        message = await _create_message_async("full", "batch", prompt, max_tokens=550 * len(missing))
+        
+        response = _parse_json_response(message)
+        items = _items_by_index(response.get('outcomes', []), len(missing), "Batch")
+        if items is None:
+            return None
+        
+        for position, item in enumerate(items):
+            index = missing[position]
+            results[index] = _split_batch_result(
+                item, outcome_inputs[index]['articles'], outcome_inputs[index]['outcome_name']
+            )
+        await claude_cache.aput_many([(keys[index], item) for index, item in zip(missing, items)])
+        return results
+    except json.JSONDecodeError as e:
+        metrics.STAGE_ERRORS.inc(stage="claude_batch")
+        logger.warning(f"Batch JSON error: {str(e)}")
+        return None
+    except Exception as e:
+        metrics.STAGE_ERRORS.inc(stage="claude_batch")
+        logger.warning(f"Batch error: {str(e)}")
+        return None
 
-LIQUIDITY:
-- Score: {depth_analysis.get('liquidity_score', 0)} (0-100)
-- Level: {depth_analysis.get('liquidity_level', 'Unknown')}
-- Reasoning: {depth_analysis.get('reasoning', 'N/A')}
+# --- Triage ---
 
-Create 4-5 bullets (max 8 words each):
-• Probability: [assessment]
-• Signal: [positive/negative/neutral + why]
-• News: [key finding]
-• Liquidity: [level + risk]
-• Recommendation: [actionable - use "bet for/against" or "consider/avoid" language]
+def _triage_decision(item):
+    relevant = item.get('relevant', True)
+    if isinstance(relevant, str):
+        relevant = relevant.strip().lower() != 'false'
+    try:
+        confidence = float(item.get('confidence', 0))
+    except (TypeError, ValueError):
+        confidence = 0.0
+    return {"relevant": bool(relevant), "confidence": confidence, "reason": str(item.get('reason') or '')}
 
-BE CONCISE. Use active language like "Bet against", "Consider betting for", "Avoid due to low liquidity", etc.
+def escalation_flags(decisions):
+    """
+    For each triage decision, whether the outcome goes to the full model:
+    anything not confidently ruled out does. Records the split.
+    """
+    flags = [
+        decision is None or decision['relevant'] or decision['confidence'] < TRIAGE_MIN_CONFIDENCE
+        for decision in decisions
+    ]
+    for escalate in flags:
+        outcome = "escalated" if escalate else "templated"
+        _triage_stats[outcome] += 1
+        metrics.CLAUDE_TRIAGE_DECISIONS.inc(decision=outcome)
+    return flags
 
-Return ONLY valid JSON:
-{{
-  "summary": "• Probability: [text]
-• Signal: [text]
-• News: [text]
-• Liquidity: [text]
-• Recommendation: [text]"
-}}"""
+def record_triage_skipped(count):
+    """
+    Counts outcomes escalated without triage (their news clearly names them).
+    """
+    if count:
+        _triage_stats["skipped"] += count
+        metrics.CLAUDE_TRIAGE_DECISIONS.inc(count, decision="skipped")
 
+@metrics.instrumented("claude_triage")
+@single_flight("claude-triage")
+async def triage_outcomes_async(event_title, outcome_inputs):
+    """
+    Asks the triage model whether each outcome's news is relevant to it.
+    
+    Args:
+        event_title: The event title
+        outcome_inputs: List of dicts with 'outcome_name', 'market_question'
+            and 'articles'
+    
+    Returns:
+        One decision dict ('relevant', 'confidence', 'reason') per input, or
+        None if triage is off or failed - callers then escalate every outcome.
+    """
+    if not CLAUDE_TRIAGE_ENABLED or not CLAUDE_AVAILABLE or not async_client or not outcome_inputs:
+        return None
+    
+    keys = [
+        claude_cache.triage_key(CLAUDE_TRIAGE_MODEL, item['articles'], item['outcome_name'], item['market_question'])
+        for item in outcome_inputs
+    ]
+    decisions = await claude_cache.aget_many(keys)
+    
+    missing = [index for index, decision in enumerate(decisions) if decision is None]
+    if not missing:
+        return decisions
+    
+    prompt = prompt_builder.build_triage_prompt(event_title, [outcome_inputs[index] for index in missing])
+    
     try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=300,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        
-        response_text = message.content[0].text.strip()
-        print(f"Summary response: {response_text[:150]}...")
+        message = await _create_message_async("triage", "triage", prompt, max_tokens=60 * len(missing))
         
-        if response_text.startswith('```'):
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
+        items = _items_by_index(_parse_json_response(message).get('outcomes', []), len(missing), "Triage")
+        if items is None:
+            return None
         
-        result = json.loads(response_text, strict=False)
-        return result
+        for position, item in enumerate(items):
+            decisions[missing[position]] = _triage_decision(item)
+        await claude_cache.aput_many([(keys[index], decisions[index]) for index in missing])
+        return decisions
     except json.JSONDecodeError as e:
-        print(f"JSON error: {str(e)}")
-        return {"summary": "• Error: Unable to generate summary"}
+        metrics.STAGE_ERRORS.inc(stage="claude_triage")
+        logger.warning(f"Triage JSON error: {str(e)}")
+        return None
     except Exception as e:
-        print(f"Error: {str(e)}")
-        return {"summary": "• Error: Unable to generate summary"}
+        metrics.STAGE_ERRORS.inc(stage="claude_triage")
+        logger.warning(f"Triage error: {str(e)}")
+        return None
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import http_client
+import metrics
+from singleflight import single_flight
+
+load_dotenv()
+
+# --- Configuration ---
+GAMMA_API = os.getenv("GAMMA_API_URL", "https://gamma-api.polymarket.com")
+
+# How long a fetched event stays fresh. Kept short so prices and liquidity
+# don't drift, but long enough to share one fetch between /api/event,
+# /analysis and market depth for the same page load.
+EVENT_CACHE_TTL = float(os.getenv("EVENT_CACHE_TTL", "30"))
+
+_event_cache = {}  # event_id -> (fetched_at, event_data)
+_cache_lock = threading.Lock()
+
+# --- Cache Helpers ---
+
+def get_cached_event(event_id):
+    """
+    Returns the cached event payload if it is still fresh, otherwise None.
+    """
+    with _cache_lock:
+        entry = _event_cache.get(str(event_id))
+    fresh = entry is not None and time.monotonic() - entry[0] < EVENT_CACHE_TTL
+    metrics.record_cache("event", hit=fresh)
+    return entry[1] if fresh else None
+
+def store_event(event_id, event_data):
+    """
+    Stores an already-fetched event payload so later lookups can reuse it.
+    """
+    with _cache_lock:
+        _event_cache[str(event_id)] = (time.monotonic(), event_data)
+        # Drop expired entries so the cache doesn't grow without bound
+        now = time.monotonic()
+        expired = [k for k, (fetched_at, _) in _event_cache.items() if now - fetched_at >= EVENT_CACHE_TTL]
+        for k in expired:
+            del _event_cache[k]
+
+# --- Fetchers ---
+
+@metrics.instrumented("gamma_event")
+@single_flight("gamma-event", key=lambda event_id: str(event_id))
+async def get_event_async(event_id):
+    """
+    Fetches a single Gamma event, served from the short-TTL cache when
+    possible. Concurrent lookups of the same event share one Gamma request.
+
+    Raises:
+        httpx.HTTPError if the Gamma call fails
+    """
+    cached = get_cached_event(event_id)
+    if cached is not None:
+        return cached
+
+    response = await http_client.aget(f"{GAMMA_API}/events/{event_id}", upstream='gamma')
+    response.raise_for_status()
+    event_data = response.json()
+    store_event(event_id, event_data)
+    return event_data
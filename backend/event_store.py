@@ -0,0 +1,321 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import http_client
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# --- Configuration ---
+GAMMA_API = os.getenv("GAMMA_API_URL", "https://gamma-api.polymarket.com")
+
+EVENT_STORE_ENABLED = os.getenv("EVENT_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+EVENT_SYNC_INTERVAL = float(os.getenv("EVENT_SYNC_INTERVAL", "60"))  # Seconds between syncs
+EVENT_SYNC_PAGE_SIZE = int(os.getenv("EVENT_SYNC_PAGE_SIZE", "500"))
+EVENT_SYNC_MAX_PAGES = int(os.getenv("EVENT_SYNC_MAX_PAGES", "40"))
+# Syncs in between only fetch recently updated events; a full pass also
+# drops events that closed
+EVENT_FULL_SYNC_INTERVAL = float(os.getenv("EVENT_FULL_SYNC_INTERVAL", "600"))
+# Optional SQLite file so the store survives restarts (empty = memory only)
+EVENT_STORE_PATH = os.getenv("EVENT_STORE_PATH", "")
+# The store stops answering if the last successful sync is older than this
+EVENT_STORE_MAX_AGE = float(os.getenv("EVENT_STORE_MAX_AGE", "900"))
+
+class EventStore:
+    """
+    Local copy of all open Gamma events, indexed by id, tag, 24h volume
+    and creation order.
+
+    Writers apply a sync pass (only changed events are replaced) and then
+    rebuild the sorted indexes, so list lookups are a slice (or a short
+    tag-filtered scan) of a pre-sorted list.
+    """
+
+    def __init__(self, path=""):
+        self.path = path
+        self._events = {}  # event_id -> event
+        self._versions = {}  # event_id -> version (updatedAt or content hash)
+        self._by_volume = []  # event ids, highest volume24hr first
+        self._by_created = []  # event ids, newest first
+        self._tags = {}  # tag id -> set of event ids
+        self._lock = threading.Lock()  # guards the data and indexes
+        self._write_lock = threading.Lock()  # serializes sync passes and their writes
+        self._conn = None
+        self.synced_at = None  # wall-clock time of the last successful sync
+        self.full_synced_at = None  # monotonic time of the last full pass
+        self.stats = {"syncs": 0, "full_syncs": 0, "changed": 0, "removed": 0, "errors": 0}
+
+    # --- Persistence ---
+
+    def _get_conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value REAL)")
+            self._conn.commit()
+        return self._conn
+
+    def load(self):
+        """
+        Loads the persisted events, if a backing file is configured.
+        """
+        if not self.path:
+            return
+        conn = self._get_conn()
+        rows = conn.execute("SELECT id, version, data FROM events").fetchall()
+        synced = conn.execute("SELECT value FROM sync_state WHERE key = 'synced_at'").fetchone()
+        with self._lock:
+            for event_id, version, data in rows:
+                self._events[event_id] = json.loads(data)
+                self._versions[event_id] = version
+            self._rebuild_indexes()
+            self.synced_at = synced[0] if synced else None
+        logger.info(f"Event store loaded {len(rows)} events from {self.path}")
+
+    def _persist(self, rows, removed):
+        if not self.path:
+            return
+        conn = self._get_conn()
+        conn.executemany("INSERT OR REPLACE INTO events (id, version, data) VALUES (?, ?, ?)", rows)
+        conn.executemany("DELETE FROM events WHERE id = ?", [(event_id,) for event_id in removed])
+        conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('synced_at', ?)", (self.synced_at,))
+        conn.commit()
+
+    # --- Sync ---
+
+    @staticmethod
+    def _version(event):
+        # Gamma bumps updatedAt on edits; fall back to the content otherwise
+        return event.get('updatedAt') or hashlib.sha256(
+            json.dumps(event, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+
+    def apply(self, events, complete=True):
+        """
+        Applies one sync pass: events whose version changed replace the
+        stored copy, and (if the pass covered every open event) events no
+        longer listed are dropped. Returns (changed, removed) counts.
+        """
+        with self._write_lock:
+            return self._apply(events, complete)
+
+    def _apply(self, events, complete):
+        seen = set()
+        changed = []
+        with self._lock:
+            for event in events:
+                event_id = str(event.get('id'))
+                seen.add(event_id)
+                version = self._version(event)
+                if self._versions.get(event_id) != version:
+                    self._events[event_id] = event
+                    self._versions[event_id] = version
+                    changed.append(event_id)
+
+            removed = [event_id for event_id in self._events if event_id not in seen] if complete else []
+            for event_id in removed:
+                del self._events[event_id]
+                del self._versions[event_id]
+
+            if changed or removed:
+                self._rebuild_indexes()
+            self.synced_at = time.time()
+            rows = [(event_id, self._versions[event_id], self._events[event_id]) for event_id in changed]
+
+        # SQLite writes happen outside the lock so readers aren't blocked
+        self._persist([(i, v, json.dumps(e)) for i, v, e in rows], removed)
+
+        self.stats["changed"] += len(changed)
+        self.stats["removed"] += len(removed)
+        return len(changed), len(removed)
+
+    def _rebuild_indexes(self):
+        events = self._events
+        self._by_volume = sorted(events, key=lambda i: float(events[i].get('volume24hr') or 0), reverse=True)
+        self._by_created = sorted(events, key=_creation_order, reverse=True)
+        tags = {}
+        for event_id, event in events.items():
+            for tag in event.get('tags') or []:
+                tags.setdefault(str(tag.get('id')), set()).add(event_id)
+        self._tags = tags
+
+    # --- Lookups ---
+
+    def is_ready(self):
+        """
+        True once the store holds a sync recent enough to answer from.
+        """
+        return self.synced_at is not None and time.time() - self.synced_at < EVENT_STORE_MAX_AGE
+
+    def get(self, event_id):
+        with self._lock:
+            return self._events.get(str(event_id))
+
+    def _top(self, order, limit, tag_ids=None):
+        with self._lock:
+            ids = getattr(self, order)
+            if tag_ids is None:
+                return [self._events[i] for i in ids[:limit]]
+            wanted = set().union(*(self._tags.get(str(t), set()) for t in tag_ids))
+            result = []
+            for event_id in ids:
+                if event_id in wanted:
+                    result.append(self._events[event_id])
+                    if len(result) >= limit:
+                        break
+            return result
+
+    def top_by_volume(self, limit, tag_ids=None):
+        """
+        Highest 24h volume first, optionally restricted to events with any of the tags.
+        """
+        return self._top('_by_volume', limit, tag_ids)
+
+    def newest(self, limit, tag_ids=None):
+        """
+        Most recently created first, optionally restricted to events with any of the tags.
+        """
+        return self._top('_by_created', limit, tag_ids)
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            "events": len(self._events),
+            "tags": len(self._tags),
+            "ready": self.is_ready(),
+            "synced_at": self.synced_at,
+            "persistent": bool(self.path)
+        }
+
+def _creation_order(event_id):
+    # Gamma ids are increasing integers, which is what order=id sorts by
+    return int(event_id) if event_id.isdigit() else -1
+
+store = EventStore(EVENT_STORE_PATH)
+_task = None
+
+# --- Background Sync ---
+
+async def _fetch_page(order, page):
+    params = {
+        'closed': 'false',
+        'order': order,
+        'ascending': 'false',
+        'limit': EVENT_SYNC_PAGE_SIZE,
+        'offset': page * EVENT_SYNC_PAGE_SIZE
+    }
+    response = await http_client.aget(f"{GAMMA_API}/events", params=params, upstream='gamma')
+    response.raise_for_status()
+    # Pages are up to a few MB of JSON - parse off the event loop
+    return await asyncio.to_thread(response.json)
+
+async def _full_sync():
+    """
+    Pages through all open events and applies them in one pass, dropping
+    stored events no longer listed (unless EVENT_SYNC_MAX_PAGES cut the
+    listing short). Returns (fetched, changed, removed).
+    """
+    events = []
+    complete = False
+    for page in range(EVENT_SYNC_MAX_PAGES):
+        batch = await _fetch_page('id', page)
+        events.extend(batch)
+        if len(batch) < EVENT_SYNC_PAGE_SIZE:
+            complete = True
+            break
+    changed, removed = await asyncio.to_thread(store.apply, events, complete)
+    store.full_synced_at = time.monotonic()
+    store.stats["full_syncs"] += 1
+    return len(events), changed, removed
+
+async def _delta_sync():
+    """
+    Fetches open events most recently updated first, applying each page,
+    and stops at the first page holding an event the store already has at
+    that version - everything after it was updated earlier. Returns
+    (fetched, changed, removed), or None if no unchanged event turned up
+    within EVENT_SYNC_MAX_PAGES.
+    """
+    fetched = changed = 0
+    for page in range(EVENT_SYNC_MAX_PAGES):
+        batch = await _fetch_page('updatedAt', page)
+        page_changed, _ = await asyncio.to_thread(store.apply, batch, False)
+        fetched += len(batch)
+        changed += page_changed
+        if page_changed < len(batch) or len(batch) < EVENT_SYNC_PAGE_SIZE:
+            return fetched, changed, 0
+    return None
+
+async def sync_once():
+    """
+    Applies the open events changed since the last sync to the store,
+    with a full pass when the store is empty or the last one is older
+    than EVENT_FULL_SYNC_INTERVAL.
+    """
+    started = time.perf_counter()
+    full_due = store.full_synced_at is None or time.monotonic() - store.full_synced_at >= EVENT_FULL_SYNC_INTERVAL
+    result = None if full_due else await _delta_sync()
+    kind = "delta"
+    if result is None:
+        result = await _full_sync()
+        kind = "full"
+    store.stats["syncs"] += 1
+    fetched, changed, removed = result
+    logger.info(
+        f"Event store {kind} sync fetched {fetched} events ({changed} changed, {removed} removed) "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+async def _sync_loop():
+    while True:
+        try:
+            await sync_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            store.stats["errors"] += 1
+            logger.warning(f"Event store sync failed, serving last synced data: {e}")
+        await asyncio.sleep(EVENT_SYNC_INTERVAL)
+
+# --- Lifecycle ---
+
+def start_sync():
+    """
+    Loads the persisted store and starts the background sync. Called from
+    the FastAPI lifespan.
+    """
+    global _task
+    if not EVENT_STORE_ENABLED:
+        logger.info("Event store disabled, list endpoints go to Gamma")
+        return
+    try:
+        store.load()
+    except sqlite3.Error as e:
+        logger.warning(f"Event store could not load {EVENT_STORE_PATH}: {e}")
+    _task = asyncio.create_task(_sync_loop())
+
+async def stop_sync():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+
+def is_ready():
+    return EVENT_STORE_ENABLED and store.is_ready()
@@ -0,0 +1,191 @@
+import asyncio
+import contextlib
+import logging
+import os
+import random
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# --- Configuration ---
+
+# Per-upstream timeouts. Connect is kept short so a dead host fails fast;
+# read covers the slowest normal response from that upstream.
+UPSTREAM_TIMEOUTS = {
+    'gamma': httpx.Timeout(10.0, connect=3.0),
+    'newsapi': httpx.Timeout(10.0, connect=3.0),
+    'anthropic': httpx.Timeout(60.0, connect=5.0),
+    'clob': httpx.Timeout(5.0, connect=3.0),
+    'default': httpx.Timeout(10.0, connect=3.0),
+}
+
+# Keep-alive pool shared by all services (limits apply per host)
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=30.0
+)
+
+# Retries for transient errors (connection failures, timeouts, 429/5xx)
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.25"))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# NewsAPI answers 429 once the plan's quota is used up; retrying only spends
+# more requests and delays news_client's fallback to cached articles
+NO_RETRY_STATUS_CODES = {'newsapi': {429}}
+
+# Max in-flight async requests per upstream, so a burst of analyses can't
+# monopolize one upstream (or our quota with it)
+UPSTREAM_CONCURRENCY = {
+    'gamma': int(os.getenv("GAMMA_CONCURRENCY", "10")),
+    'newsapi': int(os.getenv("NEWSAPI_CONCURRENCY", "4")),
+    'anthropic': int(os.getenv("CLAUDE_CONCURRENCY", "4")),
+    'clob': int(os.getenv("CLOB_CONCURRENCY", "10")),
+}
+_upstream_slots = {name: asyncio.Semaphore(limit) for name, limit in UPSTREAM_CONCURRENCY.items()}
+
+# HTTP/2 needs the optional 'h2' package
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_sync_client = None
+_async_client = None
+
+# --- Client Lifecycle ---
+
+def get_sync_client():
+    """
+    Returns the shared connection-pooled sync client, creating it if needed.
+    """
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            limits=POOL_LIMITS,
+            timeout=UPSTREAM_TIMEOUTS['default']
+        )
+    return _sync_client
+
+def get_async_client():
+    """
+    Returns the shared connection-pooled async client, creating it if needed.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=POOL_LIMITS,
+            timeout=UPSTREAM_TIMEOUTS['default']
+        )
+    return _async_client
+
+def startup():
+    """
+    Opens the shared clients. Called from the FastAPI lifespan.
+    """
+    get_sync_client()
+    get_async_client()
+    logger.info(f"HTTP clients ready (http2={'on' if HTTP2_AVAILABLE else 'off'})")
+
+async def shutdown():
+    """
+    Closes the shared clients and their pooled connections.
+    """
+    global _sync_client, _async_client
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+def upstream_slot(upstream):
+    """
+    Semaphore capping concurrent async calls to an upstream. Upstreams
+    without a configured cap get a no-op context.
+    """
+    return _upstream_slots.get(upstream) or contextlib.nullcontext()
+
+# --- Retry Helpers ---
+
+def _backoff_delay(attempt):
+    # Exponential backoff with full jitter
+    return random.uniform(0, RETRY_BACKOFF * (2 ** attempt))
+
+def _record_attempt(upstream, started, response=None, error=None):
+    # Latency of each attempt (excluding time queued for an upstream slot);
+    # transport errors and 4xx/5xx count as errors
+    metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - started, upstream=upstream)
+    if error is not None:
+        metrics.UPSTREAM_ERRORS.inc(upstream=upstream, reason=type(error).__name__)
+    elif response.status_code >= 400:
+        metrics.UPSTREAM_ERRORS.inc(upstream=upstream, reason=str(response.status_code))
+
+def _should_retry(upstream, response, attempt):
+    status = response.status_code
+    return (
+        status in RETRY_STATUS_CODES
+        and status not in NO_RETRY_STATUS_CODES.get(upstream, ())
+        and attempt < MAX_RETRIES
+    )
+
+# --- Request Functions ---
+
+def get(url, params=None, upstream='default'):
+    """
+    GET through the shared sync client with the upstream's timeouts,
+    retrying transient errors with jittered backoff.
+
+    Returns the httpx.Response (callers decide whether to raise_for_status).
+    Raises httpx.TransportError once retries are exhausted.
+    """
+    timeout = UPSTREAM_TIMEOUTS.get(upstream, UPSTREAM_TIMEOUTS['default'])
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            response = get_sync_client().get(url, params=params, timeout=timeout)
+            _record_attempt(upstream, started, response=response)
+            if not _should_retry(upstream, response, attempt):
+                return response
+            logger.warning(f"{upstream} returned {response.status_code}, retrying ({attempt + 1}/{MAX_RETRIES})")
+        except httpx.TransportError as e:
+            _record_attempt(upstream, started, error=e)
+            if attempt >= MAX_RETRIES:
+                raise
+            logger.warning(f"{upstream} request failed ({e!r}), retrying ({attempt + 1}/{MAX_RETRIES})")
+        time.sleep(_backoff_delay(attempt))
+        attempt += 1
+
+async def aget(url, params=None, upstream='default'):
+    """
+    Async version of get() using the shared async client.
+    """
+    timeout = UPSTREAM_TIMEOUTS.get(upstream, UPSTREAM_TIMEOUTS['default'])
+    attempt = 0
+    while True:
+        try:
+            async with upstream_slot(upstream):
+                started = time.perf_counter()
+                response = await get_async_client().get(url, params=params, timeout=timeout)
+            _record_attempt(upstream, started, response=response)
+            if not _should_retry(upstream, response, attempt):
+                return response
+            logger.warning(f"{upstream} returned {response.status_code}, retrying ({attempt + 1}/{MAX_RETRIES})")
+        except httpx.TransportError as e:
+            _record_attempt(upstream, started, error=e)
+            if attempt >= MAX_RETRIES:
+                raise
+            logger.warning(f"{upstream} request failed ({e!r}), retrying ({attempt + 1}/{MAX_RETRIES})")
+        await asyncio.sleep(_backoff_delay(attempt))
+        attempt += 1
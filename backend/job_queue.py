@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from analysis_service import run_event_analysis
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# --- Configuration ---
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "100"))  # Max queued jobs across all events
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "600"))  # Seconds finished jobs stay pollable
+
+_jobs = {}  # job_id -> job dict
+_pending = OrderedDict()  # event_id -> deque of job ids, in round-robin order
+_pending_count = 0
+_work_available = asyncio.Condition()
+_workers = []
+
+# --- Job Helpers ---
+
+def _new_job(event_id):
+    return {
+        "job_id": uuid.uuid4().hex,
+        "event_id": event_id,
+        "status": "queued",
+        "result": None,
+        "error": None,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None
+    }
+
+def _prune_finished():
+    now = time.time()
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job["finished_at"] and now - job["finished_at"] > JOB_RESULT_TTL
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+
+def _take_next_event():
+    """
+    Round-robin across events: takes the event at the front of the queue and
+    all of its waiting jobs, which share one pipeline run.
+    """
+    global _pending_count
+    event_id, job_ids = _pending.popitem(last=False)
+    _pending_count -= len(job_ids)
+    return event_id, list(job_ids)
+
+# --- Public API ---
+
+async def submit_analysis_job(event_id):
+    """
+    Queues an analysis for an event and returns the job.
+
+    Raises:
+        HTTPException(503) if the queue is full
+    """
+    global _pending_count
+    _prune_finished()
+    if _pending_count >= JOB_QUEUE_MAX:
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis queue is full, try again shortly",
+            headers={"Retry-After": "5"}
+        )
+
+    job = _new_job(event_id)
+    _jobs[job["job_id"]] = job
+    async with _work_available:
+        # New events join the back of the round-robin; jobs for an event that
+        # is already waiting ride along with it instead of taking a new turn
+        _pending.setdefault(event_id, deque()).append(job["job_id"])
+        _pending_count += 1
+        _work_available.notify()
+    return job
+
+def get_job(job_id):
+    """
+    Returns a job's status (and result once done).
+
+    Raises:
+        HTTPException(404) for unknown or expired job ids
+    """
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def get_queue_stats():
+    return {
+        "workers": len(_workers),
+        "queued_jobs": _pending_count,
+        "queued_events": len(_pending),
+        "max_queued_jobs": JOB_QUEUE_MAX,
+        "running_jobs": sum(1 for job in _jobs.values() if job["status"] == "running")
+    }
+
+# --- Workers ---
+
+async def _worker(worker_id):
+    while True:
+        async with _work_available:
+            await _work_available.wait_for(lambda: _pending)
+            event_id, job_ids = _take_next_event()
+
+        started_at = time.time()
+        for job_id in job_ids:
+            _jobs[job_id].update(status="running", started_at=started_at)
+
+        try:
+            result, error = await run_event_analysis(event_id), None
+        except HTTPException as e:
+            result, error = None, e.detail
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            result, error = None, f"Error analyzing event: {str(e)}"
+
+        finished_at = time.time()
+        for job_id in job_ids:
+            _jobs[job_id].update(
+                status="error" if error else "done",
+                result=result,
+                error=error,
+                finished_at=finished_at
+            )
+        logger.info(f"[job worker {worker_id}] event {event_id}: {'error' if error else 'done'} ({len(job_ids)} jobs)")
+
+def start_workers():
+    """
+    Starts the worker pool. Called from the FastAPI lifespan.
+    """
+    for worker_id in range(JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker(worker_id)))
+
+async def stop_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,138 @@
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import event_store
+import metrics
+from polymarket_fetcher import (
+    SPORTS_TAG_ID,
+    TECH_TAG_IDS,
+    get_tech_events_service,
+    get_trending_events_service,
+    get_sports_events_service
+)
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# --- Configuration ---
+# Seconds a list is served as fresh. After that it is still served, but a
+# background refresh is started so the next visitor gets newer data.
+LIST_CACHE_TTL = float(os.getenv("LIST_CACHE_TTL", "30"))
+
+class StaleWhileRevalidateCache:
+    """
+    In-memory cache for a loader function, keyed by the loader's arguments.
+
+    - Fresh entries are returned as-is.
+    - Stale entries are returned immediately and refreshed in a background thread.
+    - If a refresh fails, the last good value keeps being served.
+
+    The loader must raise on upstream errors so failures are not cached.
+    Only the very first request for a key waits on the loader.
+    """
+
+    def __init__(self, name, loader, ttl=LIST_CACHE_TTL, fallback=None):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.fallback = fallback
+        self._entries = {}  # key -> (loaded_at, value)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, *args):
+        key = args
+        with self._lock:
+            entry = self._entries.get(key)
+        metrics.record_cache(self.name, hit=entry is not None)
+
+        if entry is None:
+            # Nothing to serve yet - load inline
+            try:
+                return self._load(key)
+            except Exception as e:
+                logger.warning(f"[{self.name}] initial load failed: {e}")
+                return self.fallback
+
+        loaded_at, value = entry
+        if time.monotonic() - loaded_at >= self.ttl:
+            self._refresh_in_background(key)
+        return value
+
+    def warm(self, *args):
+        """
+        Loads a key in the background so the first visitor doesn't wait.
+        """
+        self._refresh_in_background(args)
+
+    def _load(self, key):
+        value = self.loader(*key)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def _refresh_in_background(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._load(key)
+            except Exception as e:
+                # Keep serving the last good value
+                logger.warning(f"[{self.name}] refresh failed, serving stale data: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+# --- Cached List Services ---
+# Answered from the local event store once it has synced; the upstream
+# caches below cover cold starts and a disabled or stale store.
+
+tech_events_cache = StaleWhileRevalidateCache(
+    "tech-events",
+    lambda limit: get_tech_events_service(limit=limit, raise_errors=True),
+    fallback=[]
+)
+trending_events_cache = StaleWhileRevalidateCache(
+    "trending-events",
+    lambda limit: get_trending_events_service(limit=limit, raise_errors=True),
+    fallback=[]
+)
+sports_events_cache = StaleWhileRevalidateCache(
+    "sports-events",
+    lambda limit: get_sports_events_service(limit=limit, raise_errors=True),
+    fallback=[]
+)
+
+def get_cached_tech_events(limit=20):
+    if event_store.is_ready():
+        return event_store.store.top_by_volume(limit, tag_ids=TECH_TAG_IDS)
+    return tech_events_cache.get(limit)
+
+def get_cached_trending_events(limit=20):
+    if event_store.is_ready():
+        return event_store.store.top_by_volume(limit)
+    return trending_events_cache.get(limit)
+
+def get_cached_sports_events(limit=20):
+    if event_store.is_ready():
+        return event_store.store.newest(limit, tag_ids=[SPORTS_TAG_ID])
+    return sports_events_cache.get(limit)
+
+def warm_list_caches(limit=20):
+    """
+    Starts background loads for all home-page lists.
+    """
+    tech_events_cache.warm(limit)
+    trending_events_cache.warm(limit)
+    sports_events_cache.warm(limit)
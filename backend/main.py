@@ -1,21 +1,79 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import json
+import logging
+import os
+import secrets
+import time
+
+from dotenv import load_dotenv
+
+# Configured before the services are imported, since some log at import time
+load_dotenv()
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+# httpx logs every request at INFO; upstream calls are covered by /metrics
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-import requests
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import httpx
 
-from polymarket_fetcher import (
-    get_tech_events_service,
-    get_trending_events_service,
-    get_sports_events_service
+import claude_cache
+import http_client
+import event_store
+import job_queue
+import metrics
+import news_client
+import prewarm
+import profiler
+
+from list_cache import (
+    LIST_CACHE_TTL,
+    get_cached_tech_events,
+    get_cached_trending_events,
+    get_cached_sports_events,
+    warm_list_caches
 )
-from claude_service import (
-    analyze_news_sentiment,
-    generate_final_summary
+from analysis_service import (
+    get_cached_analysis,
+    get_refresh_stats,
+    prepare_event_analysis,
+    run_event_analysis,
+    stream_cached_analysis,
+    stream_event_analysis
 )
-from market_depth_service import get_event_market_depth
-from news_service import get_event_news
+from claude_service import get_tier_stats
+from event_service import EVENT_CACHE_TTL, get_event_async
+from responses import json_response
+from schemas import EventSummary, parse_fields, project_events
+import singleflight
 
 # --- App Setup ---
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Shared connection pools for all upstream calls
+    http_client.startup()
+    # Local copy of all open events, kept current by a background sync
+    event_store.start_sync()
+    # Load the home-page lists in the background so the first visitor doesn't wait
+    warm_list_caches(limit=20)
+    # Background workers for queued analysis jobs
+    job_queue.start_workers()
+    # Periodically compute analyses for the events users are likely to open
+    prewarm.start_prewarm()
+    yield
+    await prewarm.stop_prewarm()
+    await job_queue.stop_workers()
+    await event_store.stop_sync()
+    await http_client.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,35 +81,97 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # The frontend revalidates with If-None-Match, so it needs to read ETag
+    expose_headers=["ETag", "Server-Timing"],
 )
 
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """
+    Records request latency and adds a Server-Timing header with the time
+    spent in each stage (Gamma, NewsAPI, Claude, ...) during the request.
+    Streaming responses only include the stages finished before streaming.
+    """
+    timings = metrics.start_request_timings()
+    profile_token = profiler.request_started(request.url.path)
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    if profile_token is not None:
+        # A profiled request ends when its body has been sent, not at the headers
+        body_iterator = response.body_iterator
+
+        async def profiled_body():
+            try:
+                async for chunk in body_iterator:
+                    yield chunk
+            finally:
+                profiler.request_finished(profile_token)
+
+        response.body_iterator = profiled_body()
+
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        elapsed,
+        method=request.method,
+        path=route.path if route else "unmatched",
+        status=response.status_code
+    )
+    response.headers["Server-Timing"] = metrics.server_timing_header({**timings, "total": elapsed})
+    return response
+
+# Cache-Control per endpoint, matched to how long the data stays fresh.
+# Analyses are always revalidated; their ETag makes that a cheap 304.
+LIST_CACHE_CONTROL = f"public, max-age={int(LIST_CACHE_TTL)}"
+EVENT_CACHE_CONTROL = f"public, max-age={int(EVENT_CACHE_TTL)}"
+ANALYSIS_CACHE_CONTROL = "private, no-cache"
+
+# Admin endpoints need this token in X-Admin-Token; without it they are disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
 # --- API Endpoints ---
 
-@app.get("/api/tech-events")
-def get_tech_events():
-    return get_tech_events_service(limit=20)
+# List endpoints are served from the local event store (or an in-memory
+# stale-while-revalidate cache) and projected to EventSummary. `fields=`
+# (comma-separated Gamma field names) returns those raw fields instead.
+@app.get("/api/tech-events", response_model=List[EventSummary])
+def get_tech_events(request: Request, fields: Optional[str] = None):
+    events = project_events(get_cached_tech_events(limit=20), parse_fields(fields))
+    return json_response(events, request, cache_control=LIST_CACHE_CONTROL)
 
-@app.get("/api/trending-events")
-def get_trending_events():
-    return get_trending_events_service(limit=20)
+@app.get("/api/trending-events", response_model=List[EventSummary])
+def get_trending_events(request: Request, fields: Optional[str] = None):
+    events = project_events(get_cached_trending_events(limit=20), parse_fields(fields))
+    return json_response(events, request, cache_control=LIST_CACHE_CONTROL)
 
-@app.get("/api/sports-events")
-def get_sports_events():
-    return get_sports_events_service(limit=20)
+@app.get("/api/sports-events", response_model=List[EventSummary])
+def get_sports_events(request: Request, fields: Optional[str] = None):
+    events = project_events(get_cached_sports_events(limit=20), parse_fields(fields))
+    return json_response(events, request, cache_control=LIST_CACHE_CONTROL)
 
 @app.get("/api/event/{event_id}")
-def get_event_details(event_id: str):
+async def get_event_details(event_id: str, request: Request):
+    if event_store.is_ready():
+        event = event_store.store.get(event_id)
+        if event is not None:
+            return json_response(event, request, cache_control=EVENT_CACHE_CONTROL)
     try:
-        response = requests.get(f"https://gamma-api.polymarket.com/events/{event_id}")
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return json_response(await get_event_async(event_id), request, cache_control=EVENT_CACHE_CONTROL)
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching event: {str(e)}")
 
 @app.get("/api/event/{event_id}/analysis")
-def get_event_analysis(event_id: str):
+async def get_event_analysis(event_id: str, request: Request):
     """
     Primary analysis endpoint that orchestrates all data gathering and AI analysis.
+    The per-outcome pipelines run concurrently (see analysis_service).
     
     Returns:
         {
@@ -69,77 +189,166 @@ def get_event_analysis(event_id: str):
         }
     """
     try:
-        # 1. Get event data
-        response = requests.get(f"https://gamma-api.polymarket.com/events/{event_id}")
-        response.raise_for_status()
-        event_data = response.json()
-        
-        # 2. Get market depth (factual liquidity scores)
-        depth_data = get_event_market_depth(event_id)
-        
-        if not depth_data:
-            raise HTTPException(status_code=404, detail="No market data found for this event")
-        
-        # 3. Loop through top 3 outcomes
-        outcomes_analysis = []
-        event_title = event_data.get('title', '')
-        
-        for depth in depth_data[:3]:  # Top 3 by liquidity
-            outcome_name = depth['outcome']
-            market_question = depth['market_question']
-            
-            print(f"Analyzing outcome: {outcome_name}")
-            
-            # a. Get news for this specific outcome
-            news_data = get_event_news(event_title, market_question, outcome_name, max_results=10)
-            
-            # b. Analyze news sentiment
-            news_sentiment = analyze_news_sentiment(
-                news_data.get('articles', []),
-                outcome_name,
-                market_question
-            )
-            
-            # c. Generate final summary
-            final_summary = generate_final_summary(
-                outcome_name,
-                news_sentiment,
-                depth
-            )
-            
-            # Bundle everything together
-            outcomes_analysis.append({
-                "outcome_name": outcome_name,
-                "current_price": depth['current_price'],
-                "liquidity": {
-                    "amount": depth['liquidity'],
-                    "score": depth['liquidity_score'],
-                    "level": depth['liquidity_level'],
-                    "reasoning": depth['reasoning']
-                },
-                "news": {
-                    "score": news_sentiment.get('score', 0),
-                    "reasoning": news_sentiment.get('reasoning', 'No analysis available'),
-                    "articles_count": len(news_data.get('articles', [])),
-                    "articles": news_data.get('articles', [])[:5],  # Include top 5 articles
-                    "query_used": news_data.get('query_used', '')
-                },
-                "final_summary": final_summary.get('summary', 'No summary available')
-            })
-        
-        return {
-            "event_data": {
-                "id": event_data.get('id'),
-                "slug": event_data.get('slug', ''),
-                "title": event_data.get('title'),
-                "description": event_data.get('description'),
-                "volume": event_data.get('volumeNum', 0),
-                "liquidity": event_data.get('liquidityNum', 0)
-            },
-            "outcomes": outcomes_analysis
-        }
-        
-    except requests.exceptions.RequestException as e:
+        return json_response(await run_event_analysis(event_id), request, cache_control=ANALYSIS_CACHE_CONTROL)
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching event data: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing event: {str(e)}")
+
+@app.get("/api/event/{event_id}/analysis/stream")
+async def stream_event_analysis_endpoint(event_id: str):
+    """
+    Streaming variant of /analysis as NDJSON (one JSON object per line).
+
+    The first line carries event_data and the liquidity data for the top
+    outcomes; then "news", "sentiment" and "summary" chunks follow for each
+    outcome (identified by "index") as soon as they finish, then "done" (with
+    the ETag /analysis serves for the finished result).
+    """
+    cached = get_cached_analysis(event_id)
+    if cached is not None:
+        chunks = stream_cached_analysis(cached)
+    else:
+        # Resolve the event before streaming so 404/500 are still normal responses
+        try:
+            event_data, top_depths = await prepare_event_analysis(event_id)
+        except HTTPException:
+            raise
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=500, detail=f"Error fetching event data: {str(e)}")
+        chunks = stream_event_analysis(event_data, top_depths)
+
+    async def ndjson():
+        async for chunk in chunks:
+            yield json.dumps(chunk) + "\n"
+
+    return StreamingResponse(
+        ndjson(),
+        media_type="application/x-ndjson",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/event/{event_id}/analysis/jobs", status_code=202)
+async def submit_event_analysis_job(event_id: str):
+    """
+    Queues an analysis to run on the background worker pool.
+    Poll /api/jobs/{job_id} for the status and result.
+    """
+    job = await job_queue.submit_analysis_job(event_id)
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+@app.get("/api/jobs/{job_id}")
+def get_analysis_job(job_id: str):
+    """
+    Status of a queued analysis job; includes the result once it is done.
+    """
+    return job_queue.get_job(job_id)
+
+@app.get("/api/jobs")
+def get_analysis_queue_stats():
+    return job_queue.get_queue_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Latency histograms, error counts, cache hits and Claude token usage in
+    the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/prewarm/status")
+def get_prewarm_status():
+    return prewarm.get_prewarm_status()
+
+@app.get("/api/claude-cache/stats")
+def get_claude_cache_stats():
+    """
+    Hit/miss counters for the persistent Claude result cache.
+    """
+    return claude_cache.get_stats()
+
+@app.get("/api/news/stats")
+def get_news_stats():
+    """
+    NewsAPI cache hits, throttled and stale lookups, and the rate limiter's tokens.
+    """
+    return news_client.get_stats()
+
+@app.get("/api/claude/tier-stats")
+def get_claude_tier_stats():
+    """
+    Calls and average latency per model tier, and the triage escalation split.
+    """
+    return get_tier_stats()
+
+@app.get("/api/analysis/refresh-stats")
+def get_analysis_refresh_stats():
+    """
+    Outcomes that reused their previous Claude results vs. were recomputed.
+    """
+    return get_refresh_stats()
+
+@app.get("/api/event-store/stats")
+def get_event_store_stats():
+    return event_store.store.get_stats()
+
+@app.get("/api/single-flight/stats")
+def get_single_flight_stats():
+    """
+    How many upstream calls ran vs. joined an identical call already in flight.
+    """
+    return singleflight.get_stats()
+
+# --- Admin: Profiling ---
+
+@app.post("/api/admin/profile", dependencies=[Depends(require_admin)])
+def start_profile(
+    seconds: Optional[float] = None,
+    requests: Optional[int] = None,
+    route: str = "/api/event/*/analysis",
+    interval_ms: float = profiler.PROFILER_INTERVAL_MS
+):
+    """
+    Starts the sampling profiler for `seconds`, or for the next `requests`
+    requests whose path matches the `route` glob.
+    """
+    if requests is not None and requests < 1:
+        raise HTTPException(status_code=400, detail="requests must be at least 1")
+    if requests is None and not seconds:
+        raise HTTPException(status_code=400, detail="Give either seconds or requests")
+    try:
+        session = profiler.start(seconds=seconds, requests=requests, route=route if requests else None, interval_ms=interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.report()
+
+@app.get("/api/admin/profile", dependencies=[Depends(require_admin)])
+def get_profile():
+    """
+    Status of the current or last session, with wall vs CPU time per stage.
+    """
+    session = profiler.current()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session")
+    return session.report()
+
+@app.get("/api/admin/profile/collapsed", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+def get_profile_collapsed(include_idle: bool = False):
+    """
+    Samples as collapsed stacks, for flamegraph.pl / speedscope. Blocked
+    threads (e.g. waiting on upstreams) are only included with include_idle.
+    """
+    session = profiler.current()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session")
+    return PlainTextResponse(session.collapsed(include_idle=include_idle))
+
+@app.delete("/api/admin/profile", dependencies=[Depends(require_admin)])
+def stop_profile():
+    session = profiler.stop()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session")
+    return session.report()
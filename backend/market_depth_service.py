@@ -1,7 +1,16 @@
-import requests
+import httpx
 import json
+import logging
 
-GAMMA_API = "https://gamma-api.polymarket.com"
+import numpy as np
+
+import metrics
+
+from event_service import get_event_async
+from order_book_service import compute_execution_metrics, get_order_books_async
+from singleflight import single_flight
+
+logger = logging.getLogger(__name__)
 
 def calculate_liquidity_score(liquidity):
     """
@@ -56,74 +65,150 @@ def get_liquidity_reasoning(liquidity, score):
     else:
         return f"Market has excellent liquidity (${liquidity:,.0f}). Low slippage risk."
 
-def get_event_market_depth(event_id):
+def _token_id(market):
+    # First CLOB token is the outcome's "Yes" side, matching current_price
+    try:
+        token_ids = json.loads(market.get('clobTokenIds') or '[]')
+    except (TypeError, ValueError):
+        return None
+    return token_ids[0] if token_ids else None
+
+def _build_market_depth(market_idx, market, is_multi_outcome, liquidity, score):
+    market_question = market.get('question', f'Market {market_idx + 1}')
+    group_item_title = market.get('groupItemTitle', '')
+    outcomes = json.loads(market.get('outcomes', '["Yes", "No"]'))
+    
+    # For multi-outcome events, use groupItemTitle as the outcome name
+    if is_multi_outcome:
+        outcome_name = group_item_title if group_item_title else market_question
+    else:
+        outcome_name = outcomes[0] if outcomes else 'Yes'
+    
+    level = get_liquidity_level(score)
+    reasoning = get_liquidity_reasoning(liquidity, score)
+    
+    # Get current price
+    prices = json.loads(market.get('outcomePrices', '[0, 0]'))
+    current_price = float(prices[0]) * 100 if prices else 0
+    
+    return {
+        'outcome': outcome_name,
+        'market_question': market_question,
+        'liquidity': round(liquidity, 2),
+        'liquidity_score': score,
+        'liquidity_level': level,
+        'reasoning': reasoning,
+        'current_price': round(current_price, 1),
+        'token_id': _token_id(market),
+        'order_book': None
+    }
+
+# --- Batch Scoring ---
+
+# calculate_liquidity_score's thresholds, for scoring many markets at once
+LIQUIDITY_THRESHOLDS = np.array([1000.0, 10000.0, 100000.0])
+THRESHOLD_SCORES = np.array([10, 30, 70, 95])
+
+def calculate_liquidity_scores(liquidity):
+    """
+    Vectorized calculate_liquidity_score over an array of liquidity values.
+    """
+    liquidity = np.asarray(liquidity, dtype=float)
+    scores = THRESHOLD_SCORES[np.searchsorted(LIQUIDITY_THRESHOLDS, liquidity, side='right')]
+    return np.where(liquidity == 0, 0, scores)
+
+def score_markets(markets, limit=10):
+    """
+    Depth entries for the `limit` most liquid of the given Gamma markets,
+    most liquid first (ties keep market order).
+
+    Liquidity is read into one array, scored with searchsorted and ranked
+    with argpartition; only the selected rows are turned into dicts, so
+    their outcomes/prices JSON is the only JSON parsed.
+    """
+    if not markets or limit <= 0:
+        return []
+    
+    # Check if multi-outcome event
+    is_multi_outcome = len(markets) > 1 and markets[0].get('groupItemTitle')
+    
+    liquidity = np.fromiter(
+        (float(market.get('liquidityNum') or 0) for market in markets),
+        dtype=float,
+        count=len(markets)
+    )
+    scores = calculate_liquidity_scores(liquidity)
+    
+    if limit < len(markets):
+        # Partition finds the k-th largest value; everything tied with it
+        # stays a candidate so ties resolve by market order, not at random
+        kth = liquidity[np.argpartition(-liquidity, limit - 1)[limit - 1]]
+        top = np.flatnonzero(liquidity >= kth)
+    else:
+        top = np.arange(len(markets))
+    top = top[np.lexsort((top, -liquidity[top]))][:limit]
+    
+    return [
+        _build_market_depth(int(i), markets[i], is_multi_outcome, float(liquidity[i]), int(scores[i]))
+        for i in top
+    ]
+
+def _collect_market_depth(event_data, limit):
+    """
+    Depth entries for the `limit` most liquid markets of the event, chosen
+    over all markets so events with dozens of them aren't cut off at an
+    arbitrary position.
+    """
+    markets = event_data.get('markets', [])
+    
+    if not markets:
+        logger.debug("No markets found")
+        return []
+    
+    market_depth_data = score_markets(markets, limit)
+    
+    logger.debug(f"Found market depth data for {len(market_depth_data)} outcomes")
+    return market_depth_data
+
+@metrics.instrumented("market_depth")
+@single_flight(
+    "market-depth",
+    key=lambda event_id, event_data=None, limit=10: (str(event_id), limit)
+)
+async def get_event_market_depth_async(event_id, event_data=None, limit=10):
     """
     Fetches market depth data from Polymarket API and calculates factual liquidity scores.
     This is a pure Python function - NO AI calls.
     
-    Returns a list of outcomes with their liquidity metrics.
+    Args:
+        event_id: The Gamma event id
+        event_data: Optional already-fetched event payload. When given, no
+            Gamma request is made; otherwise the shared event cache is used.
+        limit: Number of outcomes to return (most liquid first)
+    
+    Returns a list of outcomes with their liquidity metrics, plus the CLOB
+    order book of each selected market (fetched in parallel): spread,
+    visible depth and slippage at SLIPPAGE_SIZES under 'order_book' (None
+    when no book is available). Books are only fetched for the `limit`
+    selected markets. Concurrent calls for the same event share one
+    computation and one set of book fetches.
     """
     try:
-        # Get event details
-        event_response = requests.get(f"{GAMMA_API}/events/{event_id}", timeout=10)
-        if event_response.status_code != 200:
-            print(f"Failed to fetch event: {event_response.status_code}")
-            return []
-        
-        event_data = event_response.json()
-        markets = event_data.get('markets', [])
-        
-        if not markets:
-            print("No markets found")
-            return []
-        
-        # Collect market depth data
-        market_depth_data = []
-        
-        # Check if multi-outcome event
-        is_multi_outcome = len(markets) > 1 and markets[0].get('groupItemTitle')
-        
-        for market_idx, market in enumerate(markets[:10]):  # Top 10 outcomes
-            market_question = market.get('question', f'Market {market_idx + 1}')
-            group_item_title = market.get('groupItemTitle', '')
-            outcomes = json.loads(market.get('outcomes', '["Yes", "No"]'))
-            
-            # For multi-outcome events, use groupItemTitle as the outcome name
-            if is_multi_outcome:
-                outcome_name = group_item_title if group_item_title else market_question
-            else:
-                outcome_name = outcomes[0] if outcomes else 'Yes'
-            
-            # Get liquidity from the market
-            liquidity = float(market.get('liquidityNum', 0))
-            
-            # Calculate factual score
-            score = calculate_liquidity_score(liquidity)
-            level = get_liquidity_level(score)
-            reasoning = get_liquidity_reasoning(liquidity, score)
-            
-            # Get current price
-            prices = json.loads(market.get('outcomePrices', '[0, 0]'))
-            current_price = float(prices[0]) * 100 if prices else 0
-            
-            market_depth_data.append({
-                'outcome': outcome_name,
-                'market_question': market_question,
-                'liquidity': round(liquidity, 2),
-                'liquidity_score': score,
-                'liquidity_level': level,
-                'reasoning': reasoning,
-                'current_price': round(current_price, 1)
-            })
-        
-        # Sort by liquidity (highest first)
-        market_depth_data.sort(key=lambda x: x['liquidity'], reverse=True)
+        if event_data is None:
+            try:
+                event_data = await get_event_async(event_id)
+            except httpx.HTTPError as e:
+                logger.warning(f"Failed to fetch event: {e}")
+                return []
         
-        print(f"Found market depth data for {len(market_depth_data)} outcomes")
+        market_depth_data = _collect_market_depth(event_data, limit)
+        books = await get_order_books_async(depth['token_id'] for depth in market_depth_data)
+        for depth in market_depth_data:
+            book = books.get(depth['token_id'])
+            if book is not None:
+                depth['order_book'] = compute_execution_metrics(book)
         return market_depth_data
         
     except Exception as e:
-        print(f"Error in get_event_market_depth: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in get_event_market_depth_async: {e}")
         return []
@@ -0,0 +1,214 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import threading
+import time
+
+import profiler
+
+# --- Metric Types ---
+# Minimal Prometheus-compatible counters and histograms, rendered in the
+# text exposition format by render(). Label values are passed as kwargs.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+
+def _label_key(label_names, labels):
+    return tuple(str(labels.get(name, '')) for name in label_names)
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(label_names, key, extra=()):
+    pairs = list(zip(label_names, key)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(_label_key(self.label_names, labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, entry in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, entry):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', str(bound))])} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', '+Inf')])} {entry[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {entry[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {entry[-1]}")
+        return lines
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# --- Metrics ---
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "horizon_http_request_seconds", "API request latency", ["method", "path", "status"]
+)
+STAGE_SECONDS = Histogram(
+    "horizon_stage_seconds", "Latency of pipeline stages and service calls", ["stage"]
+)
+STAGE_ERRORS = Counter(
+    "horizon_stage_errors_total", "Pipeline stages and service calls that raised", ["stage"]
+)
+UPSTREAM_SECONDS = Histogram(
+    "horizon_upstream_request_seconds", "Latency of individual upstream HTTP requests", ["upstream"]
+)
+UPSTREAM_ERRORS = Counter(
+    "horizon_upstream_errors_total", "Upstream requests that failed or returned a retryable status", ["upstream", "reason"]
+)
+CACHE_REQUESTS = Counter(
+    "horizon_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"]
+)
+NEWS_API_LOOKUPS = Counter(
+    "horizon_newsapi_lookups_total", "NewsAPI queries by outcome (hit/fetched/stale/throttled/error) and priority", ["result", "priority"]
+)
+CLAUDE_TOKENS = Counter(
+    "horizon_claude_tokens_total", "Claude token usage by call and direction", ["call", "direction"]
+)
+CLAUDE_TIER_SECONDS = Histogram(
+    "horizon_claude_tier_request_seconds", "Latency of Claude requests by model tier", ["tier"]
+)
+CLAUDE_TRIAGE_DECISIONS = Counter(
+    "horizon_claude_triage_decisions_total", "Outcomes escalated to the full model, answered from a template, or escalated without triage (skipped)", ["decision"]
+)
+CLAUDE_PROMPT_TOKENS = Histogram(
+    "horizon_claude_prompt_tokens", "Estimated input tokens of each Claude prompt", ["call"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000)
+)
+
+# --- Request-Scoped Timings ---
+# Stage durations of the current request, for the Server-Timing header.
+# Work started from the request (tasks, threads) inherits the dict.
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+def start_request_timings():
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+def server_timing_header(timings):
+    """
+    Server-Timing value: total milliseconds per stage (stages that ran
+    concurrently, e.g. per outcome, are summed).
+    """
+    return ', '.join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+def _record_stage(stage, seconds, failed):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    if failed:
+        STAGE_ERRORS.inc(stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+# --- Instrumentation Helpers ---
+
+@contextlib.contextmanager
+def timed(stage):
+    """
+    Times the block as `stage` (histogram, error count, Server-Timing,
+    and the profiler's per-stage CPU split while a session is running).
+    """
+    started = time.perf_counter()
+    profile_token = profiler.enter_stage(stage)
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        profiler.exit_stage(profile_token, seconds)
+        _record_stage(stage, seconds, failed)
+
+def instrumented(stage):
+    """
+    Decorator version of timed() for sync and async functions.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with timed(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+def record_claude_usage(call, message):
+    """
+    Adds a Claude response's input/output token counts, including input
+    read from or written to the prompt cache.
+    """
+    usage = getattr(message, 'usage', None)
+    if usage is None:
+        return
+    CLAUDE_TOKENS.inc(getattr(usage, 'input_tokens', 0) or 0, call=call, direction="input")
+    CLAUDE_TOKENS.inc(getattr(usage, 'output_tokens', 0) or 0, call=call, direction="output")
+    CLAUDE_TOKENS.inc(getattr(usage, 'cache_read_input_tokens', 0) or 0, call=call, direction="cache_read")
+    CLAUDE_TOKENS.inc(getattr(usage, 'cache_creation_input_tokens', 0) or 0, call=call, direction="cache_write")
+
+def record_prompt_tokens(call, tokens):
+    CLAUDE_PROMPT_TOKENS.observe(tokens, call=call)
@@ -0,0 +1,388 @@
+import asyncio
+import contextlib
+import contextvars
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
+from dotenv import load_dotenv
+
+import http_client
+import metrics
+import singleflight
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# --- Configuration ---
+# Every NewsAPI request goes through here: identical queries are answered
+# from a response cache, and the rest are throttled by a token bucket sized
+# to the plan's quota so hot events can't exhaust it. When no request can
+# be made, the newest cached copy (however old) is served instead.
+NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything")
+NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", "1800"))  # Fresh for 30 minutes
+NEWS_CACHE_STALE_TTL = float(os.getenv("NEWS_CACHE_STALE_TTL", "172800"))  # Kept 2 days as a fallback
+NEWS_CACHE_MAX_ENTRIES = int(os.getenv("NEWS_CACHE_MAX_ENTRIES", "2000"))
+
+# Plan limits: requests per day, and how many may be sent back to back
+NEWS_API_DAILY_LIMIT = int(os.getenv("NEWS_API_DAILY_LIMIT", "100"))  # Developer plan
+NEWS_API_BURST = int(os.getenv("NEWS_API_BURST", "10"))
+# Share of the burst capacity background work (pre-warming) leaves for
+# interactive requests
+NEWS_API_BACKGROUND_RESERVE = float(os.getenv("NEWS_API_BACKGROUND_RESERVE", "0.5"))
+# How long a request queues for a token before falling back to the cache
+NEWS_API_MAX_WAIT = float(os.getenv("NEWS_API_MAX_WAIT", "2"))
+NEWS_API_BACKGROUND_MAX_WAIT = float(os.getenv("NEWS_API_BACKGROUND_MAX_WAIT", "30"))
+
+# Left out of cache keys: the API key, the page size (a larger cached page
+# answers a smaller request) and the `from` date, which moves every day
+_UNCACHED_PARAMS = {'apiKey', 'from', 'pageSize'}
+# NewsAPI error codes that mean the quota is used up
+_QUOTA_ERROR_CODES = {'rateLimited', 'apiKeyExhausted'}
+
+# --- Priority ---
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+class Priority:
+    """
+    Mutable priority shared by a piece of work and everything it starts,
+    so it can be raised while the work is already queued (see _promote_flight).
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+# Priority of the NewsAPI requests made by the current task; tasks and
+# to_thread() calls inherit it. Unset means interactive.
+_priority = contextvars.ContextVar("news_priority", default=None)
+
+def current_priority():
+    cell = _priority.get()
+    return INTERACTIVE if cell is None else cell.value
+
+@contextlib.contextmanager
+def background_priority():
+    """
+    Runs the enclosed work (e.g. a pre-warm analysis) at background
+    priority: it yields quota to interactive requests and waits longer.
+    """
+    token = _priority.set(Priority(BACKGROUND))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def _promote_flight(context):
+    """
+    Single-flight join hook. A flight runs in the context of the caller
+    that started it, so an interactive request joining a pre-warm flight
+    would otherwise wait at background priority. Raises the flight's
+    priority (and with it the rest of the background work it belongs to)
+    to the joining caller's.
+    """
+    cell = context.get(_priority)
+    priority = current_priority()
+    if cell is not None and priority < cell.value:
+        cell.value = priority
+        bucket.wake()
+
+singleflight.on_join(_promote_flight)
+
+# --- Rate Limiting ---
+
+class _Waiter:
+    __slots__ = ('priority', 'seq', 'event', 'started')
+
+    def __init__(self, priority, seq):
+        self.priority = priority
+        self.seq = seq
+        self.event = asyncio.Event()
+        self.started = time.monotonic()
+
+    def sort_key(self):
+        return (self.priority.value, self.seq)
+
+class TokenBucket:
+    """
+    Token bucket holding up to `capacity` requests, refilled so that no
+    24-hour window exceeds `daily_limit`. Callers queue by priority
+    (lower first, FIFO within a priority) and are re-ordered when a
+    priority is raised; background callers may not take the tokens
+    reserved for interactive ones.
+    """
+
+    def __init__(self, daily_limit, capacity, background_reserve):
+        self.capacity = max(1, min(capacity, daily_limit))
+        # The full bucket can be spent at once, so refill the remainder of the day's quota
+        self.rate = max(daily_limit - self.capacity, 0) / 86400
+        self.reserve = background_reserve * self.capacity
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._waiters = []  # _Waiter, few at a time; the head is the minimum
+        self._seq = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _needed(self, priority):
+        return 1 + (self.reserve if priority == BACKGROUND else 0)
+
+    def _take(self, priority):
+        # Caller holds the lock
+        self._refill()
+        if self._tokens >= self._needed(priority):
+            self._tokens -= 1
+            return True
+        return False
+
+    def _seconds_until(self, priority):
+        if self.rate <= 0:
+            return float('inf')
+        return max(self._needed(priority) - self._tokens, 0) / self.rate
+
+    def _head(self):
+        return min(self._waiters, key=_Waiter.sort_key) if self._waiters else None
+
+    def wake(self):
+        """
+        Wakes every waiter to re-check its place, e.g. after a priority changed.
+        """
+        with self._lock:
+            for waiter in self._waiters:
+                waiter.event.set()
+
+    def try_acquire(self, priority=INTERACTIVE):
+        """
+        Takes a token without waiting; False if none is available or a
+        request of higher or equal priority is queued for one.
+        """
+        with self._lock:
+            head = self._head()
+            if head is not None and head.priority.value <= priority:
+                return False
+            return self._take(priority)
+
+    async def acquire(self, priority, timeouts):
+        """
+        Waits for a token behind any queued request of higher or equal
+        priority, for at most timeouts[priority] seconds (re-read if the
+        Priority is raised meanwhile). Returns whether one was taken.
+        """
+        if self.try_acquire(priority.value):
+            return True
+        waiter = _Waiter(priority, next(self._seq))
+        with self._lock:
+            self._waiters.append(waiter)
+        try:
+            while True:
+                with self._lock:
+                    is_head = self._head() is waiter
+                    if is_head and self._take(priority.value):
+                        return True
+                    wait = self._seconds_until(priority.value) if is_head else float('inf')
+                remaining = waiter.started + timeouts[priority.value] - time.monotonic()
+                if remaining <= 0:
+                    return False
+                waiter.event.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(waiter.event.wait(), min(wait, remaining))
+        finally:
+            with self._lock:
+                self._waiters.remove(waiter)
+                head = self._head()
+                if head is not None:
+                    head.event.set()
+
+    def exhaust(self):
+        """
+        Empties the bucket, after NewsAPI reported the quota as used up.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
+
+    def get_stats(self):
+        with self._lock:
+            self._refill()
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for waiter in self._waiters:
+                queued[PRIORITY_NAMES[waiter.priority.value]] += 1
+            return {
+                "tokens": round(self._tokens, 2),
+                "capacity": self.capacity,
+                "refill_per_hour": round(self.rate * 3600, 2),
+                "background_reserve": round(self.reserve, 2),
+                "queued": queued
+            }
+
+bucket = TokenBucket(NEWS_API_DAILY_LIMIT, NEWS_API_BURST, NEWS_API_BACKGROUND_RESERVE)
+# Longest wait for a token per priority before falling back to the cache
+_MAX_WAIT = {INTERACTIVE: NEWS_API_MAX_WAIT, BACKGROUND: NEWS_API_BACKGROUND_MAX_WAIT}
+
+# --- Response Cache ---
+
+_cache = OrderedDict()  # key -> (fetched_at, page_size, body), least recently used first
+_cache_lock = threading.Lock()
+_stats = {result: 0 for result in ("hit", "fetched", "stale", "throttled", "error")}
+
+def cache_key(params):
+    """
+    The normalized query: every parameter that selects articles, with the
+    query text's case and whitespace folded. Excludes the API key, page
+    size (a larger cached page answers a smaller request) and `from` date.
+    """
+    return tuple(sorted(
+        (name, ' '.join(str(value).split()).lower() if name == 'q' else str(value))
+        for name, value in params.items()
+        if name not in _UNCACHED_PARAMS and value is not None
+    ))
+
+def _cached(key, page_size, max_age):
+    """
+    The cached body for a key if it is younger than max_age and covers
+    page_size articles, as (body, fetched_at); else (None, None).
+    """
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None, None
+        fetched_at, cached_size, body = entry
+        age = time.time() - fetched_at
+        if age >= NEWS_CACHE_STALE_TTL:
+            del _cache[key]
+            return None, None
+        complete = cached_size >= page_size or len(body.get('articles', [])) >= body.get('totalResults', 0)
+        if age >= max_age or not complete:
+            return None, None
+        _cache.move_to_end(key)
+    return {**body, 'articles': body.get('articles', [])[:page_size]}, fetched_at
+
+def _store(key, page_size, body):
+    with _cache_lock:
+        _cache[key] = (time.time(), page_size, body)
+        _cache.move_to_end(key)
+        while len(_cache) > NEWS_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+def _stale(key, page_size):
+    """
+    The newest cached copy regardless of freshness or page size, marked
+    as stale; None if there is none.
+    """
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is None or time.time() - entry[0] >= NEWS_CACHE_STALE_TTL:
+        return None
+    fetched_at, _, body = entry
+    return {**body, 'articles': body.get('articles', [])[:page_size], 'stale': True, 'cached_at': fetched_at}
+
+def _record(result, priority):
+    _stats[result] += 1
+    metrics.NEWS_API_LOOKUPS.inc(result=result, priority=PRIORITY_NAMES[priority])
+
+# --- Requests ---
+
+def _lookup(params):
+    key = cache_key(params)
+    page_size = int(params.get('pageSize') or 20)
+    body, _ = _cached(key, page_size, NEWS_CACHE_TTL)
+    metrics.record_cache("newsapi", hit=body is not None)
+    return key, page_size, body
+
+def _handle_response(response, key, page_size, priority):
+    """
+    Caches a successful body and returns it. A quota error empties the
+    bucket and is answered from the cache when possible, like any other
+    failure; raises httpx.HTTPError when there is nothing cached.
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    if response.status_code == 429 or body.get('code') in _QUOTA_ERROR_CODES:
+        logger.warning(f"NewsAPI quota exhausted ({body.get('message', response.status_code)}), pausing requests")
+        bucket.exhaust()
+    if response.is_success and body.get('status') == 'ok':
+        _store(key, page_size, body)
+        _record("fetched", priority)
+        return body
+    stale = _stale(key, page_size)
+    if stale is not None:
+        _record("stale", priority)
+        return stale
+    _record("error", priority)
+    response.raise_for_status()
+    return body  # NewsAPI error body with a 200 status
+
+def _throttled(key, page_size, priority):
+    stale = _stale(key, page_size)
+    if stale is not None:
+        _record("stale", priority)
+        return stale
+    _record("throttled", priority)
+    return {"status": "error", "code": "rateLimited", "message": "NewsAPI request budget exhausted, try again later"}
+
+def _failed(error, key, page_size, priority):
+    stale = _stale(key, page_size)
+    if stale is None:
+        _record("error", priority)
+        raise error
+    _record("stale", priority)
+    logger.warning(f"NewsAPI request failed ({error}), serving cached articles")
+    return stale
+
+async def fetch_everything_async(params):
+    """
+    NewsAPI /everything through the cache and rate limiter. Returns the
+    response body - a stale cached copy (marked 'stale') when the request
+    can't be made or fails, or a NewsAPI-style error body when throttled
+    with nothing cached. Raises httpx.HTTPError on a failure with nothing
+    cached. Waits up to NEWS_API_MAX_WAIT
+    (NEWS_API_BACKGROUND_MAX_WAIT at background priority) for a token,
+    queued behind higher-priority requests. An interactive caller joining
+    a background single-flight raises its priority while it waits.
+    """
+    cell = _priority.get() or Priority(INTERACTIVE)
+    key, page_size, body = _lookup(params)
+    if body is not None:
+        _record("hit", cell.value)
+        return body
+    acquired = await bucket.acquire(cell, _MAX_WAIT)
+    priority = cell.value
+    if not acquired:
+        return _throttled(key, page_size, priority)
+    try:
+        response = await http_client.aget(NEWS_API_URL, params=params, upstream='newsapi')
+    except httpx.HTTPError as e:
+        return _failed(e, key, page_size, priority)
+    return _handle_response(response, key, page_size, priority)
+
+def get_stats():
+    """
+    Lookups by result since startup, cache size and the limiter's state.
+    """
+    with _cache_lock:
+        entries = len(_cache)
+    total = sum(_stats.values())
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hit"] / total, 3) if total else 0.0,
+        "entries": entries,
+        "max_entries": NEWS_CACHE_MAX_ENTRIES,
+        "ttl_seconds": NEWS_CACHE_TTL,
+        "stale_ttl_seconds": NEWS_CACHE_STALE_TTL,
+        "daily_limit": NEWS_API_DAILY_LIMIT,
+        "limiter": bucket.get_stats()
+    }
@@ -1,13 +1,27 @@
-import requests
+import asyncio
+import httpx
+import logging
 import os
 import re
 from datetime import datetime, timedelta
+from functools import lru_cache
 from dotenv import load_dotenv
 
+import metrics
+import news_client
+from singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
-NEWS_API_URL = "https://newsapi.org/v2/everything"
+
+# Event-level fetch: outcomes with fewer matched articles than this get
+# their own per-outcome query as a fallback
+NEWS_MIN_MATCHES = int(os.getenv("NEWS_MIN_MATCHES", "2"))
+NEWS_MAX_PAGE_SIZE = 100  # NewsAPI limit
+NEWS_MAX_QUERY_LENGTH = 500  # NewsAPI limit
 
 def extract_keywords(title):
     """
@@ -32,10 +46,122 @@ def extract_keywords(title):
     else:
         return f'"{title}"'
 
-def get_event_news(event_title, market_question, outcome_name, max_results=20):
+def _build_news_query(event_title, outcome_name):
+    """
+    Combines the top title keywords with the outcome name into a NewsAPI query.
+    """
+    # Extract key terms from event title
+    clean_title = re.sub(r'[^\w\s]', '', event_title)
+    title_words = [w for w in clean_title.split() if len(w) > 3][:3]  # Top 3 words from title
+    
+    # Clean outcome name
+    clean_outcome = re.sub(r'[^\w\s]', '', outcome_name)
+    
+    # Combine title keywords with outcome
+    query_parts = title_words + [clean_outcome]
+    return ' '.join(query_parts).strip()
+
+def _build_event_news_query(event_title, outcome_names):
+    """
+    One query for all outcomes: the title keywords AND an OR of the outcome names.
+    """
+    clean_title = re.sub(r'[^\w\s]', '', event_title)
+    title_words = [w for w in clean_title.split() if len(w) > 3][:3]
+    
+    outcome_terms = []
+    for name in outcome_names:
+        clean_outcome = re.sub(r'[^\w\s]', '', name).strip()
+        if clean_outcome and f'"{clean_outcome}"' not in outcome_terms:
+            outcome_terms.append(f'"{clean_outcome}"')
+    
+    query = ' '.join(title_words)
+    if outcome_terms:
+        query = f"{query} AND ({' OR '.join(outcome_terms)})".strip()
+    return query
+
+@lru_cache(maxsize=512)
+def _outcome_pattern(outcome_name):
+    """
+    Precompiled matcher for an outcome: the full name, or its last word
+    when that is distinctive enough (e.g. a surname).
+    """
+    words = re.sub(r'[^\w\s]', ' ', outcome_name).split()
+    if not words:
+        return None
+    alternatives = [r'\s+'.join(re.escape(w) for w in words)]
+    if len(words) > 1 and len(words[-1]) > 3:
+        alternatives.append(re.escape(words[-1]))
+    return re.compile(r'\b(?:' + '|'.join(alternatives) + r')\b', re.IGNORECASE)
+
+def _assign_articles(articles, outcome_names):
+    """
+    Assigns each article to every outcome whose pattern matches its title
+    or description. Returns one article list per outcome.
+    """
+    patterns = [_outcome_pattern(name) for name in outcome_names]
+    assigned = [[] for _ in outcome_names]
+    for article in articles:
+        text = f"{article.get('title') or ''} {article.get('description') or ''}"
+        for index, pattern in enumerate(patterns):
+            if pattern and pattern.search(text):
+                assigned[index].append(article)
+    return assigned
+
+def _build_news_params(query, max_results):
+    # Calculate date range (last 30 days for maximum results)
+    thirty_days_ago = datetime.now() - timedelta(days=30)
+    from_date = thirty_days_ago.strftime('%Y-%m-%d')
+    
+    return {
+        'q': query,
+        'apiKey': NEWS_API_KEY,
+        'language': 'en',
+        'sortBy': 'publishedAt',
+        'pageSize': max_results,
+        'from': from_date
+    }
+
+def _parse_news_response(data, query, outcome_name, market_question):
+    """
+    Converts a NewsAPI response body into our article format.
+    """
+    if data.get('status') == 'ok':
+        articles = []
+        for article in data.get('articles', []):
+            # Filter out removed articles
+            if article.get('title') and '[Removed]' not in article.get('title', ''):
+                articles.append({
+                    'title': article.get('title'),
+                    'description': article.get('description'),
+                    'url': article.get('url'),
+                    'source': article.get('source', {}).get('name'),
+                    'publishedAt': article.get('publishedAt'),
+                    'urlToImage': article.get('urlToImage')
+                })
+        
+        logger.debug(f"Found {len(articles)} articles for '{query}'")
+        
+        result = {
+            'articles': articles,
+            'query_used': query,
+            'outcome_name': outcome_name,
+            'market_question': market_question
+        }
+        if data.get('stale'):
+            # Served from the cache because NewsAPI couldn't be queried
+            result['stale'] = True
+        return result
+    else:
+        logger.warning(f"News API error: {data.get('message', 'Unknown error')}")
+        return {'error': data.get('message', 'Unknown error'), 'articles': []}
+
+@metrics.instrumented("news_outcome")
+@single_flight("newsapi-outcome")
+async def get_event_news_async(event_title, market_question, outcome_name, max_results=20):
     """
     Fetch news articles related to a specific outcome from the last 30 days.
-    Uses event title + outcome name for search query.
+    Uses event title + outcome name for search query. Identical concurrent
+    queries share one request.
     
     Args:
         event_title: The event title (e.g., "What price will Bitcoin hit in November 2024?")
@@ -44,26 +170,14 @@ def get_event_news(event_title, market_question, outcome_name, max_results=20):
         max_results: Maximum number of articles to return
     
     Returns:
-        Dictionary with articles list and query info
+        Dictionary with articles list and query info. Requests go through
+        news_client's cache and rate limiter; 'stale' is set when cached
+        articles were served because NewsAPI couldn't be queried.
     """
     if not NEWS_API_KEY:
         return {"error": "NEWS_API_KEY not configured", "articles": []}
     
-    # Calculate date range (last 30 days for maximum results)
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    from_date = thirty_days_ago.strftime('%Y-%m-%d')
-    
-    # Combine event title and outcome name for search query
-    # Extract key terms from event title
-    clean_title = re.sub(r'[^\w\s]', '', event_title)
-    title_words = [w for w in clean_title.split() if len(w) > 3][:3]  # Top 3 words from title
-    
-    # Clean outcome name
-    clean_outcome = re.sub(r'[^\w\s]', '', outcome_name)
-    
-    # Combine title keywords with outcome
-    query_parts = title_words + [clean_outcome]
-    query = ' '.join(query_parts).strip()
+    query = _build_news_query(event_title, outcome_name)
     
     # If query is too short or generic, don't search
     if len(query) < 3:
@@ -74,48 +188,70 @@ def get_event_news(event_title, market_question, outcome_name, max_results=20):
             'market_question': market_question
         }
     
-    params = {
-        'q': query,
-        'apiKey': NEWS_API_KEY,
-        'language': 'en',
-        'sortBy': 'publishedAt',
-        'pageSize': max_results,
-        'from': from_date
-    }
+    params = _build_news_params(query, max_results)
     
-    print(f"News API query: {query}")
+    logger.debug(f"News API query: {query}")
     
     try:
-        response = requests.get(NEWS_API_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get('status') == 'ok':
-            articles = []
-            for article in data.get('articles', []):
-                # Filter out removed articles
-                if article.get('title') and '[Removed]' not in article.get('title', ''):
-                    articles.append({
-                        'title': article.get('title'),
-                        'description': article.get('description'),
-                        'url': article.get('url'),
-                        'source': article.get('source', {}).get('name'),
-                        'publishedAt': article.get('publishedAt'),
-                        'urlToImage': article.get('urlToImage')
-                    })
-            
-            print(f"Found {len(articles)} articles for '{query}'")
+        data = await news_client.fetch_everything_async(params)
+        return _parse_news_response(data, query, outcome_name, market_question)
             
-            return {
-                'articles': articles,
-                'query_used': query,
-                'outcome_name': outcome_name,
-                'market_question': market_question
-            }
-        else:
-            print(f"News API error: {data.get('message', 'Unknown error')}")
-            return {'error': data.get('message', 'Unknown error'), 'articles': []}
-            
-    except requests.exceptions.RequestException as e:
-        print(f"News API request error: {str(e)}")
+    except httpx.HTTPError as e:
+        logger.warning(f"News API request error: {str(e)}")
         return {'error': str(e), 'articles': []}
+
+@metrics.instrumented("news_event")
+@single_flight("newsapi-event")
+async def get_event_news_for_outcomes_async(event_title, outcomes, max_results=20):
+    """
+    Fetches news for all outcomes of an event with a single NewsAPI query,
+    then assigns the returned articles to outcomes locally. Outcomes with
+    fewer than NEWS_MIN_MATCHES articles fall back to their own query.
+    
+    Args:
+        event_title: The event title
+        outcomes: List of (outcome_name, market_question) tuples
+        max_results: Maximum number of articles per outcome
+    
+    Returns:
+        List of news dicts (same shape as get_event_news_async), one per outcome
+    """
+    if not NEWS_API_KEY:
+        return [{"error": "NEWS_API_KEY not configured", "articles": []} for _ in outcomes]
+    
+    outcome_names = [name for name, _ in outcomes]
+    query = _build_event_news_query(event_title, outcome_names)
+    
+    results = [None] * len(outcomes)
+    # A single distinct outcome (or an overlong query) gains nothing from combining
+    if len(set(outcome_names)) > 1 and len(query) <= NEWS_MAX_QUERY_LENGTH:
+        params = _build_news_params(query, min(max_results * len(outcomes), NEWS_MAX_PAGE_SIZE))
+        logger.debug(f"News API event query: {query}")
+        
+        try:
+            combined = _parse_news_response(await news_client.fetch_everything_async(params), query, None, None)
+            
+            for index, articles in enumerate(_assign_articles(combined.get('articles', []), outcome_names)):
+                if len(articles) >= NEWS_MIN_MATCHES:
+                    outcome_name, market_question = outcomes[index]
+                    results[index] = {
+                        'articles': articles[:max_results],
+                        'query_used': query,
+                        'outcome_name': outcome_name,
+                        'market_question': market_question,
+                        **({'stale': True} if combined.get('stale') else {})
+                    }
+        except httpx.HTTPError as e:
+            logger.warning(f"News API request error: {str(e)}")
+    
+    # Per-outcome queries for anything the combined query didn't cover
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        fallback = await asyncio.gather(*[
+            get_event_news_async(event_title, outcomes[index][1], outcomes[index][0], max_results=max_results)
+            for index in missing
+        ])
+        for index, news_data in zip(missing, fallback):
+            results[index] = news_data
+    
+    return results
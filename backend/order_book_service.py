@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import time
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+
+import http_client
+import metrics
+from singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# --- Configuration ---
+# Point at the local stub (see stubs/clob_stub.py) for tests
+CLOB_API_URL = os.getenv("CLOB_API_URL", "https://clob.polymarket.com")
+ORDER_BOOK_CACHE_TTL = float(os.getenv("ORDER_BOOK_CACHE_TTL", "5"))  # Books move fast
+# Order sizes (USD notional) the slippage curve is evaluated at
+SLIPPAGE_SIZES = np.array([100.0, 1000.0, 10000.0])
+
+_book_cache = {}  # token_id -> (fetched_at, book or None)
+
+# --- Fetching ---
+
+def _parse_levels(levels, best_first_descending):
+    """
+    Order book side as an (n, 2) float array of (price, size), best price first.
+    """
+    array = np.array(
+        [(float(level['price']), float(level['size'])) for level in levels or []],
+        dtype=float
+    ).reshape(-1, 2)
+    order = np.argsort(array[:, 0], kind='stable')
+    if best_first_descending:
+        order = order[::-1]
+    return array[order]
+
+def _store_book(token_id, book):
+    now = time.monotonic()
+    _book_cache[token_id] = (now, book)
+    # Drop expired entries so the cache doesn't grow without bound
+    expired = [k for k, (fetched_at, _) in _book_cache.items() if now - fetched_at >= ORDER_BOOK_CACHE_TTL]
+    for k in expired:
+        del _book_cache[k]
+
+@single_flight("clob-book", key=lambda token_id: token_id)
+async def _fetch_book(token_id):
+    cached = _book_cache.get(token_id)
+    fresh = cached is not None and time.monotonic() - cached[0] < ORDER_BOOK_CACHE_TTL
+    metrics.record_cache("order_book", hit=fresh)
+    if fresh:
+        return cached[1]
+
+    try:
+        response = await http_client.aget(f"{CLOB_API_URL}/book", params={'token_id': token_id}, upstream='clob')
+        if response.status_code == 404:
+            book = None  # No order book for this token (e.g. not tradable)
+        else:
+            response.raise_for_status()
+            data = response.json()
+            book = {
+                'bids': _parse_levels(data.get('bids'), best_first_descending=True),
+                'asks': _parse_levels(data.get('asks'), best_first_descending=False)
+            }
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        # Depth still works from Gamma's liquidity figure without a book
+        logger.warning(f"Order book fetch failed for {token_id}: {e}")
+        return None
+
+    _store_book(token_id, book)
+    return book
+
+@metrics.instrumented("order_books")
+async def get_order_books_async(token_ids):
+    """
+    Fetches the order books for the given CLOB token ids in parallel
+    (briefly cached). Returns {token_id: book or None}.
+    """
+    token_ids = list(dict.fromkeys(t for t in token_ids if t))
+    books = await asyncio.gather(*[_fetch_book(token_id) for token_id in token_ids])
+    return dict(zip(token_ids, books))
+
+# --- Execution Metrics ---
+
+def fill_prices(levels, sizes=SLIPPAGE_SIZES):
+    """
+    Average fill price for market orders of the given USD sizes walking
+    one side of the book (best price first). NaN where the book is too
+    thin to fill the order.
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    if len(levels) == 0:
+        return np.full(sizes.shape, np.nan)
+
+    prices, shares = levels[:, 0], levels[:, 1]
+    cum_notional = np.cumsum(prices * shares)
+    cum_shares = np.cumsum(shares)
+
+    # Level at which each order is completed, and what's filled before it
+    level = np.searchsorted(cum_notional, sizes, side='left')
+    filled = level < len(prices)
+    level = np.minimum(level, len(prices) - 1)
+    notional_before = np.where(level > 0, cum_notional[level - 1], 0.0)
+    shares_before = np.where(level > 0, cum_shares[level - 1], 0.0)
+
+    shares_filled = shares_before + (sizes - notional_before) / prices[level]
+    return np.where(filled, sizes / shares_filled, np.nan)
+
+def _cents(value):
+    return None if value is None or np.isnan(value) else round(float(value) * 100, 2)
+
+def compute_execution_metrics(book, sizes=SLIPPAGE_SIZES):
+    """
+    Spread, visible depth and the slippage-at-size curve for buying and
+    selling the outcome. Prices are in cents, like current_price.
+    """
+    bids, asks = book['bids'], book['asks']
+    best_bid = bids[0, 0] if len(bids) else None
+    best_ask = asks[0, 0] if len(asks) else None
+
+    buy_prices = fill_prices(asks, sizes)
+    sell_prices = fill_prices(bids, sizes)
+    buy_slippage = buy_prices - best_ask if best_ask is not None else buy_prices
+    sell_slippage = best_bid - sell_prices if best_bid is not None else sell_prices
+
+    return {
+        'best_bid': _cents(best_bid),
+        'best_ask': _cents(best_ask),
+        'spread': _cents(best_ask - best_bid) if best_bid is not None and best_ask is not None else None,
+        'midpoint': _cents((best_ask + best_bid) / 2) if best_bid is not None and best_ask is not None else None,
+        'bid_depth_usd': round(float(np.sum(bids[:, 0] * bids[:, 1])), 2),
+        'ask_depth_usd': round(float(np.sum(asks[:, 0] * asks[:, 1])), 2),
+        'slippage': [
+            {
+                'size_usd': int(size),
+                'buy_avg_price': _cents(buy_prices[i]),
+                'buy_slippage': _cents(buy_slippage[i]),
+                'sell_avg_price': _cents(sell_prices[i]),
+                'sell_slippage': _cents(sell_slippage[i])
+            }
+            for i, size in enumerate(sizes)
+        ]
+    }
@@ -1,8 +1,16 @@
-import requests
+import httpx
 import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 
-GAMMA_API = "https://gamma-api.polymarket.com"
+import http_client
+
+logger = logging.getLogger(__name__)
+
+GAMMA_API = os.getenv("GAMMA_API_URL", "https://gamma-api.polymarket.com")
 SPORTS_TAG_ID = '10'  # Sports category
+TECH_TAG_IDS = ['1401', '439', '101999']  # Tech, AI, Big Tech
 
 ## Formats event data for display
 def format_event_data(event):
@@ -28,52 +36,64 @@ def format_event_data(event):
 
 # Fetches newest events
 
-def get_tech_events_service(limit=20):
-    """
-    Fetches tech-related events using Tech, AI, and Big Tech tags.
-    """
-    print("--- 💻 Tech Events ---")
+def _fetch_tag_events(tag_id, limit):
     params = {
         'closed': 'false',
+        'tag_id': tag_id,
         'order': 'volume24hr',
         'ascending': 'false',
-        'limit': 100
+        'limit': limit
     }
-    
-    # Tech tag IDs: Tech (1401), AI (439), Big Tech (101999)
-    tech_tag_ids = ['1401', '439', '101999']
+    response = http_client.get(f"{GAMMA_API}/events", params=params, upstream='gamma')
+    response.raise_for_status()
+    return response.json()
+
+def get_tech_events_service(limit=20, raise_errors=False):
+    """
+    Fetches tech-related events using Tech, AI, and Big Tech tags.
+    Gamma filters by tag server-side: one query per tag (in parallel), each
+    for the top `limit` events, merged by event id and re-ordered by volume.
+    Returns [] on upstream errors unless raise_errors is set.
+    """
+    logger.debug("--- 💻 Tech Events ---")
     
     try:
-        response = requests.get(f"{GAMMA_API}/events", params=params)
-        response.raise_for_status()
-        all_events = response.json()
+        with ThreadPoolExecutor(max_workers=len(TECH_TAG_IDS)) as executor:
+            results = list(executor.map(lambda tag_id: _fetch_tag_events(tag_id, limit), TECH_TAG_IDS))
+        
+        # Events tagged with several tech tags come back more than once
+        events_by_id = {}
+        for events in results:
+            for event in events:
+                events_by_id.setdefault(event.get('id'), event)
         
-        # Filter for events with tech tags
-        tech_events = []
-        for event in all_events:
-            event_tags = event.get('tags', [])
-            # Check if event has any of the tech tag IDs
-            if any(tag.get('id') in tech_tag_ids for tag in event_tags):
-                tech_events.append(event)
+        tech_events = sorted(
+            events_by_id.values(),
+            key=lambda event: float(event.get('volume24hr') or 0),
+            reverse=True
+        )[:limit]
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            for event in tech_events:
                 formatted = format_event_data(event)
                 if formatted:
-                    print(formatted)
-                
-                if len(tech_events) >= limit:
-                    break
+                    logger.debug(formatted)
         
-        return tech_events[:limit]
+        return tech_events
                 
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching tech events: {e}\n")
+    except httpx.HTTPError as e:
+        logger.warning(f"Error fetching tech events: {e}")
+        if raise_errors:
+            raise
         return []
 
 ## Fetches trending events by volume
-def get_trending_events_service(limit=20):
+def get_trending_events_service(limit=20, raise_errors=False):
     """
     Fetches the most active events by 24-hour volume.
+    Returns [] on upstream errors unless raise_errors is set.
     """
-    print("--- 🔥 Trending Events (by Volume) ---")
+    logger.debug("--- 🔥 Trending Events (by Volume) ---")
     params = {
         'closed': 'false',
         'order': 'volume24hr', 
@@ -82,28 +102,32 @@ def get_trending_events_service(limit=20):
     }
     
     try:
-        response = requests.get(f"{GAMMA_API}/events", params=params)
+        response = http_client.get(f"{GAMMA_API}/events", params=params, upstream='gamma')
         response.raise_for_status()
         events = response.json()
         
-        for event in events:
-            formatted = format_event_data(event)
-            if formatted:
-                print(formatted)
+        if logger.isEnabledFor(logging.DEBUG):
+            for event in events:
+                formatted = format_event_data(event)
+                if formatted:
+                    logger.debug(formatted)
         
         return events  # Return the data
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching trending events: {e}\n")
+    except httpx.HTTPError as e:
+        logger.warning(f"Error fetching trending events: {e}")
+        if raise_errors:
+            raise
         return []  # Return empty list on error
 
 
 ## Fetches sports events
-def get_sports_events_service(limit=5):
+def get_sports_events_service(limit=5, raise_errors=False):
     """
     Fetches the newest events in the Sports category.
+    Returns [] on upstream errors unless raise_errors is set.
     """
-    print("--- '⚽ Sports' Events ---")
+    logger.debug("--- '⚽ Sports' Events ---")
     
     params = {
        'closed': 'false',
@@ -114,32 +138,37 @@ def get_sports_events_service(limit=5):
     }
     
     try:
-        response = requests.get(f"{GAMMA_API}/events", params=params)
+        response = http_client.get(f"{GAMMA_API}/events", params=params, upstream='gamma')
         response.raise_for_status()
         events = response.json()
         
         if not events:
-            print("  No events found for this tag ID.\n")
+            logger.debug("  No events found for this tag ID.")
             return []
 
-        for event in events:
-            formatted = format_event_data(event)
-            if formatted:
-                print(formatted)
+        if logger.isEnabledFor(logging.DEBUG):
+            for event in events:
+                formatted = format_event_data(event)
+                if formatted:
+                    logger.debug(formatted)
         
         return events
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching sports events: {e}\n")
+    except httpx.HTTPError as e:
+        logger.warning(f"Error fetching sports events: {e}")
+        if raise_errors:
+            raise
         return []
 # --- Main Function to Run Dashboard ---
 
 def get_dashboard_data():
     get_tech_events_service()
-    print("---" * 15)
+    logger.debug("---" * 15)
     get_trending_events_service()
-    print("---" * 15)
+    logger.debug("---" * 15)
     get_sports_events_service()
 
 if __name__ == "__main__":
+    # The event listings are logged at debug level
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
     get_dashboard_data()
\ No newline at end of file
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from analysis_service import (
+    ANALYSIS_CACHE_TTL,
+    CLAUDE_BATCH_MODE,
+    TOP_OUTCOMES,
+    get_analysis_age,
+    run_event_analysis
+)
+from claude_service import CLAUDE_TRIAGE_ENABLED, get_model_call_count
+from news_client import background_priority
+from list_cache import (
+    get_cached_tech_events,
+    get_cached_trending_events,
+    get_cached_sports_events
+)
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# --- Configuration ---
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() in ("1", "true", "yes")
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "600"))  # Seconds between rounds
+PREWARM_MAX_EVENTS = int(os.getenv("PREWARM_MAX_EVENTS", "10"))  # Events per round
+PREWARM_MAX_CLAUDE_CALLS_PER_HOUR = int(os.getenv("PREWARM_MAX_CLAUDE_CALLS_PER_HOUR", "60"))
+LIST_LIMIT = 20  # Same lists the home page shows
+
+_claude_calls = deque()  # (timestamp, calls) for each warmed event, last hour only
+_task = None
+_status = {
+    "last_round_at": None,
+    "warmed": 0,
+    "skipped_fresh": 0,
+    "skipped_budget": 0,
+    "errors": 0
+}
+
+# --- Budget ---
+
+def _calls_last_hour():
+    cutoff = time.time() - 3600
+    while _claude_calls and _claude_calls[0][0] < cutoff:
+        _claude_calls.popleft()
+    return sum(calls for _, calls in _claude_calls)
+
+def _estimated_calls_per_event():
+    # Worst case with nothing cached: the triage call, then the full model
+    triage = 1 if CLAUDE_TRIAGE_ENABLED else 0
+    return triage + (1 if CLAUDE_BATCH_MODE else 2 * TOP_OUTCOMES)
+
+# --- Candidates ---
+
+def _candidate_event_ids():
+    """
+    Top events from the home-page lists, interleaved so each list gets a
+    share of the budget (trending first), deduplicated.
+    """
+    lists = [
+        get_cached_trending_events(limit=LIST_LIMIT) or [],
+        get_cached_tech_events(limit=LIST_LIMIT) or [],
+        get_cached_sports_events(limit=LIST_LIMIT) or []
+    ]
+    event_ids = []
+    for position in range(LIST_LIMIT):
+        for events in lists:
+            if position < len(events):
+                event_id = str(events[position].get('id'))
+                if event_id not in event_ids:
+                    event_ids.append(event_id)
+                if len(event_ids) >= PREWARM_MAX_EVENTS:
+                    return event_ids
+    return event_ids
+
+# --- Rounds ---
+
+async def run_prewarm_round():
+    """
+    Computes analyses for the top events that would otherwise expire before
+    the next round, within the hourly Claude call budget.
+    """
+    # The list caches are sync (and may load from Gamma on a cold start)
+    event_ids = await asyncio.to_thread(_candidate_event_ids)
+    _status["last_round_at"] = time.time()
+
+    for event_id in event_ids:
+        age = get_analysis_age(event_id)
+        if age is not None and age < ANALYSIS_CACHE_TTL - PREWARM_INTERVAL:
+            _status["skipped_fresh"] += 1
+            continue
+
+        if _calls_last_hour() + _estimated_calls_per_event() > PREWARM_MAX_CLAUDE_CALLS_PER_HOUR:
+            _status["skipped_budget"] += 1
+            logger.info("Pre-warm budget reached, skipping remaining events")
+            break
+
+        calls_before = get_model_call_count()
+        try:
+            # Interactive analyses get NewsAPI quota first
+            with background_priority():
+                await run_event_analysis(event_id, use_cache=False)
+            _status["warmed"] += 1
+        except Exception as e:
+            _status["errors"] += 1
+            logger.warning(f"Pre-warm failed for event {event_id}: {e}")
+        finally:
+            # Counts any concurrent user traffic too, which keeps the budget conservative
+            _claude_calls.append((time.time(), get_model_call_count() - calls_before))
+
+async def _prewarm_loop():
+    while True:
+        try:
+            await run_prewarm_round()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Pre-warm round failed: {e}")
+        await asyncio.sleep(PREWARM_INTERVAL)
+
+# --- Lifecycle ---
+
+def start_prewarm():
+    """
+    Starts the background scheduler. Called from the FastAPI lifespan.
+    """
+    global _task
+    if not PREWARM_ENABLED:
+        logger.info("Pre-warming disabled")
+        return
+    if ANALYSIS_CACHE_TTL <= PREWARM_INTERVAL:
+        logger.warning("ANALYSIS_CACHE_TTL <= PREWARM_INTERVAL, warmed analyses expire between rounds")
+    _task = asyncio.create_task(_prewarm_loop())
+
+async def stop_prewarm():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+
+def get_prewarm_status():
+    return {
+        **_status,
+        "enabled": PREWARM_ENABLED,
+        "claude_calls_last_hour": _calls_last_hour(),
+        "max_claude_calls_per_hour": PREWARM_MAX_CLAUDE_CALLS_PER_HOUR,
+        "max_events": PREWARM_MAX_EVENTS,
+        "interval_seconds": PREWARM_INTERVAL
+    }
@@ -0,0 +1,312 @@
+import contextlib
+import contextvars
+import fnmatch
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+# On-demand sampling profiler for the running server (admin endpoints in
+# main.py). A background thread snapshots every thread's Python stack at a
+# fixed interval; nothing is sampled or recorded while no session is active.
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "300"))  # Hard cap per session
+PROFILER_MAX_STACK_DEPTH = 128
+
+# Leaf frames of threads that are blocked rather than running Python code:
+# the event loop polling for I/O, idle pool workers, blocking socket reads
+IDLE_LEAVES = {
+    ('selectors.py', 'select'), ('selectors.py', 'EpollSelector.select'),
+    ('selectors.py', 'KqueueSelector.select'), ('selectors.py', 'BaseSelector.select'),
+    ('runners.py', 'Runner.run'), ('runners.py', 'run'),  # uvloop polls inside C
+    ('threading.py', 'wait'), ('threading.py', 'Condition.wait'), ('threading.py', 'Event.wait'),
+    ('threading.py', 'Thread._wait_for_tstate_lock'), ('threading.py', '_wait_for_tstate_lock'),
+    ('thread.py', '_worker'), ('queue.py', 'get'), ('queue.py', 'Queue.get'),
+    ('socket.py', 'readinto'), ('socket.py', 'SocketIO.readinto'), ('socket.py', 'accept'),
+    ('socket.py', 'socket.accept'), ('ssl.py', 'read'), ('ssl.py', 'SSLSocket.read'),
+    ('ssl.py', 'recv_into'), ('ssl.py', 'SSLSocket.recv_into')
+}
+
+def _code_label(code):
+    name = getattr(code, 'co_qualname', code.co_name)
+    return os.path.basename(code.co_filename), name
+
+def _frame_label(code):
+    filename, name = _code_label(code)
+    module = filename[:-3] if filename.endswith('.py') else filename
+    # ';' separates frames in the collapsed format
+    return f"{module}:{name}".replace(';', ':')
+
+def _thread_group(name):
+    # "ThreadPoolExecutor-0_3" and "ThreadPoolExecutor-0_7" are one pool
+    return re.sub(r'_\d+$', '', name or 'thread')
+
+# --- Sessions ---
+
+class ProfileSession:
+    """
+    One profiling run: either a time window (`seconds`) or the next
+    `requests` requests whose path matches `route` (a glob, e.g.
+    /api/event/*/analysis). In request mode stacks are only sampled while
+    a matching request is in flight.
+    """
+
+    def __init__(self, seconds=None, requests=None, route=None, interval_ms=PROFILER_INTERVAL_MS):
+        self.seconds = min(seconds or PROFILER_MAX_SECONDS, PROFILER_MAX_SECONDS)
+        self.requests = requests
+        self.route = route
+        self.interval = max(interval_ms, 1) / 1000
+        self.mode = "requests" if requests else "window"
+        self.started_at = time.time()
+        self.started = time.monotonic()
+        self.finished = None
+        self.stop_reason = None
+
+        self.stacks = Counter()  # collapsed stack -> samples
+        self.idle_stacks = Counter()  # same, for blocked threads
+        self.samples = 0
+        self.cpu_seconds = 0.0
+        self.stage_wall = Counter()  # stage -> wall seconds (inclusive)
+        self.stage_calls = Counter()
+        self.stage_cpu = Counter()  # stage -> sampled on-CPU seconds (inclusive)
+        self.requests_seen = 0
+        self.requests_done = 0
+        self.in_flight = 0
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    @property
+    def active(self):
+        return self.finished is None
+
+    def matches(self, path):
+        return self.mode == "requests" and fnmatch.fnmatchcase(path, self.route or '*')
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, reason="stopped"):
+        if self.finished is None:
+            self.finished = time.monotonic()
+            self.stop_reason = reason
+        self._stop.set()
+
+    def _run(self):
+        last = time.monotonic()
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            elapsed, last = now - last, now
+            if now - self.started >= self.seconds:
+                self.stop("time limit" if self.mode == "requests" else "window elapsed")
+                break
+            if self.mode == "window" or self.in_flight > 0:
+                self._sample(elapsed)
+
+    def _sample(self, elapsed):
+        """
+        Records one stack per thread. `elapsed` (the actual time since the
+        previous tick) is credited as CPU time to every stage on the stack
+        of a thread that is running rather than blocked.
+        """
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        with self._lock:
+            self.samples += 1
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                labels, stages = [], None
+                leaf = frame.f_code
+                depth = 0
+                while frame is not None and depth < PROFILER_MAX_STACK_DEPTH:
+                    labels.append(_frame_label(frame.f_code))
+                    if stages is None:
+                        stages = _frame_stages(frame)
+                    frame = frame.f_back
+                    depth += 1
+                labels.append(_thread_group(names.get(ident)))
+                stack = ';'.join(reversed(labels))
+                if _code_label(leaf) in IDLE_LEAVES:
+                    self.idle_stacks[stack] += 1
+                    continue
+                self.stacks[stack] += 1
+                self.cpu_seconds += elapsed
+                for stage in set(stages or ()):
+                    self.stage_cpu[stage] += elapsed
+
+    def record_stage(self, stage, wall_seconds):
+        with self._lock:
+            self.stage_wall[stage] += wall_seconds
+            self.stage_calls[stage] += 1
+
+    def collapsed(self, include_idle=False):
+        """
+        Collapsed stacks ("frame;frame;frame count" per line), the input
+        format of flamegraph.pl, speedscope and inferno.
+        """
+        with self._lock:
+            stacks = self.stacks + self.idle_stacks if include_idle else Counter(self.stacks)
+        return '\n'.join(f"{stack} {count}" for stack, count in stacks.most_common()) + '\n'
+
+    def report(self):
+        """
+        Session status plus wall vs sampled CPU time per stage. Both are
+        inclusive of nested stages, and summed over concurrent calls.
+        """
+        end = self.finished or time.monotonic()
+        with self._lock:
+            stages = {
+                stage: {
+                    "calls": self.stage_calls[stage],
+                    "wall_seconds": round(self.stage_wall[stage], 4),
+                    "cpu_seconds": round(self.stage_cpu[stage], 4),
+                    "cpu_share": round(self.stage_cpu[stage] / self.stage_wall[stage], 3) if self.stage_wall[stage] else None
+                }
+                for stage in sorted(set(self.stage_wall) | set(self.stage_cpu))
+            }
+            return {
+                "state": "running" if self.active else "finished",
+                "mode": self.mode,
+                "route": self.route,
+                "requests_target": self.requests,
+                "requests_profiled": self.requests_done,
+                "started_at": self.started_at,
+                "elapsed_seconds": round(end - self.started, 3),
+                "stop_reason": self.stop_reason,
+                "interval_ms": self.interval * 1000,
+                "samples": self.samples,
+                "cpu_samples": sum(self.stacks.values()),
+                "idle_samples": sum(self.idle_stacks.values()),
+                "cpu_seconds": round(self.cpu_seconds, 4),
+                "stages": stages
+            }
+
+_session = None
+_session_lock = threading.Lock()
+
+# The stages a piece of code runs in, outermost first. Kept in a context
+# variable so tasks and to_thread() calls inherit their caller's stages.
+# Only set while a session is active.
+_stages = contextvars.ContextVar("profiler_stages", default=())
+# Frames that entered a stage -> the stages they are in (one entry per
+# nested `with timed()`), for attributing samples from other threads
+_stage_frames = {}
+
+def _frame_stages(frame):
+    """
+    Stages active in `frame`, if it is one the sampler can tell: a frame
+    that entered a stage, or the event loop running a task step (whose
+    context holds the task's stages even if no frame of it entered one).
+    """
+    entered = _stage_frames.get(frame)
+    if entered:
+        return entered[-1]
+    if _code_label(frame.f_code) == ('events.py', 'Handle._run'):
+        handle = frame.f_locals.get('self')
+        context = getattr(handle, '_context', None)
+        if isinstance(context, contextvars.Context):
+            return context.get(_stages, ())
+    return None
+
+def start(seconds=None, requests=None, route=None, interval_ms=PROFILER_INTERVAL_MS):
+    """
+    Starts a session; raises RuntimeError if one is already running.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None and _session.active:
+            raise RuntimeError("A profiling session is already running")
+        _session = ProfileSession(seconds=seconds, requests=requests, route=route, interval_ms=interval_ms)
+        _session.start()
+        return _session
+
+def stop():
+    session = _session
+    if session is not None:
+        session.stop()
+    return session
+
+def current():
+    """
+    The running or most recently finished session, or None.
+    """
+    return _session
+
+def is_active():
+    session = _session
+    return session is not None and session.active
+
+# --- Hooks ---
+# Called from metrics.timed() and the request middleware; each is a single
+# check while no session is active.
+
+def enter_stage(stage):
+    """
+    Marks the caller of timed() as inside `stage`. Returns a token for
+    exit_stage(), or None when not profiling.
+    """
+    if not is_active():
+        return None
+    frame = sys._getframe(1)
+    # Skip timed() itself and contextlib's __enter__
+    while frame is not None and (
+        frame.f_code.co_filename == contextlib.__file__ or _code_label(frame.f_code) == ('metrics.py', 'timed')
+    ):
+        frame = frame.f_back
+    stages = _stages.get() + (stage,)
+    var_token = _stages.set(stages)
+    if frame is not None:
+        _stage_frames.setdefault(frame, []).append(stages)
+    return (_session, frame, stages, var_token)
+
+def exit_stage(token, wall_seconds):
+    if token is None:
+        return
+    session, frame, stages, var_token = token
+    try:
+        _stages.reset(var_token)
+    except ValueError:
+        # Exited in another context than it was entered in
+        _stages.set(stages[:-1])
+    entered = _stage_frames.get(frame)
+    if entered:
+        entered.remove(stages)
+        if not entered:
+            _stage_frames.pop(frame, None)
+    if session.active:
+        session.record_stage(stages[-1], wall_seconds)
+
+def request_started(path):
+    """
+    Counts a request matching a request-mode session. Returns a token for
+    request_finished(), or None.
+    """
+    session = _session
+    if session is None or not session.active or not session.matches(path):
+        return None
+    with session._lock:
+        if session.requests_seen >= session.requests:
+            return None
+        session.requests_seen += 1
+        session.in_flight += 1
+    return session
+
+def request_finished(token):
+    if token is None:
+        return
+    with token._lock:
+        token.in_flight -= 1
+        token.requests_done += 1
+        done = token.requests_done >= token.requests
+    if done:
+        token.stop("requests profiled")
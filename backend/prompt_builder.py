@@ -0,0 +1,289 @@
+import math
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+# Input-token budgets per Claude request (estimated). Articles arrive ranked
+# by relevance; the least relevant are dropped first to stay within budget.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))  # Per-outcome calls
+PROMPT_BATCH_TOKEN_BUDGET = int(os.getenv("PROMPT_BATCH_TOKEN_BUDGET", "6000"))  # Per event batch
+PROMPT_TRIAGE_TOKEN_BUDGET = int(os.getenv("PROMPT_TRIAGE_TOKEN_BUDGET", "3000"))  # Per triage call
+PROMPT_MAX_TITLE_CHARS = 160
+PROMPT_MAX_DESCRIPTION_CHARS = int(os.getenv("PROMPT_MAX_DESCRIPTION_CHARS", "300"))
+# Mark the static instructions as a cacheable prefix (Anthropic prompt caching)
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+CHARS_PER_TOKEN = 4  # Rough average for English text
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+# --- Static Instructions ---
+# Sent first, as the system prompt, so they form an identical prefix across
+# calls that the API can cache. Everything call-specific goes in the user
+# message after them.
+
+_PROBABILITY_RULES = """PROBABILITY LEVELS:
+- "Very High" (70-100%): Strong evidence outcome will happen
+- "High" (55-70%): Good evidence favoring outcome
+- "Moderate" (45-55%): Mixed/unclear
+- "Low" (30-45%): Evidence suggests unlikely
+- "Very Low" (0-30%): Strong evidence against
+- "Insufficient data": No relevant news
+
+SCORE (-100 to +100):
+- Positive: News makes outcome MORE likely
+- Negative: News makes outcome LESS likely
+- Zero: No relevant news
+
+REASONING FORMAT (3 bullets, max 10 words each):
+• Relevancy: [Yes/No + why in 5 words]
+• Evidence: [Top 1-2 facts only]
+• Impact: [Effect on probability in 5 words]"""
+
+SENTIMENT_INSTRUCTIONS = f"""Analyze news for prediction market outcome. The user message gives the MARKET, the OUTCOME and the NEWS.
+
+TASK:
+1. Check if news is relevant to the OUTCOME
+2. If NO → score: 0, probability: "Insufficient data"
+3. If YES → Assess probability and score
+
+{_PROBABILITY_RULES}
+
+BE EXTREMELY CONCISE. Cut all unnecessary words.
+
+Return ONLY valid JSON:
+{{
+  "score": <-100 to +100>,
+  "probability_assessment": "<Very High|High|Moderate|Low|Very Low|Insufficient data>",
+  "reasoning": "• Relevancy: [text]
+• Evidence: [text]
+• Impact: [text]"
+}}"""
+
+SUMMARY_INSTRUCTIONS = """Create concise summary for prediction market outcome. The user message gives the OUTCOME, its NEWS ANALYSIS and its LIQUIDITY.
+
+Create 4-5 bullets (max 8 words each):
+• Probability: [assessment]
+• Signal: [positive/negative/neutral + why]
+• News: [key finding]
+• Liquidity: [level + risk]
+• Recommendation: [actionable - use "bet for/against" or "consider/avoid" language]
+
+BE CONCISE. Use active language like "Bet against", "Consider betting for", "Avoid due to low liquidity", etc.
+
+Return ONLY valid JSON:
+{
+  "summary": "• Probability: [text]
+• Signal: [text]
+• News: [text]
+• Liquidity: [text]
+• Recommendation: [text]"
+}"""
+
+BATCH_INSTRUCTIONS = f"""Analyze news and liquidity for each outcome of a prediction market event. The user message gives the EVENT and each OUTCOME with its MARKET, LIQUIDITY and NEWS.
+
+FOR EACH OUTCOME:
+1. Check if its news is relevant to that outcome
+2. If NO → score: 0, probability: "Insufficient data"
+3. If YES → Assess probability and score
+
+{_PROBABILITY_RULES}
+
+SUMMARY FORMAT (5 bullets, max 8 words each), combining the news and liquidity:
+• Probability: [assessment]
+• Signal: [positive/negative/neutral + why]
+• News: [key finding]
+• Liquidity: [level + risk]
+• Recommendation: [actionable - use "bet for/against" or "consider/avoid" language]
+
+BE EXTREMELY CONCISE. Cut all unnecessary words.
+
+Return ONLY valid JSON with one entry per outcome, in order:
+{{
+  "outcomes": [
+    {{
+      "index": <outcome number>,
+      "score": <-100 to +100>,
+      "probability_assessment": "<Very High|High|Moderate|Low|Very Low|Insufficient data>",
+      "reasoning": "• Relevancy: [text]
+• Evidence: [text]
+• Impact: [text]",
+      "summary": "• Probability: [text]
+• Signal: [text]
+• News: [text]
+• Liquidity: [text]
+• Recommendation: [text]"
+    }}
+  ]
+}}"""
+
+TRIAGE_INSTRUCTIONS = """Triage news for the outcomes of a prediction market event. The user message gives the EVENT and each OUTCOME with its MARKET and NEWS.
+
+FOR EACH OUTCOME decide:
+- relevant: true if at least one article is about this specific outcome and could move its probability, false otherwise
+- confidence: how sure you are of that decision, from 0.0 to 1.0
+- reason: max 6 words
+
+Do NOT assess probability. BE EXTREMELY CONCISE.
+
+Return ONLY valid JSON with one entry per outcome, in order:
+{
+  "outcomes": [
+    {"index": <outcome number>, "relevant": <true|false>, "confidence": <0.0-1.0>, "reason": "<text>"}
+  ]
+}"""
+
+# --- Templates ---
+# Compiled once; only str.format runs per call
+
+SENTIMENT_TEMPLATE = 'MARKET: "{market_question}"\nOUTCOME: "{outcome_name}"\n\nNEWS:\n{news_text}'
+SENTIMENT_ARTICLE_TEMPLATE = "Title: {title}\nDescription: {description}\nSource: {source}"
+
+SUMMARY_TEMPLATE = """OUTCOME: "{outcome_name}"
+
+NEWS ANALYSIS:
+- Score: {score} (-100 to +100)
+- Probability: {probability}
+- Reasoning: {news_reasoning}
+
+LIQUIDITY:
+- Score: {liquidity_score} (0-100)
+- Level: {liquidity_level}
+- Reasoning: {liquidity_reasoning}"""
+
+BATCH_TEMPLATE = 'EVENT: "{event_title}"\n\n{outcomes_text}'
+BATCH_OUTCOME_TEMPLATE = """### OUTCOME {index}: "{outcome_name}"
+MARKET: "{market_question}"
+LIQUIDITY: score {liquidity_score}/100, {liquidity_level} - {liquidity_reasoning}
+NEWS:
+{news_text}"""
+BATCH_ARTICLE_TEMPLATE = "- {title}: {description} ({source})"
+
+TRIAGE_OUTCOME_TEMPLATE = """### OUTCOME {index}: "{outcome_name}"
+MARKET: "{market_question}"
+NEWS:
+{news_text}"""
+
+# Estimated once: the per-call budget left for data is what remains after these
+SENTIMENT_INSTRUCTION_TOKENS = estimate_tokens(SENTIMENT_INSTRUCTIONS)
+BATCH_INSTRUCTION_TOKENS = estimate_tokens(BATCH_INSTRUCTIONS)
+TRIAGE_INSTRUCTION_TOKENS = estimate_tokens(TRIAGE_INSTRUCTIONS)
+
+# --- Building ---
+
+def _truncate(text, limit):
+    text = ' '.join((text or 'N/A').split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(' ', 1)[0] + '…'
+
+def _format_article(template, article):
+    return template.format(
+        title=_truncate(article.get('title'), PROMPT_MAX_TITLE_CHARS),
+        description=_truncate(article.get('description'), PROMPT_MAX_DESCRIPTION_CHARS),
+        source=article.get('source') or 'N/A'
+    )
+
+def _fit_articles(articles, template, budget, limit=10):
+    """
+    Formats the most relevant articles that fit in `budget` tokens (always
+    at least one). Returns (lines, tokens used, articles dropped).
+    """
+    lines, used = [], 0
+    for article in articles[:limit]:
+        line = _format_article(template, article)
+        cost = estimate_tokens(line) + 1  # + separator
+        if lines and used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    return lines, used, len(articles) - len(lines)
+
+def _prompt(instructions, user_text, articles_dropped=0):
+    """
+    Request parts for messages.create(): the instructions as a (cacheable)
+    system block, the call's data as the user message, and the estimate.
+    """
+    system_block = {"type": "text", "text": instructions}
+    if PROMPT_CACHE_ENABLED:
+        system_block["cache_control"] = {"type": "ephemeral"}
+    return {
+        "system": [system_block],
+        "messages": [{"role": "user", "content": user_text}],
+        "estimated_tokens": estimate_tokens(instructions) + estimate_tokens(user_text),
+        "articles_dropped": articles_dropped
+    }
+
+def build_sentiment_prompt(news_articles, outcome_name, market_question):
+    fixed = SENTIMENT_TEMPLATE.format(market_question=market_question, outcome_name=outcome_name, news_text='')
+    budget = PROMPT_TOKEN_BUDGET - SENTIMENT_INSTRUCTION_TOKENS - estimate_tokens(fixed)
+    lines, _, dropped = _fit_articles(news_articles, SENTIMENT_ARTICLE_TEMPLATE, budget)
+    user_text = SENTIMENT_TEMPLATE.format(
+        market_question=market_question, outcome_name=outcome_name, news_text="\n\n".join(lines)
+    )
+    return _prompt(SENTIMENT_INSTRUCTIONS, user_text, dropped)
+
+def build_summary_prompt(outcome_name, news_analysis, depth_analysis):
+    user_text = SUMMARY_TEMPLATE.format(
+        outcome_name=outcome_name,
+        score=news_analysis.get('score', 0),
+        probability=news_analysis.get('probability_assessment', 'Unknown'),
+        news_reasoning=news_analysis.get('reasoning', 'N/A'),
+        liquidity_score=depth_analysis.get('liquidity_score', 0),
+        liquidity_level=depth_analysis.get('liquidity_level', 'Unknown'),
+        liquidity_reasoning=depth_analysis.get('reasoning', 'N/A')
+    )
+    return _prompt(SUMMARY_INSTRUCTIONS, user_text)
+
+def _build_outcomes_prompt(instructions, instruction_tokens, budget, outcome_template, event_title, blocks, outcome_inputs):
+    """
+    One prompt for several outcomes. The article budget is shared: each
+    outcome gets an even share of what is left, so an outcome with few
+    articles leaves room for the ones after it.
+    """
+    fixed_tokens = estimate_tokens(BATCH_TEMPLATE.format(event_title=event_title, outcomes_text='')) + sum(
+        estimate_tokens(outcome_template.format(news_text='', **block)) + 1 for block in blocks
+    )
+    remaining = budget - instruction_tokens - fixed_tokens
+
+    outcome_texts, dropped = [], 0
+    for position, (block, item) in enumerate(zip(blocks, outcome_inputs)):
+        share = remaining // (len(blocks) - position)
+        lines, used, outcome_dropped = _fit_articles(item['articles'], BATCH_ARTICLE_TEMPLATE, share)
+        remaining -= used
+        dropped += outcome_dropped
+        outcome_texts.append(outcome_template.format(news_text="\n".join(lines) or "- No articles found", **block))
+
+    user_text = BATCH_TEMPLATE.format(event_title=event_title, outcomes_text="\n\n".join(outcome_texts))
+    return _prompt(instructions, user_text, dropped)
+
+def build_batch_prompt(event_title, outcome_inputs):
+    blocks = []
+    for index, item in enumerate(outcome_inputs):
+        depth = item['depth']
+        blocks.append(dict(
+            index=index,
+            outcome_name=item['outcome_name'],
+            market_question=item['market_question'],
+            liquidity_score=depth.get('liquidity_score', 0),
+            liquidity_level=depth.get('liquidity_level', 'Unknown'),
+            liquidity_reasoning=depth.get('reasoning', 'N/A')
+        ))
+    return _build_outcomes_prompt(
+        BATCH_INSTRUCTIONS, BATCH_INSTRUCTION_TOKENS, PROMPT_BATCH_TOKEN_BUDGET,
+        BATCH_OUTCOME_TEMPLATE, event_title, blocks, outcome_inputs
+    )
+
+def build_triage_prompt(event_title, outcome_inputs):
+    blocks = [
+        dict(index=index, outcome_name=item['outcome_name'], market_question=item['market_question'])
+        for index, item in enumerate(outcome_inputs)
+    ]
+    return _build_outcomes_prompt(
+        TRIAGE_INSTRUCTIONS, TRIAGE_INSTRUCTION_TOKENS, PROMPT_TRIAGE_TOKEN_BUDGET,
+        TRIAGE_OUTCOME_TEMPLATE, event_title, blocks, outcome_inputs
+    )
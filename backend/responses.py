@@ -0,0 +1,99 @@
+import gzip
+import hashlib
+import json
+import os
+
+from dotenv import load_dotenv
+from fastapi import Response
+
+load_dotenv()
+
+# orjson serializes several times faster than the stdlib encoder; brotli
+# compresses better than gzip. Both are optional.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Configuration ---
+# Bodies smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Fast enough to compress per request
+
+def dumps(content):
+    """
+    Serializes content to JSON bytes with orjson when available.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(',', ':')).encode('utf-8')
+
+def make_etag(body, encoding=None):
+    """
+    Strong ETag from a hash of the uncompressed JSON body. Compressed
+    variants get the encoding as a suffix, since strong ETags must differ
+    between encodings.
+    """
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+def _etag_matches(request, etag):
+    # Any encoding variant of the same content counts as a match
+    header = request.headers.get('if-none-match', '') if request is not None else ''
+    digest = etag.strip('"').split('-')[0]
+    for tag in header.split(','):
+        tag = tag.strip().removeprefix('W/').strip('"')
+        if tag == '*' or tag.split('-')[0] == digest:
+            return True
+    return False
+
+def _choose_encoding(request, size):
+    if size < COMPRESSION_MIN_SIZE or request is None:
+        return None
+    header = request.headers.get('accept-encoding', '')
+    encodings = {part.split(';')[0].strip().lower() for part in header.split(',')}
+    if brotli is not None and 'br' in encodings:
+        return 'br'
+    if 'gzip' in encodings:
+        return 'gzip'
+    return None
+
+def json_response(content, request=None, status_code=200, headers=None, cache_control=None):
+    """
+    Fast JSON response for plain (non-streaming) payloads: orjson encoding,
+    plus br or gzip compression when the client accepts it and the body
+    is large enough to be worth it.
+
+    Every 200 carries a strong ETag of the content; a request whose
+    If-None-Match matches gets an empty 304 instead (no compression work).
+
+    Streaming responses must not go through here - compressing them would
+    buffer the chunks.
+    """
+    body = dumps(content)
+    headers = dict(headers or {})
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+    if len(body) >= COMPRESSION_MIN_SIZE:
+        headers['Vary'] = 'Accept-Encoding'
+
+    encoding = _choose_encoding(request, len(body))
+    if status_code == 200:
+        headers['ETag'] = make_etag(body, encoding)
+        if _etag_matches(request, headers['ETag']):
+            return Response(status_code=304, headers=headers)
+
+    if encoding == 'br':
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+
+    return Response(content=body, status_code=status_code, headers=headers, media_type='application/json')
@@ -0,0 +1,61 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+# --- List Response Models ---
+# Projections of Gamma events for the home-page lists. Field names match
+# Gamma's so clients can read either shape; only what the lists render is kept.
+
+class MarketSummary(BaseModel):
+    question: Optional[str] = None
+    outcomes: Optional[str] = None  # JSON-encoded list, as Gamma sends it
+    outcomePrices: Optional[str] = None  # JSON-encoded list, as Gamma sends it
+
+class EventSummary(BaseModel):
+    id: str
+    title: Optional[str] = None
+    slug: Optional[str] = None
+    volume24hr: Optional[float] = None
+    liquidity: Optional[float] = None
+    markets: List[MarketSummary] = []  # First market only
+
+# --- Projection ---
+
+def project_event(event):
+    """
+    Slim EventSummary-shaped dict for a raw Gamma event.
+    """
+    markets = event.get('markets') or []
+    return {
+        "id": str(event.get('id')),
+        "title": event.get('title'),
+        "slug": event.get('slug'),
+        "volume24hr": event.get('volume24hr'),
+        "liquidity": event.get('liquidityNum', event.get('liquidity')),
+        "markets": [
+            {
+                "question": market.get('question'),
+                "outcomes": market.get('outcomes'),
+                "outcomePrices": market.get('outcomePrices')
+            }
+            for market in markets[:1]
+        ]
+    }
+
+def parse_fields(fields):
+    """
+    Parses a comma-separated `fields=` query parameter into a list of
+    top-level field names, or None if not given.
+    """
+    if not fields:
+        return None
+    return [name.strip() for name in fields.split(',') if name.strip()]
+
+def project_events(events, fields=None):
+    """
+    Projects a list of raw Gamma events: to the requested top-level
+    Gamma fields if `fields` is given, otherwise to EventSummary.
+    """
+    if fields is None:
+        return [project_event(event) for event in events]
+    return [{name: event.get(name) for name in fields if name in event} for event in events]
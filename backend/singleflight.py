@@ -0,0 +1,167 @@
+import asyncio
+import contextvars
+import functools
+import json
+
+# All groups, so their counters can be reported together
+_groups = {}
+# Called with a flight's context when a caller joins it (see on_join)
+_join_hooks = []
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls: while a call for a key is in
+    flight, later callers with the same key await the same result instead
+    of starting their own. Nothing is cached once the call finishes.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # key -> (asyncio.Task, contextvars.Context it runs in)
+        self.started = 0
+        self.joined = 0
+        _groups[name] = self
+
+    async def do(self, key, fn, *args, **kwargs):
+        call = self._calls.get(key)
+        if call is None:
+            self.started += 1
+            # The flight runs in a copy of the starting caller's context
+            context = contextvars.copy_context()
+            task = asyncio.get_running_loop().create_task(fn(*args, **kwargs), context=context)
+            self._calls[key] = (task, context)
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.joined += 1
+            task, context = call
+            for hook in _join_hooks:
+                hook(context)
+        # Shield so one caller disconnecting doesn't cancel the shared work
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+
+class _StreamFlight:
+    """
+    One in-flight call of a StreamingSingleFlight: its task, every chunk
+    published so far and the callers following it.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.task = None
+        self.context = None
+        self.chunks = []
+        self.followers = 0
+        self._wakeups = set()  # one asyncio.Event per follower
+
+    def publish(self, chunk):
+        self.chunks.append(chunk)
+        for wakeup in self._wakeups:
+            wakeup.set()
+
+    async def follow(self):
+        """
+        Yields every chunk from the first one, then new ones as they are
+        published, until the call finishes.
+        """
+        wakeup = asyncio.Event()
+        self._wakeups.add(wakeup)
+        try:
+            position = 0
+            while True:
+                while position < len(self.chunks):
+                    yield self.chunks[position]
+                    position += 1
+                if self.task.done():
+                    return
+                wakeup.clear()
+                await wakeup.wait()
+        finally:
+            self._wakeups.discard(wakeup)
+
+    def _finished(self, _):
+        for wakeup in self._wakeups:
+            wakeup.set()
+
+class StreamingSingleFlight(SingleFlight):
+    """
+    Single-flight for calls that publish progress chunks while they run
+    (e.g. a streamed analysis). Callers that join late first get the
+    chunks published so far, so every follower sees the whole stream. The
+    call is cancelled once no caller follows or awaits it any more.
+    """
+
+    def join(self, key, fn, *args, **kwargs):
+        """
+        Returns the flight for key, starting fn(publish, *args, **kwargs)
+        if none is running. Callers must call leave(flight) when done.
+        """
+        flight = self._calls.get(key)
+        if flight is None:
+            self.started += 1
+            flight = _StreamFlight(key)
+            flight.context = contextvars.copy_context()
+            flight.task = asyncio.get_running_loop().create_task(
+                fn(flight.publish, *args, **kwargs), context=flight.context
+            )
+            flight.task.add_done_callback(flight._finished)
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self._calls[key] = flight
+        else:
+            self.joined += 1
+            for hook in _join_hooks:
+                hook(flight.context)
+        flight.followers += 1
+        return flight
+
+    def leave(self, flight):
+        flight.followers -= 1
+        if flight.followers <= 0 and not flight.task.done():
+            # Forget it before cancelling, so a caller arriving while the
+            # cancellation unwinds starts a fresh call instead of joining it
+            self._forget(flight.key, flight)
+            flight.task.cancel()
+
+    def _forget(self, key, flight):
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+
+def on_join(hook):
+    """
+    Registers hook(context), run in the joining caller whenever a call
+    joins a flight, with the context the flight runs in. Lets request-scoped
+    state such as a priority follow the callers now waiting on the flight.
+    """
+    _join_hooks.append(hook)
+
+def _default_key(*args, **kwargs):
+    return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+def single_flight(name, key=_default_key):
+    """
+    Decorator applying a SingleFlight group to an async function. `key`
+    maps the call arguments to the dedup key (all arguments by default).
+    """
+    def decorator(fn):
+        group = SingleFlight(name)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await group.do(key(*args, **kwargs), fn, *args, **kwargs)
+
+        wrapper.flights = group
+        return wrapper
+    return decorator
+
+def get_stats():
+    """
+    Per-group counts of calls that ran vs. calls that joined one in flight.
+    """
+    return {
+        name: {"started": group.started, "joined": group.joined, "in_flight": len(group._calls)}
+        for name, group in _groups.items()
+    }
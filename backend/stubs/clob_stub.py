@@ -0,0 +1,52 @@
+"""
+Local stand-in for the Polymarket CLOB order book API, for tests and
+benchmarks without network access.
+
+Run from backend/:
+    uvicorn stubs.clob_stub:app --port 8100
+and point the backend at it:
+    CLOB_API_URL=http://127.0.0.1:8100
+
+Books are synthetic but deterministic per token id. Token ids ending in
+"-missing" return 404, like tokens without an order book.
+"""
+import hashlib
+import os
+
+from fastapi import FastAPI, HTTPException
+
+STUB_LEVELS = int(os.getenv("CLOB_STUB_LEVELS", "20"))  # Price levels per side
+
+app = FastAPI()
+
+def _seed(token_id):
+    return int.from_bytes(hashlib.blake2b(token_id.encode(), digest_size=8).digest(), 'big')
+
+def build_book(token_id, levels=STUB_LEVELS):
+    """
+    Order book around a token-specific midpoint: one-cent ticks, with
+    size growing away from the touch.
+    """
+    seed = _seed(token_id)
+    mid = 0.05 + (seed % 90) / 100  # 0.05 - 0.94
+    base_size = 50 + seed % 450
+    bids, asks = [], []
+    for i in range(levels):
+        bid, ask = round(mid - 0.01 * (i + 1), 2), round(mid + 0.01 * (i + 1), 2)
+        size = base_size * (1 + i)
+        if bid > 0:
+            bids.append({"price": f"{bid:.2f}", "size": f"{size:.2f}"})
+        if ask < 1:
+            asks.append({"price": f"{ask:.2f}", "size": f"{size:.2f}"})
+    # Same ordering as the real API: worst price first on both sides
+    return {
+        "asset_id": token_id,
+        "bids": list(reversed(bids)),
+        "asks": list(reversed(asks))
+    }
+
+@app.get("/book")
+def get_book(token_id: str):
+    if token_id.endswith("-missing"):
+        raise HTTPException(status_code=404, detail="No orderbook exists for the requested token id")
+    return build_book(token_id)
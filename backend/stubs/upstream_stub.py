@@ -0,0 +1,262 @@
+"""
+Local stand-in for every upstream the backend calls - Gamma, NewsAPI,
+Anthropic and the CLOB - for benchmarks without network access. It
+replays the fixtures in bench/fixtures/ (see bench/record_fixtures.py).
+
+Run from backend/:
+    uvicorn stubs.upstream_stub:app --port 8900
+and point the backend at it:
+    GAMMA_API_URL=http://127.0.0.1:8900
+    NEWS_API_URL=http://127.0.0.1:8900/v2/everything
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8900
+    CLOB_API_URL=http://127.0.0.1:8900
+
+Injected latency and error rates are set per upstream (gamma, newsapi,
+anthropic, anthropic_fast, clob) with STUB_<UPSTREAM>_LATENCY_MS and
+STUB_<UPSTREAM>_ERROR_RATE. Requests for a small model (FAST_MODEL_PATTERN,
+e.g. the triage tier's Haiku) count as anthropic_fast. Latency is jittered by +/- STUB_JITTER and
+the random stream is seeded by STUB_SEED, so runs are repeatable.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from stubs.clob_stub import build_book
+
+FIXTURES_DIR = os.getenv(
+    "STUB_FIXTURES_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "bench", "fixtures")
+)
+
+# --- Configuration ---
+
+DEFAULT_LATENCY_MS = {'gamma': 80, 'newsapi': 250, 'anthropic': 2500, 'anthropic_fast': 600, 'clob': 30}
+FAST_MODEL_PATTERN = re.compile(os.getenv("STUB_FAST_MODEL_PATTERN", "haiku"), re.IGNORECASE)
+# Shortest prefix (in tokens) the API caches; shorter cache_control prefixes
+# are processed as ordinary input. Haiku models need twice as much
+CACHE_MIN_TOKENS = {'anthropic': 1024, 'anthropic_fast': 2048}
+# Status and body of an injected failure, like each upstream's own overload response
+INJECTED_ERRORS = {
+    'gamma': (503, {"error": "Service Unavailable"}),
+    'newsapi': (429, {"status": "error", "code": "rateLimited", "message": "Rate limited (stub)"}),
+    'anthropic': (529, {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded (stub)"}}),
+    'anthropic_fast': (529, {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded (stub)"}}),
+    'clob': (503, {"error": "Service Unavailable"})
+}
+
+LATENCY_MS = {
+    name: float(os.getenv(f"STUB_{name.upper()}_LATENCY_MS", default))
+    for name, default in DEFAULT_LATENCY_MS.items()
+}
+ERROR_RATE = {name: float(os.getenv(f"STUB_{name.upper()}_ERROR_RATE", "0")) for name in DEFAULT_LATENCY_MS}
+JITTER = float(os.getenv("STUB_JITTER", "0.25"))
+
+_rng = random.Random(int(os.getenv("STUB_SEED", "21")))
+request_counts = {name: 0 for name in DEFAULT_LATENCY_MS}
+error_counts = {name: 0 for name in DEFAULT_LATENCY_MS}
+_cached_prefixes = set()  # Prompt prefixes marked with cache_control so far
+
+def _load(name):
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        return json.load(f)
+
+EVENTS = _load("gamma_events.json")
+EVENTS_BY_ID = {str(event['id']): event for event in EVENTS}
+ARTICLES = _load("news_articles.json")
+ANTHROPIC = _load("anthropic_messages.json")
+
+# Recorded articles are shifted so the newest one is "now": recency-based
+# ranking then behaves the same whenever the benchmark runs
+def _parse_time(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+
+_article_shift = datetime.now(timezone.utc) - max(_parse_time(a['publishedAt']) for a in ARTICLES)
+for _article in ARTICLES:
+    _article['publishedAt'] = (_parse_time(_article['publishedAt']) + _article_shift).strftime('%Y-%m-%dT%H:%M:%SZ')
+    _article['_text'] = f"{_article.get('title') or ''} {_article.get('description') or ''}".lower()
+
+app = FastAPI()
+
+class _InjectedError(Exception):
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+async def _upstream(name):
+    """
+    Counts the request, sleeps for the injected latency and raises the
+    injected error, if any.
+    """
+    request_counts[name] += 1
+    latency = LATENCY_MS[name] * (1 + _rng.uniform(-JITTER, JITTER))
+    fail = _rng.random() < ERROR_RATE[name]
+    await asyncio.sleep(max(latency, 0) / 1000)
+    if fail:
+        error_counts[name] += 1
+        status, body = INJECTED_ERRORS[name]
+        raise _InjectedError(status, body)
+
+@app.exception_handler(_InjectedError)
+async def injected_error_handler(request, exc):
+    return JSONResponse(status_code=exc.status, content=exc.body)
+
+@app.get("/healthz")
+def healthz():
+    return {
+        "latency_ms": LATENCY_MS,
+        "error_rate": ERROR_RATE,
+        "requests": request_counts,
+        "errors": error_counts
+    }
+
+# --- Gamma ---
+
+@app.get("/events")
+async def gamma_events(
+    closed: str = "false", order: str = "id", ascending: str = "false",
+    limit: int = 20, offset: int = 0, tag_id: str = None
+):
+    await _upstream('gamma')
+    events = [e for e in EVENTS if str(e.get('closed', False)).lower() == closed.lower()]
+    if tag_id:
+        events = [e for e in events if any(str(t.get('id')) == tag_id for t in e.get('tags') or [])]
+    if order == 'id':
+        key = lambda e: int(e['id'])
+    else:
+        key = lambda e: e.get(order) or 0
+    events = sorted(events, key=key, reverse=ascending.lower() != 'true')
+    return events[offset:offset + limit]
+
+@app.get("/events/{event_id}")
+async def gamma_event(event_id: str):
+    await _upstream('gamma')
+    event = EVENTS_BY_ID.get(event_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail="not found")
+    return event
+
+# --- NewsAPI ---
+
+def _query_terms(query):
+    # Quoted phrases when the query has any (event-level queries), else words
+    phrases = re.findall(r'"([^"]+)"', query)
+    if phrases:
+        return [p.lower() for p in phrases]
+    return [w.lower() for w in re.findall(r'\w+', query) if len(w) > 3]
+
+@app.get("/v2/everything")
+async def news_everything(q: str = "", pageSize: int = 20):
+    await _upstream('newsapi')
+    terms = _query_terms(q)
+    scored = []
+    for article in ARTICLES:
+        matches = sum(term in article['_text'] for term in terms)
+        if matches:
+            scored.append((matches, article['publishedAt'], article))
+    # Best match first, then newest (the backend asks for sortBy=publishedAt)
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    articles = [{k: v for k, v in a.items() if k != '_text'} for _, _, a in scored[:pageSize]]
+    return {"status": "ok", "totalResults": len(scored), "articles": articles}
+
+# --- Anthropic ---
+
+def _text(content):
+    if isinstance(content, str):
+        return content
+    return '\n'.join(block.get('text', '') for block in content or [] if isinstance(block, dict))
+
+def _prompt_text(body):
+    # System prompt first, as the model sees it
+    parts = [_text(body.get('system'))] if body.get('system') else []
+    parts.extend(_text(message.get('content')) for message in body.get('messages', []))
+    return '\n'.join(parts)
+
+def _cached_prefix(body):
+    """
+    Text of the system blocks up to the last cache_control marker, i.e.
+    the prefix the API would cache.
+    """
+    system = body.get('system')
+    if not isinstance(system, list):
+        return ''
+    marked = [i for i, block in enumerate(system) if isinstance(block, dict) and block.get('cache_control')]
+    return _text(system[:marked[-1] + 1]) if marked else ''
+
+def _pick(options, prompt, salt):
+    # Same prompt, same answer - like a recorded response
+    digest = hashlib.blake2b(f"{salt}:{prompt}".encode(), digest_size=4).digest()
+    return options[int.from_bytes(digest, 'big') % len(options)]
+
+def _completion(prompt):
+    sentiments, summaries = ANTHROPIC['sentiment'], ANTHROPIC['summary']
+    outcome_headers = re.findall(r'^### OUTCOME (\d+):.*$', prompt, re.MULTILINE)
+    if outcome_headers and prompt.startswith("Triage news"):
+        # Relevant when the outcome's own articles mention it
+        outcomes = []
+        for block in re.split(r'^### OUTCOME ', prompt, flags=re.MULTILINE)[1:]:
+            index, name = re.match(r'(\d+): "([^"]*)"', block).groups()
+            news = block.split("NEWS:", 1)[-1].lower()
+            relevant = name.lower() in news
+            outcomes.append({
+                "index": int(index),
+                "relevant": relevant,
+                "confidence": 0.9,
+                "reason": "articles name the outcome" if relevant else "articles about other outcomes"
+            })
+        return {"outcomes": outcomes}
+    if outcome_headers:
+        outcomes = []
+        for index in outcome_headers:
+            block = prompt.split(f"### OUTCOME {index}:", 1)[1][:400]
+            outcomes.append({
+                "index": int(index),
+                **_pick(sentiments, block, 'sentiment'),
+                "summary": _pick(summaries, block, 'summary')
+            })
+        return {"outcomes": outcomes}
+    if prompt.startswith("Create concise summary"):
+        return {"summary": _pick(summaries, prompt, 'summary')}
+    return _pick(sentiments, prompt, 'sentiment')
+
+@app.post("/v1/messages")
+async def anthropic_messages(request: Request):
+    body = await request.json()
+    upstream = 'anthropic_fast' if FAST_MODEL_PATTERN.search(body.get('model', '')) else 'anthropic'
+    await _upstream(upstream)
+    prompt = _prompt_text(body)
+    text = json.dumps(_completion(prompt), ensure_ascii=False)
+    message = json.loads(json.dumps(ANTHROPIC['message']))
+    message['model'] = body.get('model', message['model'])
+    message['content'][0]['text'] = text
+    # Roughly four characters per token. A cacheable prefix seen before is
+    # reported as read from the cache, a new one as written to it; one
+    # under the model's minimum isn't cached at all.
+    prefix = _cached_prefix(body)
+    if len(prefix) // 4 < CACHE_MIN_TOKENS[upstream]:
+        prefix = ''
+    cached_tokens = len(prefix) // 4
+    seen = prefix in _cached_prefixes
+    if prefix:
+        _cached_prefixes.add(prefix)
+    message['usage'] = {
+        "input_tokens": len(prompt) // 4 - cached_tokens,
+        "output_tokens": len(text) // 4,
+        "cache_read_input_tokens": cached_tokens if seen else 0,
+        "cache_creation_input_tokens": 0 if seen else cached_tokens
+    }
+    return message
+
+# --- CLOB ---
+
+@app.get("/book")
+async def clob_book(token_id: str):
+    await _upstream('clob')
+    if token_id.endswith("-missing"):
+        raise HTTPException(status_code=404, detail="No orderbook exists for the requested token id")
+    return build_book(token_id)
@@ -0,0 +1,97 @@
+"""Tests for order book execution metrics
+
+Run from backend/ with: python -m pytest test_execution_metrics.py
+"""
+import numpy as np
+import pytest
+
+from order_book_service import _parse_levels, compute_execution_metrics, fill_prices
+from stubs.clob_stub import build_book
+
+# Asks: $50, $120 and $700 of notional -> $50, $170, $870 cumulative
+ASKS = np.array([[0.50, 100.0], [0.60, 200.0], [0.70, 1000.0]])
+# Bids: $40 and $30 of notional -> $70 cumulative
+BIDS = np.array([[0.40, 100.0], [0.30, 100.0]])
+
+def _walk(levels, size):
+    # Reference fill: spend `size` dollars level by level
+    remaining, shares = size, 0.0
+    for price, available in levels:
+        spend = min(remaining, price * available)
+        shares += spend / price
+        remaining -= spend
+        if remaining <= 1e-9:
+            return size / shares
+    return float('nan')
+
+# --- fill_prices ---
+
+def test_fill_within_first_level():
+    assert fill_prices(ASKS, [30.0])[0] == pytest.approx(0.50)
+
+def test_fill_across_levels():
+    # $50 buys 100 shares at 0.50, the other $50 buys 83.33 at 0.60
+    assert fill_prices(ASKS, [100.0])[0] == pytest.approx(100 / (100 + 50 / 0.6))
+
+def test_fill_exactly_consumes_levels():
+    # $170 takes the first two levels completely: 300 shares
+    assert fill_prices(ASKS, [170.0])[0] == pytest.approx(170 / 300)
+
+def test_fill_too_thin_is_nan():
+    assert np.isnan(fill_prices(ASKS, [1000.0])[0])
+
+def test_fill_empty_side():
+    assert np.isnan(fill_prices(np.empty((0, 2)), [100.0])).all()
+
+def test_fill_matches_level_walk_on_stub_book():
+    raw = build_book("test-token", levels=5)
+    asks = _parse_levels(raw['asks'], best_first_descending=False)
+    bids = _parse_levels(raw['bids'], best_first_descending=True)
+    sizes = [10.0, 100.0, 250.0, 1000.0, 100000.0]
+    for levels in (asks, bids):
+        expected = [_walk(levels, size) for size in sizes]
+        np.testing.assert_allclose(fill_prices(levels, sizes), expected)
+
+# --- compute_execution_metrics ---
+
+def test_execution_metrics():
+    metrics = compute_execution_metrics({'bids': BIDS, 'asks': ASKS}, sizes=np.array([30.0, 100.0, 1000.0]))
+    assert metrics['best_bid'] == 40.0
+    assert metrics['best_ask'] == 50.0
+    assert metrics['spread'] == 10.0
+    assert metrics['midpoint'] == 45.0
+    assert metrics['bid_depth_usd'] == 70.0
+    assert metrics['ask_depth_usd'] == 870.0
+
+    small, medium, large = metrics['slippage']
+    assert small == {
+        'size_usd': 30, 'buy_avg_price': 50.0, 'buy_slippage': 0.0,
+        'sell_avg_price': 40.0, 'sell_slippage': 0.0
+    }
+    # Buy $100 at 54.55c avg; the $70 of bids can't absorb a $100 sell
+    assert medium['buy_avg_price'] == 54.55
+    assert medium['buy_slippage'] == 4.55
+    assert medium['sell_avg_price'] is None
+    assert medium['sell_slippage'] is None
+    assert large['buy_avg_price'] is None
+
+def test_execution_metrics_one_sided_book():
+    metrics = compute_execution_metrics({'bids': np.empty((0, 2)), 'asks': ASKS}, sizes=np.array([30.0]))
+    assert metrics['best_bid'] is None
+    assert metrics['spread'] is None
+    assert metrics['midpoint'] is None
+    assert metrics['bid_depth_usd'] == 0.0
+    assert metrics['slippage'][0]['buy_avg_price'] == 50.0
+    assert metrics['slippage'][0]['sell_avg_price'] is None
+
+def test_execution_metrics_stub_book_orders_levels():
+    # The API lists both sides worst price first
+    raw = build_book("test-token", levels=3)
+    book = {
+        'bids': _parse_levels(raw['bids'], best_first_descending=True),
+        'asks': _parse_levels(raw['asks'], best_first_descending=False)
+    }
+    metrics = compute_execution_metrics(book)
+    assert metrics['best_bid'] == float(raw['bids'][-1]['price']) * 100
+    assert metrics['best_ask'] == float(raw['asks'][-1]['price']) * 100
+    assert metrics['spread'] == pytest.approx(2.0)
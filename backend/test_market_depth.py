@@ -0,0 +1,37 @@
+"""Tests for ranking event markets by liquidity
+
+Run from backend/ with: python -m pytest test_market_depth.py
+"""
+import json
+
+from market_depth_service import score_markets
+
+def _market(title, liquidity):
+    return {
+        'question': f'Will {title} win?',
+        'groupItemTitle': title,
+        'liquidityNum': liquidity,
+        'outcomePrices': json.dumps(["0.5", "0.5"]),
+        'clobTokenIds': json.dumps([f'{title}-yes', f'{title}-no'])
+    }
+
+def test_score_markets_ties_keep_market_order():
+    markets = [_market('A', 100), _market('B', 500), _market('C', 500), _market('D', 500), _market('E', 50)]
+    assert [d['outcome'] for d in score_markets(markets, limit=2)] == ['B', 'C']
+    assert [d['outcome'] for d in score_markets(markets, limit=4)] == ['B', 'C', 'D', 'A']
+
+def test_score_markets_limit_covers_all():
+    markets = [_market('A', 0), _market('B', 2000), _market('C', 2000), _market('D', None)]
+    depths = score_markets(markets, limit=10)
+    assert [d['outcome'] for d in depths] == ['B', 'C', 'A', 'D']
+    assert [d['liquidity_score'] for d in depths] == [30, 30, 0, 0]
+    assert depths[0]['token_id'] == 'B-yes'
+
+def test_score_markets_scores_match_thresholds():
+    markets = [_market(str(i), liquidity) for i, liquidity in enumerate([999, 1000, 99999, 100000])]
+    depths = score_markets(markets, limit=4)
+    assert [d['liquidity_score'] for d in depths] == [95, 70, 30, 10]
+
+def test_score_markets_empty():
+    assert score_markets([], limit=5) == []
+    assert score_markets([_market('A', 10)], limit=0) == []
@@ -1,9 +1,20 @@
 #!/usr/bin/env python3
-"""Test script for news service"""
-from news_service import get_event_news
+"""Test script for news service
+
+Calls NewsAPI with NEWS_API_KEY. To run offline, start the upstream stub
+(uvicorn stubs.upstream_stub:app --port 8900) and set
+NEWS_API_URL=http://127.0.0.1:8900/v2/everything.
+"""
+import asyncio
+from news_service import get_event_news_async
 import json
 
 # Test the news service
 print("Testing news service...")
-result = get_event_news('Fed decision in December?', 5)
+result = asyncio.run(get_event_news_async(
+    'Fed decision in December?',
+    'Will the Fed cut rates by 25 bps after the December meeting?',
+    '25 bps decrease',
+    max_results=5
+))
 print(json.dumps(result, indent=2))
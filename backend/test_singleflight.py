@@ -0,0 +1,57 @@
+"""Tests for the streaming single-flight
+
+Run from backend/ with: python -m pytest test_singleflight.py
+"""
+import asyncio
+
+import pytest
+
+from singleflight import StreamingSingleFlight
+
+async def _count_to(publish, n):
+    for i in range(n):
+        publish(i)
+        await asyncio.sleep(0.01)
+    return n
+
+async def _collect(flight):
+    return [chunk async for chunk in flight.follow()]
+
+def test_late_follower_gets_whole_stream():
+    async def run():
+        flights = StreamingSingleFlight("test-late-follower")
+        first = flights.join("key", _count_to, 3)
+        await asyncio.sleep(0.015)
+        second = flights.join("key", _count_to, 3)
+        assert second is first
+        chunks = await asyncio.gather(_collect(first), _collect(second))
+        flights.leave(first)
+        flights.leave(second)
+        return flights, chunks
+
+    flights, chunks = asyncio.run(run())
+    assert chunks == [[0, 1, 2], [0, 1, 2]]
+    assert (flights.started, flights.joined) == (1, 1)
+
+def test_rejoin_after_last_follower_leaves_starts_fresh():
+    async def run():
+        flights = StreamingSingleFlight("test-rejoin")
+        abandoned = flights.join("key", _count_to, 3)
+        await asyncio.sleep(0.015)
+        # The only follower disconnects; its call is cancelled but hasn't
+        # finished unwinding when the next caller arrives
+        flights.leave(abandoned)
+        fresh = flights.join("key", _count_to, 3)
+        assert fresh is not abandoned
+        chunks = await _collect(fresh)
+        result = await fresh.task
+        flights.leave(fresh)
+        with pytest.raises(asyncio.CancelledError):
+            await abandoned.task
+        return flights, chunks, result
+
+    flights, chunks, result = asyncio.run(run())
+    assert chunks == [0, 1, 2]
+    assert result == 3
+    assert flights.started == 2
+    assert flights._calls == {}
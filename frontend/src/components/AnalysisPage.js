@@ -1,6 +1,49 @@
 import { useState, useEffect, useCallback } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import { fetchEventAnalysis, fetchEventDetails } from '../services/api';
+import {
+    canRevalidateAnalysis,
+    fetchEventAnalysis,
+    fetchEventDetails,
+    rememberAnalysis,
+    streamEventAnalysis
+} from '../services/api';
+
+// Placeholder shown for an outcome until its news/summary chunks arrive
+const pendingOutcome = (outcome) => ({
+    ...outcome,
+    news: {
+        score: 0,
+        reasoning: 'Analyzing news...',
+        articles_count: 0,
+        articles: [],
+        query_used: ''
+    },
+    final_summary: 'Generating summary...'
+});
+
+// Merges one streamed chunk into the analysis state
+const applyChunk = (analysis, chunk) => {
+    if (chunk.type === 'event') {
+        return { event_data: chunk.event_data, outcomes: chunk.outcomes.map(pendingOutcome) };
+    }
+    if (!analysis || chunk.index === undefined) {
+        return analysis;
+    }
+
+    const outcomes = [...analysis.outcomes];
+    const outcome = outcomes[chunk.index];
+    if (chunk.type === 'news') {
+        outcomes[chunk.index] = { ...outcome, news: { ...outcome.news, ...chunk.news } };
+    } else if (chunk.type === 'sentiment') {
+        outcomes[chunk.index] = {
+            ...outcome,
+            news: { ...outcome.news, ...chunk.sentiment }
+        };
+    } else if (chunk.type === 'summary') {
+        outcomes[chunk.index] = { ...outcome, final_summary: chunk.final_summary };
+    }
+    return { ...analysis, outcomes };
+};
 
 function AnalysisPage() {
     const { eventId } = useParams();
@@ -11,22 +54,44 @@ function AnalysisPage() {
     const [selectedOutcome, setSelectedOutcome] = useState(0);
 
     const loadEventData = useCallback(async () => {
-        try {
-            setLoading(true);
-            setError(null);
-            
-            const [details, analysisData] = await Promise.all([
-                fetchEventDetails(eventId),
-                fetchEventAnalysis(eventId)
-            ]);
-            
-            setEventData(details);
-            setAnalysis(analysisData);
-        } catch (err) {
-            console.error('Error loading event data:', err);
-            setError(err.message);
-        } finally {
-            setLoading(false);
+        setLoading(true);
+        setError(null);
+        setAnalysis(null);
+
+        let firstChunk;
+        const firstChunkReceived = new Promise((resolve) => { firstChunk = resolve; });
+        let analysisLoaded;
+        if (canRevalidateAnalysis(eventId)) {
+            // Seen recently: revalidate by ETag, usually an empty 304
+            analysisLoaded = fetchEventAnalysis(eventId).then(setAnalysis);
+        } else {
+            let assembled = null;
+            analysisLoaded = streamEventAnalysis(eventId, (chunk) => {
+                if (chunk.type === 'error') {
+                    // The analysis failed mid-stream; pending outcomes would never fill in
+                    setError(chunk.detail || 'Analysis failed');
+                } else if (chunk.type === 'done') {
+                    if (chunk.etag && assembled) {
+                        rememberAnalysis(eventId, chunk.etag, assembled);
+                    }
+                } else {
+                    assembled = applyChunk(assembled, chunk);
+                    setAnalysis(assembled);
+                }
+                firstChunk();
+            });
+        }
+        const detailsLoaded = fetchEventDetails(eventId).then(setEventData);
+
+        // Show the page as soon as the details and first chunk are in;
+        // outcome news and summaries fill in as they stream.
+        const shown = Promise.all([detailsLoaded, Promise.race([firstChunkReceived, analysisLoaded])])
+            .finally(() => setLoading(false));
+        const results = await Promise.allSettled([shown, analysisLoaded]);
+        const failed = results.find((result) => result.status === 'rejected');
+        if (failed) {
+            console.error('Error loading event data:', failed.reason);
+            setError(failed.reason.message);
         }
     }, [eventId]);
 
@@ -533,6 +598,26 @@ function AnalysisPage() {
                             }}>
                                 {currentOutcome.liquidity.reasoning}
                             </div>
+                            {currentOutcome.liquidity.execution && (
+                                <div style={{
+                                    marginTop: '1rem',
+                                    fontSize: '0.875rem',
+                                    color: '#94a3b8',
+                                    lineHeight: '1.6'
+                                }}>
+                                    <div>
+                                        Spread: {currentOutcome.liquidity.execution.spread ?? 'N/A'}¢
+                                        {' '}(bid {currentOutcome.liquidity.execution.best_bid ?? 'N/A'}¢ / ask {currentOutcome.liquidity.execution.best_ask ?? 'N/A'}¢)
+                                    </div>
+                                    {currentOutcome.liquidity.execution.slippage.map((point) => (
+                                        <div key={point.size_usd}>
+                                            Buy ${point.size_usd.toLocaleString()}: {point.buy_avg_price === null
+                                                ? 'not enough depth'
+                                                : `avg ${point.buy_avg_price}¢ (+${point.buy_slippage}¢)`}
+                                        </div>
+                                    ))}
+                                </div>
+                            )}
                         </div>
 
                         {/* All Outcomes Liquidity */}
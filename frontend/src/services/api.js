@@ -1,30 +1,106 @@
 const API_BASE = 'http://127.0.0.1:8000';
 
+// The backend keeps finished analyses for 15 minutes (ANALYSIS_CACHE_TTL);
+// past that, revalidating /analysis would rerun it without streaming
+const ANALYSIS_REVALIDATE_MS = 10 * 60 * 1000;
+
+// Last response per URL, so repeat requests revalidate with If-None-Match
+// and a 304 reuses the data we already have instead of refetching it.
+const etagCache = new Map();
+
+const fetchJson = async (url) => {
+    const cached = etagCache.get(url);
+    const response = await fetch(url, {
+        // We handle revalidation ourselves; skip the browser's HTTP cache
+        cache: 'no-store',
+        headers: cached ? { 'If-None-Match': cached.etag } : {},
+    });
+    if (response.status === 304 && cached) {
+        return { ok: true, data: cached.data };
+    }
+    if (!response.ok) {
+        return { ok: false, data: null };
+    }
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        etagCache.set(url, { etag, data, savedAt: Date.now() });
+    }
+    return { ok: true, data };
+};
+
 // Analysis endpoints
+const analysisUrl = (eventId) => `${API_BASE}/api/event/${eventId}/analysis`;
+
+// True if a recent analysis of the event can be revalidated by ETag
+// (fetchEventAnalysis then usually gets an empty 304) instead of streamed
+export const canRevalidateAnalysis = (eventId) => {
+    const cached = etagCache.get(analysisUrl(eventId));
+    return Boolean(cached) && Date.now() - cached.savedAt < ANALYSIS_REVALIDATE_MS;
+};
+
+// Keeps a streamed analysis under the ETag from its "done" chunk
+export const rememberAnalysis = (eventId, etag, data) => {
+    etagCache.set(analysisUrl(eventId), { etag, data, savedAt: Date.now() });
+};
+
 export const fetchEventAnalysis = async (eventId) => {
-    const response = await fetch(`${API_BASE}/api/event/${eventId}/analysis`);
-    if (!response.ok) {
+    const { ok, data } = await fetchJson(analysisUrl(eventId));
+    if (!ok) {
         throw new Error('Failed to fetch event analysis');
     }
-    return response.json();
+    return data;
+};
+
+// Streams /analysis as NDJSON, calling onChunk for every chunk as it arrives.
+// Chunk types: "event" (event_data + liquidity for each outcome), then
+// "news", "sentiment" and "summary" per outcome (by index), "error", "done"
+// (with the analysis' ETag when it finished).
+export const streamEventAnalysis = async (eventId, onChunk) => {
+    const response = await fetch(`${API_BASE}/api/event/${eventId}/analysis/stream`);
+    if (!response.ok || !response.body) {
+        throw new Error('Failed to fetch event analysis');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop(); // Keep the trailing partial line
+
+        for (const line of lines) {
+            if (line.trim()) {
+                onChunk(JSON.parse(line));
+            }
+        }
+    }
+
+    if (buffer.trim()) {
+        onChunk(JSON.parse(buffer));
+    }
 };
 
 export const fetchEventDetails = async (eventId) => {
-    const response = await fetch(`${API_BASE}/api/event/${eventId}`);
-    if (!response.ok) {
+    const { ok, data } = await fetchJson(`${API_BASE}/api/event/${eventId}`);
+    if (!ok) {
         throw new Error('Failed to fetch event details');
     }
-    return response.json();
+    return data;
 };
 
 // Home page endpoints
 export const fetchTechEvents = async () => {
     try {
-        const response = await fetch(`${API_BASE}/api/tech-events`);
-        if (!response.ok) {
+        const { ok, data } = await fetchJson(`${API_BASE}/api/tech-events`);
+        if (!ok) {
             throw new Error('Failed to fetch tech events');
         }
-        const data = await response.json();
         return { data, error: null };
     } catch (err) {
         return { data: null, error: err.message };
@@ -33,11 +109,10 @@ export const fetchTechEvents = async () => {
 
 export const fetchTrendingEvents = async () => {
     try {
-        const response = await fetch(`${API_BASE}/api/trending-events`);
-        if (!response.ok) {
+        const { ok, data } = await fetchJson(`${API_BASE}/api/trending-events`);
+        if (!ok) {
             throw new Error('Failed to fetch trending events');
         }
-        const data = await response.json();
         return { data, error: null };
     } catch (err) {
         return { data: null, error: err.message };
@@ -46,11 +121,10 @@ export const fetchTrendingEvents = async () => {
 
 export const fetchSportsEvents = async () => {
     try {
-        const response = await fetch(`${API_BASE}/api/sports-events`);
-        if (!response.ok) {
+        const { ok, data } = await fetchJson(`${API_BASE}/api/sports-events`);
+        if (!ok) {
             throw new Error('Failed to fetch sports events');
         }
-        const data = await response.json();
         return { data, error: null };
     } catch (err) {
         return { data: null, error: err.message };